@@ -22,6 +22,7 @@
 from cli.mqttrelay import MqttRelay
 
 import libflagship.httpapi
+import libflagship.pkttrace
 import libflagship.logincache
 import libflagship.seccode
 
@@ -63,12 +64,15 @@ def upgrade_config_if_needed(self):
 @click.group(context_settings=dict(help_option_names=["-h", "--help"]))
 @click.option("--pppp-dump", required=False, metavar="<file.log>", type=click.Path(),
               help="Enable logging of PPPP data to <file.log>")
+@click.option("--pppp-trace", required=False, metavar="<spec>", type=cli.util.PacketTraceType(),
+              help="Restrict pppp packet debug logging (-v) to packet types, channels, and a sample rate "
+                   "(example: DRW,DRW_ACK,chan=1,sample=100)")
 @click.option("--insecure", "-k", is_flag=True, help="Disable TLS certificate validation")
 @click.option("--verbose", "-v", count=True, help="Increase verbosity")
 @click.option("--quiet", "-q", count=True, help="Decrease verbosity")
 @click.option("--printer", "-p", type=int, default=environ.get('PRINTER_INDEX') or 0, help="Select printer number")
 @click.pass_context
-def main(ctx, pppp_dump, verbose, quiet, insecure, printer):
+def main(ctx, pppp_dump, pppp_trace, verbose, quiet, insecure, printer):
     ctx.ensure_object(Environment)
     env = ctx.obj
     levels = {
@@ -85,6 +89,9 @@ def main(ctx, pppp_dump, verbose, quiet, insecure, printer):
 
     cli.logfmt.setup_logging(levels[env.level])
 
+    if pppp_trace:
+        libflagship.pkttrace.tracer.configure(**pppp_trace)
+
     if insecure:
         import urllib3
         urllib3.disable_warnings()
@@ -303,8 +310,12 @@ def pppp_lan_search(env, store):
 @pppp.command("print-file")
 @click.argument("file", required=True, type=click.File("rb"), metavar="<file>")
 @click.option("--no-act", "-n", is_flag=True, help="Test upload only (do not print)")
+@click.option("--window", "-w", type=click.IntRange(min=1), default=4, show_default=True,
+              help="Number of file chunks in flight at once")
+@click.option("--chunk-size", "-c", type=cli.util.FileSizeType(), default="32kb", show_default=True,
+              help="Size of each file chunk (kb, mb, etc)")
 @pass_env
-def pppp_print_file(env, file, no_act):
+def pppp_print_file(env, file, no_act, window, chunk_size):
     """
     Transfer print job to printer, and start printing.
 
@@ -315,11 +326,13 @@ def pppp_print_file(env, file, no_act):
     env.load_config()
     api = cli.pppp.pppp_open(env.config, env.printer_index, dumpfile=env.pppp_dump)
 
-    data = file.read()
-    fui = FileUploadInfo.from_file(file.name, user_name="ankerctl", user_id="-", machine_id="-")
+    # size and md5 are needed before the upload, so read pipes into memory
+    name = file.name
+    file = cli.util.seekable_stream(file)
+    fui = FileUploadInfo.from_fd(file, name, user_name="ankerctl", user_id="-", machine_id="-")
     log.info(f"Going to upload {fui.size} bytes as {fui.name!r}")
     try:
-        cli.pppp.pppp_send_file(api, fui, data)
+        cli.pppp.pppp_send_file(api, fui, file, blocksize=chunk_size, window=window)
         if no_act:
             log.info("File upload complete")
         else:
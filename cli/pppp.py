@@ -104,7 +104,7 @@ def pppp_find_printer_ip_addresses(dumpfile=None):
         yield from _pppp_query_printers(dumpfile=dumpfile)
 
 
-def pppp_send_file(api, fui, data):
+def pppp_send_file(api, fui, fd, blocksize=1024 * 32, window=4):
     log.info("Requesting file transfer..")
     api.send_xzyh(str(uuid.uuid4())[:16].encode(), cmd=P2PCmdType.P2P_SEND_FILE)
 
@@ -112,9 +112,7 @@ def pppp_send_file(api, fui, data):
     api.aabb_request(bytes(fui), frametype=FileTransfer.BEGIN)
 
     log.info("Sending file contents..")
-    blocksize = 1024 * 32
 
-    with tqdm(unit="b", total=len(data), unit_scale=True, unit_divisor=1024) as bar:
-        for pos, chunk in cli.util.split_chunks(data, blocksize):
-            api.aabb_request(chunk, frametype=FileTransfer.DATA, pos=pos)
-            bar.update(len(chunk))
+    with tqdm(unit="b", total=fui.size, unit_scale=True, unit_divisor=1024) as bar:
+        for size in api.aabb_upload(cli.util.read_chunks(fd, blocksize), window=window):
+            bar.update(size)
@@ -1,8 +1,11 @@
+import io
 import sys
 import click
 import json
 from flask import make_response, abort
 
+from libflagship.pkttrace import PacketTracer
+
 
 def require_python_version(major, minor):
     vi = sys.version_info
@@ -70,6 +73,17 @@ def convert(self, value, param, ctx):
             self.fail("Invalid file size: use {kb,gb,mb,tb} suffix (examples: 1337kb, 42mb, 17gb)", param, ctx)
 
 
+class PacketTraceType(click.ParamType):
+
+    name = "tracespec"
+
+    def convert(self, value, param, ctx):
+        try:
+            return PacketTracer.parse_spec(value)
+        except ValueError as E:
+            self.fail(f"Invalid pppp trace specification: {E}", param, ctx)
+
+
 def parse_json(msg):
     if isinstance(msg, dict):
         for key, value in msg.items():
@@ -108,6 +122,20 @@ def split_chunks(data, chunksize):
         yield offset, data[offset:offset+chunksize]
 
 
+def seekable_stream(fd):
+    """Return `fd` if it is seekable, otherwise its contents, read into memory (e.g. from a pipe)"""
+    if fd.seekable():
+        return fd
+    return io.BytesIO(fd.read())
+
+
+def read_chunks(fd, chunksize):
+    offset = 0
+    while chunk := fd.read(chunksize):
+        yield offset, chunk
+        offset += len(chunk)
+
+
 def parse_http_bool(str):
     if str in {"true", "True", "1"}:
         return True
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+#
+# Benchmark for per-packet sequence number bookkeeping in Channel: sending
+# DRW packets and processing their DRW_ACKs (in batches of `ACKS`, as sent by
+# the printer), and receiving DRW packets, partly out of order.
+#
+# Reports the cost per packet, and the resulting cpu load at 10k packets/s.
+# Pass a git revision to compare against the Channel at that revision (e.g.
+# one from before it used libflagship.seqnum):
+#
+#   python bench-ack.py [count] [revision]
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import time
+import random
+
+import libflagship.ppppapi
+
+from revision import load_revision
+
+COUNT = 200000
+ACKS = 8
+RATE = 10000
+REPEAT = 3
+
+
+def bench_ack(ppppapi, count):
+    chan = ppppapi.Channel(1, cwnd=dict(initial=512, max=512))
+    chan.write(bytes(count * 1024), block=False)
+
+    elapsed = 0
+    while True:
+        indices = [pkt.index for pkt in chan.poll()]
+        if not indices:
+            break
+
+        start = time.perf_counter()
+        for n in range(0, len(indices), ACKS):
+            chan.rx_ack(indices[n:n + ACKS])
+        elapsed += time.perf_counter() - start
+
+    return elapsed / count
+
+
+def bench_drw(ppppapi, count):
+    chan = ppppapi.Channel(1)
+    rng = random.Random(1)
+    data = bytes(1024)
+
+    # swap neighbouring packets now and then
+    indices = [n & 0xFFFF for n in range(count)]
+    for n in range(0, count - 1, 8):
+        if rng.random() < 0.5:
+            indices[n], indices[n + 1] = indices[n + 1], indices[n]
+
+    start = time.perf_counter()
+    for n, index in enumerate(indices):
+        chan.rx_drw(index, data)
+        if n & 0xFF == 0:
+            chan.rx.read(len(chan.rx), timeout=0)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    modules = [("new", libflagship.ppppapi)]
+    if len(sys.argv) > 2:
+        modules.append((sys.argv[2], load_revision(sys.argv[2], "ppppapi")))
+
+    for name, ppppapi in modules:
+        ack = min(bench_ack(ppppapi, count) for _ in range(REPEAT))
+        drw = min(bench_drw(ppppapi, count) for _ in range(REPEAT))
+        print(f"{name:8} ack {ack * 1e6:5.2f}us/packet ({ack * RATE:6.2%} cpu at {RATE} packets/s), "
+              f"drw {drw * 1e6:5.2f}us/packet ({drw * RATE:6.2%} cpu)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+#
+# Benchmark for the generated pppp codecs: round-trips a sample of every
+# message type in MessageTypeTable through Message.parse() and pack().
+#
+# Pass a git revision to compare against the codecs generated at that
+# revision (e.g. one from before the templates switched to struct.Struct):
+#
+#   python bench-codec.py [count] [revision]
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import time
+import random
+import dataclasses
+
+import libflagship.pppp
+
+from revision import load_revision
+
+COUNT = 20000
+REPEAT = 5
+
+
+def sample(pppp, cls, rng):
+    """Build a message of type `cls` with random field values"""
+    kw = {}
+    for field in dataclasses.fields(cls):
+        if not field.init or field.kw_only:
+            continue
+
+        tp = field.type
+        name = getattr(tp, "__name__", str(tp))
+
+        if field.name in {"count", "numr"}:
+            kw[field.name] = rng.randrange(1, 8)
+        elif field.name == "acks":
+            kw[field.name] = [rng.randrange(0x10000) for _ in range(kw["count"])]
+        elif field.name == "relays":
+            kw[field.name] = [sample(pppp, pppp.Host, rng) for _ in range(kw["numr"])]
+        elif field.name in {"prefix", "check"}:
+            kw[field.name] = "EUPRAKM" if field.name == "prefix" else "ABCDE"
+        elif field.name == "data":
+            kw[field.name] = rng.randbytes(1024)
+        elif field.name == "key":
+            kw[field.name] = rng.randbytes(20)
+        elif name == "IPv4":
+            kw[field.name] = ".".join(str(rng.randrange(256)) for _ in range(4))
+        elif dataclasses.is_dataclass(tp):
+            kw[field.name] = sample(pppp, tp, rng)
+        elif issubclass(tp, pppp.IntType):
+            bits = tp.size * 8
+            lo = -(1 << bits - 1) if name.startswith("i") else 0
+            kw[field.name] = rng.randrange(lo, lo + (1 << bits))
+        else:
+            raise TypeError(f"{cls.__name__}.{field.name}: unsupported type {name}")
+
+    return cls(**kw)
+
+
+def bench(pppp, packets, repeat=REPEAT):
+    """Return the best parse and pack times, out of `repeat` runs"""
+    parse = pppp.Message.parse
+    parsed = packed = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        msgs = [parse(p)[0] for p in packets]
+        parsed = min(parsed, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for msg in msgs:
+            msg.pack()
+        packed = min(packed, time.perf_counter() - start)
+
+    return parsed, packed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    old = load_revision(sys.argv[2]) if len(sys.argv) > 2 else None
+    new = libflagship.pppp
+    rng = random.Random(1)
+
+    print(f"{'type':22} {'parse':>9} {'pack':>9}" + (f" {'old parse':>10} {'old pack':>9}" if old else ""))
+
+    for type, cls in new.MessageTypeTable.items():
+        packets = [sample(new, cls, rng).pack() for _ in range(100)] * (count // 100)
+
+        for p in packets[:100]:
+            msg = new.Message.parse(p)[0]
+            assert msg.pack() == p
+            if old:
+                assert repr(old.Message.parse(p)[0]) == repr(msg)
+
+        parsed, packed = bench(new, packets)
+        line = f"{type.name:22} {parsed / len(packets) * 1e6:7.2f}us {packed / len(packets) * 1e6:7.2f}us"
+
+        if old:
+            old_parsed, old_packed = bench(old, packets)
+            line += f" {old_parsed / len(packets) * 1e6:8.2f}us {old_packed / len(packets) * 1e6:7.2f}us"
+            line += f"  ({old_parsed / parsed:.1f}x / {old_packed / packed:.1f}x)"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+#
+# Benchmark for the pppp "curse" cipher, comparing the list-based
+# crypto_curse()/crypto_decurse() with the CurseCipher engine, over random
+# packets of realistic size (cursed pppp packets are 20 to 80 bytes).
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import time
+import random
+
+from libflagship.megajank import crypto_curse, crypto_decurse, pppp_curse, PPPP_SEED, PPPP_SHUFFLE
+
+COUNT = 1000000
+
+
+def bench(name, func, packets, count):
+    start = time.perf_counter()
+    res = [func(p) for p in packets]
+    elapsed = time.perf_counter() - start
+    print(f"{name:16}: {elapsed:7.2f}s ({count / elapsed:9.0f} packets/s)")
+    return res, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    rng = random.Random(1)
+    packets = [rng.randbytes(rng.randrange(20, 80)) for _ in range(count)]
+
+    ref, t0 = bench("crypto_decurse", lambda p: bytes(crypto_decurse(p, PPPP_SEED, PPPP_SHUFFLE)), packets, count)
+    res, t1 = bench("engine decurse", pppp_curse.decurse, packets, count)
+    assert res == ref
+    print(f"{'':16}  {t0 / t1:.2f}x faster")
+
+    ref, t0 = bench("crypto_curse", lambda p: bytes(crypto_curse(p, PPPP_SEED, PPPP_SHUFFLE)), packets, count)
+    res, t1 = bench("engine curse", pppp_curse.curse, packets, count)
+    assert res == ref
+    print(f"{'':16}  {t0 / t1:.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
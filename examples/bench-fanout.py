@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+#
+# Benchmark for service notification fan-out: a service publishes a stream of
+# notifications (like PPPPService does for every received frame) to a fast
+# subscriber, and a slow one (like a websocket to a browser on a bad
+# connection).
+#
+# Compares calling every handler from the publishing thread (as
+# Service.notify() did before) with per-subscriber queues and workers, for
+# the overflow policies that drop notifications. Reports the time spent in
+# notify(), the delivery latency of the fast subscriber, and how far the slow
+# one lags behind.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import time
+import logging
+import statistics
+
+from web.lib.service import Service
+
+COUNT = 2000
+INTERVAL = 0.0005
+SLOW = 0.005
+MAXSIZE = 64
+
+
+def percentiles(values):
+    values = sorted(values)
+    return statistics.median(values) * 1e3, values[int(len(values) * 0.99) - 1] * 1e3
+
+
+def publish(notify, count):
+    costs = []
+    for _ in range(count):
+        start = time.perf_counter()
+        notify(start)
+        costs.append(time.perf_counter() - start)
+        time.sleep(INTERVAL)
+    return costs
+
+
+def bench(mode, count):
+    svc = Service()
+    latencies = []
+
+    def fast(sent):
+        latencies.append(time.perf_counter() - sent)
+
+    def slow(sent):
+        time.sleep(SLOW)
+
+    if mode == "sync":
+        handlers = [fast, slow]
+        costs = publish(lambda data: [handler(data) for handler in handlers], count)
+        stats = None
+    else:
+        svc.subscribe(fast, maxsize=MAXSIZE, policy=mode)
+        sub = svc.subscribe(slow, maxsize=MAXSIZE, policy=mode)
+        costs = publish(svc.notify, count)
+        # let the fast subscriber catch up
+        time.sleep(0.1)
+        stats = sub.metrics()
+        for sub in list(svc.subscribers):
+            svc.unsubscribe(sub)
+
+    svc.shutdown()
+    return costs, latencies, stats
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+
+    # the slow subscriber is expected to drop notifications
+    logging.disable(logging.WARNING)
+
+    print(f"{'mode':12} {'notify med/p99':>16} {'fast latency med/p99':>22} {'slow dropped':>13} {'max lag':>9}")
+    for mode in ("sync", "drop-oldest", "drop-newest"):
+        costs, latencies, stats = bench(mode, count)
+        cost, cost99 = percentiles(costs)
+        lat, lat99 = percentiles(latencies)
+        dropped = f"{stats['dropped']:13}" if stats else f"{'-':>13}"
+        lag = f"{stats['max_lag'] * 1e3:7.1f}ms" if stats else f"{'-':>9}"
+        print(f"{mode:12} {cost:6.3f}/{cost99:6.3f}ms {lat:10.3f}/{lat99:7.3f}ms {dropped} {lag}")
+
+
+if __name__ == "__main__":
+    main()
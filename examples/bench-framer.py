@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+#
+# Benchmark for cutting a channel's byte stream into XZYH/AABB frames, after
+# every received DRW packet. Compares peeking at the reassembled stream (as
+# PPPPService did before) with the incremental StreamFramer.
+#
+# Two streams are used: video frames split into 1kb DRW packets, and small
+# replies (15-byte AABB file transfer replies and short json XZYH frames),
+# each in its own packet, like the printer sends them.
+#
+# Reports frames per second, and how many packets late frames are delivered
+# after their last byte arrived. Frames that are never delivered are counted
+# as stuck.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+
+from libflagship.framer import StreamFramer
+from libflagship.pppp import Xzyh, Aabb, P2PCmdType, FileTransfer
+from libflagship.ppppapi import Channel
+
+VIDEO_FRAMES = 2000
+FRAME_SIZES = [24000] + [4000] * 14
+REPLIES = 20000
+CHAN = 1
+REPEAT = 3
+
+
+def xzyh(payload, cmd):
+    return Xzyh(cmd=cmd, len=len(payload), unk0=0, unk1=0, chan=CHAN, sign_code=0, unk3=0, dev_type=0,
+                data=payload).pack()
+
+
+def video_stream(count):
+    """Return (packets, end) for `count` video frames, where end[n] is the packet completing frame n"""
+    data = bytearray()
+    ends = []
+    for n in range(count):
+        data += xzyh(os.urandom(FRAME_SIZES[n % len(FRAME_SIZES)]), P2PCmdType.APP_CMD_START_REALTIME_MEDIA)
+        ends.append((len(data) - 1) // 1024)
+
+    return [bytes(data[n:n + 1024]) for n in range(0, len(data), 1024)], ends
+
+
+def reply_stream(count):
+    packets = []
+    for n in range(count):
+        if n % 2:
+            aabb = Aabb(frametype=FileTransfer.REPLY, sn=0, pos=n * 1024, len=1)
+            packets.append(aabb.pack_with_crc(b"\x00"))
+        else:
+            packets.append(xzyh(b'{"commandType": 1009, "value": 0}', P2PCmdType.P2P_JSON_CMD))
+    return packets, list(range(count))
+
+
+def recv_peek(ch):
+    """Return the next frame, the way PPPPService._recv_frame() did"""
+    data = ch.peek(16, timeout=0)
+    if not data:
+        return None
+
+    if data[:4] == b"XZYH":
+        xzyh = Xzyh.parse(data)[0]
+        data = ch.read(xzyh.len + 16, timeout=0)
+        if not data:
+            return None
+        xzyh.data = bytes(data[16:])
+        return xzyh
+
+    aabb = Aabb.parse(data)[0]
+    # the service read the rest with a blocking read, stalling the receive
+    # loop until it arrived. it is always available in this benchmark.
+    data = ch.read(aabb.len + 14, timeout=0)
+    aabb, data = Aabb.parse_with_crc(bytes(data))[:2]
+    aabb.data = data
+    return aabb
+
+
+def run_peek(packets):
+    ch = Channel(CHAN)
+    emitted = []
+    for n, p in enumerate(packets):
+        ch.rx_drw(n & 0xffff, p)
+        while recv_peek(ch):
+            emitted.append(n)
+    return emitted
+
+
+def run_framer(packets):
+    ch = Channel(CHAN)
+    ch.framer = StreamFramer()
+    frames = ch.framer.frames
+    emitted = []
+    for n, p in enumerate(packets):
+        ch.rx_drw(n & 0xffff, p)
+        while frames:
+            frames.popleft()
+            emitted.append(n)
+    return emitted
+
+
+def measure(run, packets, ends):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        emitted = run(packets)
+        best = min(best, time.perf_counter() - start)
+
+    delays = [emit - end for emit, end in zip(emitted, ends)]
+    late = [d for d in delays if d]
+    return len(emitted) / best, len(late), max(delays, default=0), len(ends) - len(emitted)
+
+
+def main():
+    video = int(sys.argv[1]) if len(sys.argv) > 1 else VIDEO_FRAMES
+    streams = [("video", video_stream(video)), ("replies", reply_stream(REPLIES))]
+
+    print(f"{'stream':8} {'method':7} {'frames/s':>10} {'late':>6} {'max delay':>10} {'stuck':>6}")
+    for name, (packets, ends) in streams:
+        for method, run in (("peek", run_peek), ("framer", run_framer)):
+            rate, late, delay, stuck = measure(run, packets, ends)
+            print(f"{name:8} {method:7} {rate:10.0f} {late:6} {delay:7} pkt {stuck:6}")
+
+
+if __name__ == "__main__":
+    main()
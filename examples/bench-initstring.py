@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+#
+# Benchmark for pppp init string decoding, comparing the original O(n^2)
+# decoder with the current one, over a batch of random init strings.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import time
+import random
+
+from libflagship.megajank import pppp_decode_initstrings_raw, TestInitString
+
+COUNT = 10000
+ALPHABET = b"ABCDEFGHIJKLMNOP"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    rng = random.Random(1)
+
+    # real init strings are a few hundred characters long
+    inputs = [bytes(rng.choice(ALPHABET) for _ in range(rng.randrange(100, 400))) for _ in range(count)]
+
+    start = time.perf_counter()
+    expected = [TestInitString.decode_reference(input) for input in inputs]
+    reference = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pppp_decode_initstrings_raw(inputs)
+    current = time.perf_counter() - start
+
+    assert result == expected
+
+    print(f"reference: {reference:7.3f}s ({count / reference:10.0f} strings/s)")
+    print(f"current:   {current:7.3f}s ({count / current:10.0f} strings/s), {reference / current:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
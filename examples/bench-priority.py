@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+#
+# Benchmark for control command latency during a file upload: while a file
+# is uploaded on channel 1, small json commands are sent on channel 0, and
+# the time until each command is acknowledged is measured. Runs against a
+# local stand-in printer, with a simulated round-trip time.
+#
+# The in-flight budget of the lower priority channels can be given, with
+# "none" meaning no limit (the behaviour without a tx scheduler):
+#
+#   python bench-priority.py [size in MB] [budget]
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+import json
+import statistics
+
+from threading import Thread
+
+from libflagship.pppp import Duid, FileTransfer, P2PCmdType
+from libflagship.ppppapi import AnkerPPPPApi, PPPPState, FileUploadInfo
+
+import cli.util
+
+from pppp_standin import spawn, STANDIN_DUID
+
+SIZE = 4 * 1024 * 1024
+BLOCKSIZE = 32 * 1024
+WINDOW = 16
+COMMANDS = 40
+INTERVAL = 0.05
+RTT = 0.005
+
+
+def connect(port, **kwargs):
+    api = AnkerPPPPApi.open(Duid.from_string(STANDIN_DUID), "127.0.0.1", port, **kwargs)
+    api.connect_lan_search()
+    api.start()
+
+    while api.state != PPPPState.Connected:
+        time.sleep(0.01)
+
+    return api
+
+
+def upload(api, data, done):
+    fui = FileUploadInfo.from_data(data, "bench.gcode", user_name="bench", user_id="-", machine_id="-")
+
+    start = time.perf_counter()
+    api.send_xzyh(b"bench", cmd=P2PCmdType.P2P_SEND_FILE)
+    api.aabb_request(bytes(fui), frametype=FileTransfer.BEGIN)
+    for _ in api.aabb_upload(cli.util.split_chunks(data, BLOCKSIZE), window=WINDOW):
+        pass
+    done.append(time.perf_counter() - start)
+
+
+def commands(api, count):
+    cmd = json.dumps({"commandType": 1009, "value": 0}).encode()
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        api.send_xzyh(cmd, cmd=P2PCmdType.P2P_JSON_CMD, chan=0)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(INTERVAL)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:14}: median {statistics.median(latencies) * 1000:7.1f}ms, "
+          f"p95 {p95 * 1000:7.1f}ms, max {latencies[-1] * 1000:7.1f}ms")
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else SIZE
+    data = os.urandom(size)
+
+    sched_config = {}
+    if len(sys.argv) > 2:
+        sched_config["budget"] = None if sys.argv[2] == "none" else int(sys.argv[2])
+
+    proc, port = spawn(rtt=RTT)
+    api = connect(port, sched_config=sched_config)
+
+    report("idle", commands(api, COMMANDS // 4))
+
+    done = []
+    thread = Thread(target=upload, args=(api, data, done))
+    thread.start()
+    latencies = commands(api, COMMANDS)
+    thread.join()
+
+    report("during upload", latencies)
+    print(f"upload: {size / 1024**2 / done[0]:.2f} MB/s")
+
+    api.stop()
+    proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+#
+# Benchmark for the pppp receive path: DRW datagrams are received from a
+# local udp socket, parsed, and reassembled in a channel, which is then read
+# back. Compares the copying path (Message.parse()) with the zero-copy path
+# (Message.parse_from()), where payloads are memoryviews of the datagram.
+#
+# The api modes receive through AnkerPPPPAsyncApi, including sending ACKs
+# and polling the channels, either one datagram at a time (poll()) or in
+# batches (poll_batch()), received into a buffer pool.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+import socket
+
+from libflagship.pppp import Message, PktDrw, Duid
+from libflagship.ppppapi import Channel, AnkerPPPPAsyncApi, PPPPState, PPPP_MAX_DATAGRAM
+
+TOTAL = 20 * 1024 * 1024
+CHUNK = 1024
+BATCH = 64
+REPEAT = 3
+
+
+def recv_copy(sock):
+    data, addr = sock.recvfrom(PPPP_MAX_DATAGRAM)
+    return Message.parse(data)[0]
+
+
+def recv_zerocopy(sock):
+    data, addr = sock.recvfrom(PPPP_MAX_DATAGRAM)
+    return Message.parse_from(data)[0]
+
+
+def bench(recv, total):
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+    rx.settimeout(1.0)
+    rx.bind(("127.0.0.1", 0))
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx.connect(rx.getsockname())
+
+    count = total // CHUNK
+    payload = os.urandom(CHUNK)
+    chan = Channel(1)
+
+    elapsed = 0
+    for start in range(0, count, BATCH):
+        # send a batch, then time receiving it
+        for n in range(start, start + BATCH):
+            tx.send(PktDrw(chan=1, index=n & 0xffff, data=payload).pack())
+
+        t = time.perf_counter()
+        for _ in range(BATCH):
+            msg = recv(rx)
+            chan.rx_drw(msg.index, msg.data)
+        chan.rx.read(CHUNK * BATCH)
+        elapsed += time.perf_counter() - t
+
+    rx.close()
+    tx.close()
+    return count * CHUNK / elapsed
+
+
+def bench_api(batched, total):
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx.bind(("127.0.0.1", 0))
+
+    api = AnkerPPPPAsyncApi.open(Duid.from_string("EUPRAKM-000000-BENCH"), *tx.getsockname())
+    api.sock.bind(("127.0.0.1", 0))
+    api.state = PPPPState.Connected
+    tx.connect(api.sock.getsockname())
+
+    count = total // CHUNK
+    payload = os.urandom(CHUNK)
+    chan = api.chans[1]
+
+    elapsed = 0
+    for start in range(0, count, BATCH):
+        for n in range(start, start + BATCH):
+            tx.send(PktDrw(chan=1, index=n & 0xffff, data=payload).pack())
+
+        t = time.perf_counter()
+        received = 0
+        while received < BATCH:
+            if batched:
+                received += len(api.poll_batch(timeout=1.0))
+            else:
+                api.poll(timeout=1.0)
+                received += 1
+        chan.read(CHUNK * BATCH)
+        elapsed += time.perf_counter() - t
+
+    stats = api.rxstats
+    api.sock.close()
+    tx.close()
+    return count * CHUNK / elapsed, stats
+
+
+def main():
+    total = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else TOTAL
+
+    for name, recv in (("copy", recv_copy), ("zero-copy", recv_zerocopy)):
+        rate = max(bench(recv, total) for _ in range(REPEAT))
+        print(f"{name:10}: {rate / 1024**2:7.1f} MB/s")
+
+    for name, batched in (("api poll", False), ("api batch", True)):
+        rate, stats = max((bench_api(batched, total) for _ in range(REPEAT)), key=lambda res: res[0])
+        print(f"{name:10}: {rate / 1024**2:7.1f} MB/s, {stats.avg_batch:5.1f} packets per batch "
+              f"(max {stats.max_batch}), {stats.dropped} dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+#
+# Benchmark for the legacy pppp "simple" cipher, comparing the original
+# per-byte implementation with the lookup table versions (both the numpy and
+# the bytes.translate() decrypt paths), over several packet sizes.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import time
+import random
+
+import libflagship.megajank as megajank
+from libflagship.megajank import simple_decrypt, simple_encrypt, PPPP_SIMPLE_SEED, TestSimple
+
+COUNT = 20000
+SIZES = (16, 64, 256, 1024, 16384)
+
+
+def bench(func, packets):
+    start = time.perf_counter()
+    res = [func(PPPP_SIMPLE_SEED, p) for p in packets]
+    return res, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    rng = random.Random(1)
+    numpy = megajank.numpy
+
+    for size in SIZES:
+        packets = [rng.randbytes(size) for _ in range(max(count * 64 // size, 100))]
+        mb = len(packets) * size / 1024**2
+
+        ref, t_ref = bench(TestSimple.decrypt_reference, packets)
+
+        megajank.numpy = None
+        res, t_translate = bench(simple_decrypt, packets)
+        assert res == ref
+
+        line = f"{size:6} bytes: decrypt {mb / t_ref:7.2f} MB/s -> translate {mb / t_translate:8.2f} MB/s"
+
+        if numpy is not None:
+            megajank.numpy = numpy
+            megajank.SIMPLE_NUMPY_MIN = 0
+            res, t_numpy = bench(simple_decrypt, packets)
+            assert res == ref
+            line += f", numpy {mb / t_numpy:8.2f} MB/s"
+
+        ref, t_ref = bench(TestSimple.encrypt_reference, packets)
+        res, t_lut = bench(simple_encrypt, packets)
+        assert res == ref
+        line += f"; encrypt {mb / t_ref:6.2f} MB/s -> lut {mb / t_lut:6.2f} MB/s"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
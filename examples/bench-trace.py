@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Benchmark for pppp packet tracing on the video receive path: DRW packets
+# are decoded and processed by the api (including sending DRW_ACKs), with
+# packet tracing disabled, sampled, and enabled for every packet.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+import socket
+import logging
+
+from libflagship.pkttrace import PacketTracer
+from libflagship.pppp import Duid, PktDrw
+from libflagship.ppppapi import AnkerPPPPAsyncApi, PPPPState
+
+COUNT = 50000
+CHAN = 1
+REPEAT = 3
+
+
+def receive(api, packets):
+    start = time.perf_counter()
+    for p in packets:
+        msg = api._decode(p, api.addr)
+        api.process(msg)
+        api.chans[CHAN].read(len(msg.data), timeout=0)
+    return len(packets) / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    payload = os.urandom(1024)
+
+    # ACKs are sent to a socket nobody reads from
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+
+    # trace into a logger that discards everything, so only the cost of
+    # deciding and formatting is measured
+    logger = logging.getLogger("bench-trace")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    modes = [
+        ("disabled", logging.INFO, {}),
+        ("sampled", logging.DEBUG, dict(sample=1000)),
+        ("filtered", logging.DEBUG, dict(chans={CHAN + 1})),
+        ("all", logging.DEBUG, {}),
+    ]
+
+    for name, level, config in modes:
+        logger.setLevel(level)
+        best = 0
+        for _ in range(REPEAT):
+            api = AnkerPPPPAsyncApi.open(Duid.from_string("EUPRAKM-000000-BENCH"), *sink.getsockname())
+            api.state = PPPPState.Connected
+            api.set_tracer(PacketTracer(logger, **config))
+
+            packets = [PktDrw(chan=CHAN, index=n & 0xffff, data=payload).pack() for n in range(count)]
+            best = max(best, receive(api, packets))
+            api.sock.close()
+
+        print(f"{name:10}: {best:8.0f} packets/s")
+
+
+if __name__ == "__main__":
+    main()
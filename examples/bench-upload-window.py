@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Benchmark for pipelined file upload: measures upload throughput for a range
+# of window sizes, against a local stand-in printer simulating the round-trip
+# time of a LAN.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+
+from libflagship.pppp import Duid, FileTransfer, P2PCmdType
+from libflagship.ppppapi import AnkerPPPPApi, PPPPState, FileUploadInfo
+
+import cli.util
+
+from pppp_standin import spawn, STANDIN_DUID
+
+SIZE = 4 * 1024 * 1024
+RTT = 0.005
+WINDOWS = (1, 2, 4, 8, 16)
+BLOCKSIZES = (16 * 1024, 32 * 1024, 64 * 1024)
+
+
+def connect(port):
+    api = AnkerPPPPApi.open(Duid.from_string(STANDIN_DUID), "127.0.0.1", port)
+    api.connect_lan_search()
+    api.start()
+
+    while api.state != PPPPState.Connected:
+        time.sleep(0.01)
+
+    return api
+
+
+def upload(api, data, blocksize, window):
+    fui = FileUploadInfo.from_data(data, "bench.gcode", user_name="bench", user_id="-", machine_id="-")
+
+    api.send_xzyh(b"bench", cmd=P2PCmdType.P2P_SEND_FILE)
+    api.aabb_request(bytes(fui), frametype=FileTransfer.BEGIN)
+    for _ in api.aabb_upload(cli.util.split_chunks(data, blocksize), window=window):
+        pass
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else SIZE
+    rtt = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else RTT
+    data = os.urandom(size)
+
+    print(f"uploading {size / 1024**2:.0f} MB, simulated rtt {rtt * 1000:.1f}ms")
+    proc, port = spawn(rtt=rtt)
+
+    for blocksize in BLOCKSIZES:
+        for window in WINDOWS:
+            api = connect(port)
+
+            start = time.perf_counter()
+            upload(api, data, blocksize, window)
+            elapsed = time.perf_counter() - start
+
+            print(f"chunk {blocksize // 1024:3}kb, window {window:2}: {size / 1024**2 / elapsed:6.2f} MB/s")
+
+            api.stop()
+
+    proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
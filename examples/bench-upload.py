@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+#
+# Benchmark for pppp file upload throughput, against a local stand-in printer
+# dropping a fraction of all DRW and DRW_ACK packets.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+
+from libflagship.pppp import Duid, FileTransfer, P2PCmdType
+from libflagship.ppppapi import AnkerPPPPApi, PPPPState, FileUploadInfo
+
+import cli.util
+
+from pppp_standin import spawn, STANDIN_DUID
+
+SIZE = 8 * 1024 * 1024
+BLOCKSIZE = 32 * 1024
+
+
+def connect(port):
+    api = AnkerPPPPApi.open(Duid.from_string(STANDIN_DUID), "127.0.0.1", port)
+    api.connect_lan_search()
+    api.start()
+
+    while api.state != PPPPState.Connected:
+        time.sleep(0.01)
+
+    return api
+
+
+def upload(api, data):
+    fui = FileUploadInfo.from_data(data, "bench.gcode", user_name="bench", user_id="-", machine_id="-")
+
+    api.send_xzyh(b"bench", cmd=P2PCmdType.P2P_SEND_FILE)
+    api.aabb_request(bytes(fui), frametype=FileTransfer.BEGIN)
+    for pos, chunk in cli.util.split_chunks(data, BLOCKSIZE):
+        api.aabb_request(chunk, frametype=FileTransfer.DATA, pos=pos)
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else SIZE
+    data = os.urandom(size)
+
+    for loss in (0.0, 0.01, 0.05):
+        proc, port = spawn(loss=loss, seed=1)
+        api = connect(port)
+
+        start = time.perf_counter()
+        upload(api, data)
+        elapsed = time.perf_counter() - start
+
+        stats = api.chans[1].stats
+        print(f"loss {loss:4.0%}: {size / 1024**2 / elapsed:6.2f} MB/s, "
+              f"{stats.retransmits} of {stats.transmits} packets retransmitted, "
+              f"srtt {api.chans[1].rtt.srtt * 1000:.2f}ms, cwnd {api.chans[1].cwnd.size}")
+
+        api.stop()
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
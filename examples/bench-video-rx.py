@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#
+# Benchmark for the video receive path: a stream of XZYH video frames is split
+# into DRW packets, which are parsed, reassembled in a channel, and cut back
+# into frames the same way PPPPService.worker_run() does it.
+#
+# Reports packets per second, and the memory held by each parsed DRW packet
+# and XZYH frame header. Pass a git revision to compare against the codecs
+# generated at that revision (e.g. one from before slotted dataclasses):
+#
+#   python bench-video-rx.py [frames] [revision]
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+import tracemalloc
+
+import libflagship.pppp
+from libflagship.ppppapi import Channel
+
+from revision import load_revision
+
+FRAMES = 2000
+FRAME_SIZES = [24000] + [4000] * 14
+CHAN = 1
+REPEAT = 3
+
+
+def stream(pppp, frames):
+    """Return the DRW datagrams carrying `frames` video frames"""
+    data = bytearray()
+    for n in range(frames):
+        payload = os.urandom(FRAME_SIZES[n % len(FRAME_SIZES)])
+        xzyh = pppp.Xzyh(
+            magic=b"XZYH", cmd=pppp.P2PCmdType.APP_CMD_START_REALTIME_MEDIA, len=len(payload), unk0=0, unk1=0, chan=CHAN,
+            sign_code=0, unk3=0, dev_type=0, data=payload,
+        )
+        data += xzyh.pack()
+
+    return [
+        pppp.PktDrw(chan=CHAN, index=(n // 1024) & 0xffff, data=data[n:n + 1024]).pack()
+        for n in range(0, len(data), 1024)
+    ]
+
+
+def receive(pppp, packets):
+    """Receive `packets` on a fresh channel, returning the number of frames"""
+    parse = getattr(pppp.Message, "parse_from", pppp.Message.parse)
+    chan = Channel(CHAN)
+    frames = 0
+
+    for p in packets:
+        msg = parse(p)[0]
+        chan.rx_drw(msg.index, msg.data)
+
+        while (hdr := chan.peek(16, timeout=0)):
+            xzyh = pppp.Xzyh.parse(hdr)[0]
+            data = chan.read(xzyh.len + 16, timeout=0)
+            if not data:
+                break
+            xzyh.data = bytes(data[16:])
+            frames += 1
+
+    return frames
+
+
+def footprint(build, count):
+    """Return the memory held per object, keeping `count` results of build()"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [build(n) for n in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return (after - before) / count
+
+
+def measure(pppp, packets):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        frames = receive(pppp, packets)
+        best = min(best, time.perf_counter() - start)
+
+    parse = getattr(pppp.Message, "parse_from", pppp.Message.parse)
+    hdr = packets[0][8:24]
+    drw = footprint(lambda n: parse(packets[n])[0], len(packets))
+    xzyh = footprint(lambda n: pppp.Xzyh.parse(hdr)[0], len(packets))
+
+    return frames, len(packets) / best, drw, xzyh
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    modules = [("new", libflagship.pppp)]
+    if len(sys.argv) > 2:
+        modules.append((sys.argv[2], load_revision(sys.argv[2])))
+
+    packets = stream(libflagship.pppp, frames)
+    print(f"{len(packets)} packets, {frames} frames")
+    print(f"{'codec':10} {'packets/s':>10} {'DRW bytes':>10} {'XZYH bytes':>11}")
+
+    for name, pppp in modules:
+        count, rate, drw, xzyh = measure(pppp, packets)
+        assert count == frames
+        print(f"{name:10} {rate:10.0f} {drw:10.1f} {xzyh:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+#
+# Benchmark for distributing live video to several viewers. A synthetic H.264
+# stream (a keyframe every 15 frames), chunked arbitrarily like the XZYH
+# payloads from the printer, is published to one viewer that keeps up, and a
+# number of stalled viewers that never read.
+#
+# "queue" emulates a multiprocessing.Queue per viewer (as stream() used
+# before): every chunk is pickled once per viewer, and queued without limit.
+# "hub" parses the stream into access units once, into a shared VideoHub.
+#
+# Reports chunks per second, and the memory held at the end.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+import random
+import pickle
+import tracemalloc
+
+from collections import deque
+from queue import Empty
+
+from libflagship.h264 import AccessUnitParser, START_CODE
+from web.lib.videohub import VideoHub
+
+FRAMES = 3000
+GOP = 15
+IDR_SIZE = 24000
+P_SIZE = 4000
+STALLED = (0, 4, 16)
+
+
+def payload(nal_header, size):
+    # random data, without anything that looks like a start code
+    return nal_header + os.urandom(size).replace(b"\x00", b"\x01")
+
+
+def stream(frames):
+    sps = payload(b"\x67", 12)
+    pps = payload(b"\x68", 4)
+    data = bytearray()
+    for n in range(frames):
+        if n % GOP == 0:
+            data += START_CODE + sps + START_CODE + pps + START_CODE + payload(b"\x65\x88", IDR_SIZE)
+        else:
+            data += START_CODE + payload(b"\x41\x9a", P_SIZE)
+
+    rng = random.Random(1)
+    chunks = []
+    pos = 0
+    while pos < len(data):
+        size = rng.randrange(1024, 8192)
+        chunks.append(bytes(data[pos:pos + size]))
+        pos += size
+    return chunks
+
+
+def run_queue(chunks, stalled):
+    queues = [deque() for _ in range(stalled + 1)]
+    for chunk in chunks:
+        for q in queues:
+            q.append(pickle.dumps(chunk))
+        # the first viewer keeps up
+        while queues[0]:
+            pickle.loads(queues[0].popleft())
+    return queues
+
+
+def run_hub(chunks, stalled):
+    parser = AccessUnitParser()
+    hub = VideoHub()
+    viewers = [hub.join() for _ in range(stalled + 1)]
+    for chunk in chunks:
+        for au in parser.feed(chunk):
+            hub.publish(au)
+        try:
+            while True:
+                viewers[0].get(timeout=0).annexb
+        except Empty:
+            pass
+    return hub, viewers
+
+
+def measure(run, chunks, stalled):
+    start = time.perf_counter()
+    run(chunks, stalled)
+    rate = len(chunks) / (time.perf_counter() - start)
+
+    tracemalloc.start()
+    keep = run(chunks, stalled)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return rate, held
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    chunks = stream(frames)
+    print(f"{len(chunks)} chunks, {sum(map(len, chunks)) / 1024**2:.1f} MB, {frames} frames")
+    print(f"{'method':6} {'stalled':>7} {'chunks/s':>10} {'held MB':>9}")
+
+    for stalled in STALLED:
+        for name, run in (("queue", run_queue), ("hub", run_hub)):
+            rate, held = measure(run, chunks, stalled)
+            print(f"{name:6} {stalled:7} {rate:10.0f} {held / 1024**2:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
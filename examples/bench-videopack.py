@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+#
+# Benchmark for the server side of /ws/video: turning the video stream into
+# websocket messages. A captured H.264 stream (an Annex B file, e.g. saved
+# from /video) is cut into chunks, and run through the same path as the
+# video service, as fast as possible. Websocket frames are encoded with
+# wsproto, as flask-sock does.
+#
+# Without a capture, a synthetic stream is used, with a SEI message before
+# every picture, and parameter sets before every keyframe. Like many cameras
+# do, every NAL unit arrives in its own chunk.
+#
+# Compares forwarding every chunk as it arrives (as /ws/video did before),
+# with sending packed access units, one per message, and batched. The
+# client reads after every `every` chunks (1 keeps up, higher values are a
+# client that is busy, e.g. a tablet).
+#
+# Reports frames per second, messages per frame, and bytes sent per byte
+# of video.
+#
+# Usage: bench-videopack.py [capture.h264] [frames]
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+
+from queue import Empty
+
+from wsproto.frame_protocol import FrameProtocol
+
+from libflagship.h264 import AccessUnitParser, NalParser, START_CODE
+from web.lib.videohub import VideoHub, Packetizer
+
+FRAMES = 3000
+GOP = 30
+IDR_SIZE = 24000
+P_SIZE = 4000
+REPEAT = 3
+
+
+def payload(nal_header, size):
+    # random data, without anything that looks like a start code
+    return nal_header + os.urandom(size).replace(b"\x00", b"\x01")
+
+
+def synthetic(frames):
+    sps = payload(b"\x67", 12)
+    pps = payload(b"\x68", 4)
+    sei = payload(b"\x06\x05", 24)
+    for n in range(frames):
+        if n % GOP == 0:
+            yield from (sps, pps, sei, payload(b"\x65\x88", IDR_SIZE))
+        else:
+            yield from (sei, payload(b"\x41\x9a", P_SIZE))
+
+
+def captured(path):
+    parser = NalParser()
+    with open(path, "rb") as fd:
+        return parser.feed(fd.read()) + parser.flush()
+
+
+def run_chunks(chunks, every):
+    proto = FrameProtocol(client=False, extensions=[])
+    sent = messages = 0
+    for chunk in chunks:
+        sent += len(proto.send_data(chunk, fin=True))
+        messages += 1
+    return messages, sent
+
+
+def run_packed(chunks, every, batch):
+    proto = FrameProtocol(client=False, extensions=[])
+    parser = AccessUnitParser()
+    hub = VideoHub()
+    viewer = hub.join()
+    packer = Packetizer()
+    sent = messages = 0
+
+    def drain():
+        nonlocal sent, messages
+        try:
+            while True:
+                units = viewer.get_many(timeout=0, max_bytes=batch) if batch else [viewer.get(timeout=0)]
+                sent += len(proto.send_data(packer.pack(units), fin=True))
+                messages += 1
+        except Empty:
+            pass
+
+    for n, chunk in enumerate(chunks):
+        for au in parser.feed(chunk, time.monotonic()):
+            hub.publish(au)
+        if n % every == 0:
+            drain()
+
+    for au in parser.flush(time.monotonic()):
+        hub.publish(au)
+    drain()
+    return messages, sent
+
+
+def main():
+    args = sys.argv[1:]
+    path = args.pop(0) if args and not args[0].isdigit() else None
+    frames = int(args[0]) if args else FRAMES
+    nals = captured(path) if path else list(synthetic(frames))
+    chunks = [START_CODE + nal for nal in nals]
+    video = sum(map(len, chunks))
+    frames = len(AccessUnitParser().feed(b"".join(chunks))) + 1
+
+    print(f"{len(chunks)} chunks, {frames} frames, {video / 1024**2:.1f} MB")
+    print(f"{'method':8} {'every':>5} {'frames/s':>10} {'msgs/frame':>11} {'bytes sent':>11}")
+
+    methods = [
+        ("chunks", run_chunks),
+        ("units", lambda chunks, every: run_packed(chunks, every, None)),
+        ("batched", lambda chunks, every: run_packed(chunks, every, 64 * 1024)),
+    ]
+    for every in (1, 16):
+        for name, run in methods:
+            best = float("inf")
+            for _ in range(REPEAT):
+                start = time.perf_counter()
+                messages, sent = run(chunks, every)
+                best = min(best, time.perf_counter() - start)
+            print(f"{name:8} {every:5} {frames / best:10.0f} {messages / frames:11.2f} {sent / video:11.4f}")
+
+
+if __name__ == "__main__":
+    main()
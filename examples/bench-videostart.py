@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+#
+# Benchmark for the time it takes a new video viewer to receive its first
+# decodable frame. A recorded H.264 stream (an Annex B file, e.g. saved from
+# /video) is replayed in real time, through the same parser and hub that the
+# video service uses. Viewers join at random moments during the replay.
+#
+# Without a recording, a synthetic stream is used (a keyframe every GOP
+# frames).
+#
+# Compares starting new viewers at the next keyframe (as the video service
+# did before), with starting them at the cached latest keyframe.
+#
+# Usage: bench-videostart.py [recording.h264] [seconds]
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+import random
+import statistics
+
+from threading import Thread
+
+from libflagship.h264 import AccessUnitParser, START_CODE
+from web.lib.videohub import VideoHub
+
+FPS = 15
+GOP = 30
+IDR_SIZE = 24000
+P_SIZE = 4000
+SECONDS = 10
+VIEWERS = 40
+
+
+class NextKeyframeHub(VideoHub):
+    """Starts new viewers at the next keyframe"""
+
+    def join(self):
+        viewer = super().join()
+        with self.cond:
+            viewer.cursor = self.end
+        return viewer
+
+
+def payload(nal_header, size):
+    # random data, without anything that looks like a start code
+    return nal_header + os.urandom(size).replace(b"\x00", b"\x01")
+
+
+def synthetic(frames):
+    sps = payload(b"\x67", 12)
+    pps = payload(b"\x68", 4)
+    for n in range(frames):
+        if n % GOP == 0:
+            yield START_CODE + sps + START_CODE + pps + START_CODE + payload(b"\x65\x88", IDR_SIZE)
+        else:
+            yield START_CODE + payload(b"\x41\x9a", P_SIZE)
+
+
+def recorded(path):
+    parser = AccessUnitParser()
+    with open(path, "rb") as fd:
+        units = parser.feed(fd.read()) + parser.flush()
+    return [au.annexb for au in units]
+
+
+def replay(frames, hubs, seconds):
+    parsers = [AccessUnitParser() for _ in hubs]
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for n, frame in enumerate(frames):
+        if n >= seconds * FPS:
+            break
+        time.sleep(max(0, start + n / FPS - time.perf_counter()))
+        # cut into chunks, like the XZYH payloads from the printer
+        pos = 0
+        while pos < len(frame):
+            size = rng.randrange(1024, 8192)
+            for parser, hub in zip(parsers, hubs):
+                for au in parser.feed(frame[pos:pos + size]):
+                    hub.publish(au)
+            pos += size
+
+    for hub in hubs:
+        hub.close()
+
+
+def first_frame(hub, results):
+    start = time.perf_counter()
+    viewer = hub.join()
+    try:
+        au = viewer.get(timeout=SECONDS * 2)
+    except EOFError:
+        return
+    finally:
+        viewer.close()
+    assert au.keyframe
+    results.append(time.perf_counter() - start)
+
+
+def main():
+    args = sys.argv[1:]
+    path = args.pop(0) if args and not args[0].isdigit() else None
+    seconds = int(args[0]) if args else SECONDS
+    frames = recorded(path) if path else list(synthetic(seconds * FPS))
+    seconds = min(seconds, len(frames) // FPS)
+
+    hubs = {"next": NextKeyframeHub(), "cached": VideoHub()}
+    results = {name: [] for name in hubs}
+
+    publisher = Thread(target=replay, args=(frames, list(hubs.values()), seconds))
+    publisher.start()
+
+    rng = random.Random(2)
+    threads = []
+    start = time.perf_counter()
+    # leave time for the last viewers to see a keyframe
+    for at in sorted(rng.uniform(0.5, seconds - 3) for _ in range(VIEWERS)):
+        time.sleep(max(0, start + at - time.perf_counter()))
+        for name, hub in hubs.items():
+            thread = Thread(target=first_frame, args=(hub, results[name]))
+            thread.start()
+            threads.append(thread)
+
+    for thread in threads:
+        thread.join()
+    publisher.join()
+
+    print(f"{len(frames)} frames at {FPS} fps, {VIEWERS} viewers")
+    print(f"{'start at':8} {'first frame med':>16} {'p95':>10} {'max':>10}")
+    for name, values in results.items():
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1]
+        print(f"{name:8} {statistics.median(values) * 1e3:14.3f}ms {p95 * 1e3:8.3f}ms {values[-1] * 1e3:8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
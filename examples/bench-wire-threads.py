@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+#
+# Benchmark for Wire delivery backends: a producer thread writes chunks (like
+# the pppp thread does in Channel.rx_drw()), while the consumer reads them back.
+#
+# Throughput is measured with the producer running freely. Latency is measured
+# one chunk at a time, so it is not dominated by chunks queued up in the wire.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+import struct
+
+from threading import Thread, Semaphore
+
+from libflagship.ppppapi import Wire, PipeWire
+
+TOTAL = 50 * 1024 * 1024
+CHUNK = 1024
+SAMPLES = 10000
+
+
+def produce(wire, count, payload, window=None):
+    for _ in range(count):
+        if window:
+            window.acquire()
+        wire.write(struct.pack("<Q", time.perf_counter_ns()) + payload)
+
+
+def bench_throughput(wire, total):
+    count = total // CHUNK
+    producer = Thread(target=produce, args=(wire, count, os.urandom(CHUNK - 8)))
+
+    start = time.perf_counter()
+    producer.start()
+    for _ in range(count):
+        wire.read(CHUNK)
+    elapsed = time.perf_counter() - start
+    producer.join()
+
+    return count * CHUNK / elapsed
+
+
+def bench_latency(wire, count):
+    window = Semaphore(1)
+    producer = Thread(target=produce, args=(wire, count, os.urandom(CHUNK - 8), window))
+    latency = []
+
+    producer.start()
+    for _ in range(count):
+        data = wire.read(CHUNK)
+        latency.append(time.perf_counter_ns() - struct.unpack("<Q", data[:8])[0])
+        window.release()
+    producer.join()
+
+    latency.sort()
+    return latency
+
+
+def main():
+    total = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else TOTAL
+
+    for name, wire in (("thread", Wire), ("pipe", PipeWire)):
+        rate = bench_throughput(wire(), total)
+        latency = bench_latency(wire(), SAMPLES)
+        avg = sum(latency) / len(latency) / 1000
+        p50 = latency[len(latency) // 2] / 1000
+        p99 = latency[len(latency) * 99 // 100] / 1000
+        print(f"{name:6}: {rate / 1024**2:7.1f} MB/s, "
+              f"latency avg {avg:8.1f}us p50 {p50:8.1f}us p99 {p99:8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
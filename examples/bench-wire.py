@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+#
+# Micro-benchmark for the pppp receive path: pushes synthetic DRW payloads
+# through Channel.rx_drw() and reads them back out with Channel.read(), the
+# same way recv_xzyh() consumes a video stream.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import os
+import time
+import random
+
+from libflagship.ppppapi import Channel
+
+TOTAL = 50 * 1024 * 1024
+CHUNK = 1024
+FRAME = 32 * CHUNK
+
+
+def bench(total, shuffle):
+    ch = Channel(1)
+    payload = os.urandom(CHUNK)
+    frames = total // FRAME
+    index = 0
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        indices = [(index + n) & 0xFFFF for n in range(FRAME // CHUNK)]
+        index += len(indices)
+
+        # deliver packets slightly out of order, to exercise the rxqueue
+        if shuffle:
+            random.shuffle(indices)
+
+        for idx in indices:
+            ch.rx_drw(idx, payload)
+
+        # read back a 16-byte header, followed by the frame body
+        hdr = ch.read(16)
+        body = ch.read(FRAME - 16)
+        assert len(hdr) + len(body) == FRAME
+    elapsed = time.perf_counter() - start
+
+    return frames * FRAME, elapsed
+
+
+def main():
+    total = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else TOTAL
+
+    for shuffle in (False, True):
+        size, elapsed = bench(total, shuffle)
+        order = "reordered" if shuffle else "in-order"
+        print(f"{order:10}: {size / 1024**2:.0f} MB in {elapsed:.2f}s ({size / 1024**2 / elapsed:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# Local stand-in for a printer, speaking just enough pppp to accept a lan
+# connection and file uploads. Useful for benchmarking the pppp stack without
+# a printer, optionally with simulated packet loss and round-trip time.
+#
+# Run standalone, or use spawn() to start it in a separate process.
+#
+
+import sys             # nopep8
+sys.path.append("..")  # nopep8
+
+import time
+import heapq
+import socket
+import random
+import logging as log
+
+from multiprocessing import Process, Pipe
+
+from libflagship.pppp import Type, Duid, Aabb, Xzyh, FileTransferReply, PktPunchPkt, PktP2pRdy
+from libflagship.ppppapi import AnkerPPPPAsyncApi, PPPPState, Channel, TxScheduler
+
+STANDIN_DUID = "EUPRAKM-000000-STAND"
+
+# handshake packets are never dropped, to keep connection setup deterministic
+LOSSY_TYPES = {Type.DRW, Type.DRW_ACK}
+
+
+class StandinPrinter(AnkerPPPPAsyncApi):
+
+    def __init__(self, sock, duid, loss=0.0, rtt=0.0, seed=None, **kwargs):
+        super().__init__(sock, duid, **kwargs)
+        self.state = PPPPState.Connected
+        self.loss = loss
+        self.rtt = rtt
+        self.random = random.Random(seed)
+        self.frames = 0
+        self.delayed = []
+
+    @classmethod
+    def bind(cls, host="127.0.0.1", port=0, **kwargs):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, port))
+        return cls(sock, Duid.from_string(STANDIN_DUID), **kwargs)
+
+    @property
+    def port(self):
+        return self.sock.getsockname()[1]
+
+    def _lost(self, pkt):
+        return pkt.type in LOSSY_TYPES and self.random.random() < self.loss
+
+    def send(self, pkt, addr=None):
+        if self.addr is None or self._lost(pkt):
+            return
+        super().send(pkt, addr)
+
+    def _sendto(self, data, addr):
+        # simulate round-trip time by holding back all outgoing datagrams
+        if self.rtt:
+            heapq.heappush(self.delayed, (time.monotonic() + self.rtt, id(data), data, addr))
+        else:
+            super()._sendto(data, addr)
+
+    def _flush_delayed(self):
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, data, addr = heapq.heappop(self.delayed)
+            super()._sendto(data, addr)
+
+        if self.delayed:
+            return max(self.delayed[0][0] - now, 0.001)
+        return 0.01
+
+    def process(self, msg):
+        if self._lost(msg):
+            return
+
+        if msg.type == Type.LAN_SEARCH:
+            self.send(PktPunchPkt(duid=self.duid))
+
+        elif msg.type == Type.P2P_RDY:
+            self.send(PktP2pRdy(duid=self.duid))
+
+        elif msg.type == Type.CLOSE:
+            # start over with fresh channels for the next session
+            self.chans = [Channel(n) for n in range(8)]
+            self.scheduler = TxScheduler(self.chans)
+
+        else:
+            super().process(msg)
+
+    def _handle_xzyh(self, ch):
+        while hdr := ch.peek(16, timeout=0):
+            xzyh = Xzyh.parse(hdr)[0]
+            if not ch.read(xzyh.len + 16, timeout=0):
+                return
+            self.frames += 1
+
+    def _handle_aabb(self, ch):
+        while hdr := ch.peek(12, timeout=0):
+            aabb = Aabb.parse(hdr)[0]
+            if not ch.read(aabb.len + 14, timeout=0):
+                return
+            self.frames += 1
+
+            reply = bytes([FileTransferReply.OK])
+            self.send_aabb(reply, frametype=aabb.frametype, pos=aabb.pos, chan=ch.index, block=False)
+
+    def serve_forever(self):
+        while True:
+            self.poll(timeout=min(self._flush_delayed(), 0.01))
+            self._handle_xzyh(self.chans[0])
+            self._handle_aabb(self.chans[1])
+
+
+def _serve(conn, **kwargs):
+    printer = StandinPrinter.bind(**kwargs)
+    conn.send(printer.port)
+    printer.serve_forever()
+
+
+def spawn(**kwargs):
+    """Start a stand-in printer in a separate process, returning (process, port)"""
+    rx, tx = Pipe(False)
+    proc = Process(target=_serve, args=(tx,), kwargs=kwargs, daemon=True)
+    proc.start()
+    return proc, rx.recv()
+
+
+if __name__ == "__main__":
+    log.basicConfig(level=log.INFO)
+
+    loss = float(sys.argv[1]) if len(sys.argv) > 1 else 0.0
+    rtt = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    printer = StandinPrinter.bind(loss=loss, rtt=rtt)
+    log.info(f"Stand-in printer {STANDIN_DUID} listening on 127.0.0.1:{printer.port} (loss {loss:.1%}, rtt {rtt}s)")
+    printer.serve_forever()
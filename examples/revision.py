@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+#
+# Helper for benchmarks, to import libflagship modules as they were at an
+# earlier git revision, for side-by-side comparisons with the working tree.
+#
+
+import sys
+import os
+import tempfile
+import importlib
+import subprocess
+
+
+def load_revision(rev, module="pppp"):
+    """Import libflagship.`module` as it was at git revision `rev`"""
+    root = tempfile.mkdtemp()
+    pkg = os.path.join(root, "oldflagship")
+    os.mkdir(pkg)
+
+    # modules importing libflagship.* by absolute name still get the
+    # current version of those
+    names = subprocess.check_output(["git", "ls-tree", "--name-only", rev, "libflagship/"], cwd="..")
+    for name in names.decode().split():
+        if not name.endswith(".py"):
+            continue
+        src = subprocess.check_output(["git", "show", f"{rev}:{name}"], cwd="..")
+        with open(os.path.join(pkg, os.path.basename(name)), "wb") as fd:
+            fd.write(src)
+
+    sys.path.insert(0, root)
+    return importlib.import_module(f"oldflagship.{module}")
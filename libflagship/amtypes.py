@@ -21,6 +21,12 @@ def parse(cls, p, num):
         _assert_equal(set(body) - {0}, set())
         return body, p[num:]
 
+    @classmethod
+    def parse_from(cls, p, offset, num):
+        body = bytes(p[offset:offset+num])
+        _assert_equal(set(body) - {0}, set())
+        return body, offset + num
+
     def pack(self, num):
         return b"\x00" * num
 
@@ -29,6 +35,10 @@ class Bytes(bytes):
     def parse(cls, p, size):
         return p[:size], p[size:]
 
+    @classmethod
+    def parse_from(cls, p, offset, size):
+        return memoryview(p)[offset:offset+size], offset + size
+
     def pack(self, size):
         return self
 
@@ -39,19 +49,47 @@ def parse(cls, p, size):
         _assert_equal(body[-1], 0)
         return body[:-1].decode(), p
 
+    @classmethod
+    def parse_from(cls, p, offset, size):
+        body = bytes(p[offset:offset+size])
+        _assert_equal(body[-1], 0)
+        return body[:-1].decode(), offset + size
+
     def pack(self, size):
         return self[:size-1].ljust(size, '\x00').encode()
 
 class Array:
     @classmethod
     def parse(cls, p, elem, num):
+        if issubclass(elem, IntType):
+            # unpack all integers at once
+            fmt = f"{elem.fmt[0]}{num}{elem.fmt[1]}"
+            res = list(struct.unpack_from(fmt, p))
+            return res, p[elem.size * num:]
+
         res = []
         for _ in range(num):
             item, p = elem.parse(p)
             res.append(item)
         return res, p
 
+    @classmethod
+    def parse_from(cls, p, offset, elem, num):
+        if issubclass(elem, IntType):
+            fmt = f"{elem.fmt[0]}{num}{elem.fmt[1]}"
+            res = list(struct.unpack_from(fmt, p, offset))
+            return res, offset + elem.size * num
+
+        res = []
+        for _ in range(num):
+            item, offset = elem.parse_from(p, offset)
+            res.append(item)
+        return res, offset
+
     def pack(self, cls, num):
+        if issubclass(cls, IntType):
+            return struct.pack(f"{cls.fmt[0]}{len(self)}{cls.fmt[1]}", *self)
+
         return b"".join(cls.pack(e) for e in self)
 
 class IPv4(str):
@@ -60,6 +98,11 @@ def parse(cls, p):
         addr = p[:4][::-1]
         return cls(socket.inet_ntoa(addr)), p[4:]
 
+    @classmethod
+    def parse_from(cls, p, offset):
+        addr = bytes(p[offset:offset+4])[::-1]
+        return cls(socket.inet_ntoa(addr)), offset + 4
+
     def pack(self):
         return socket.inet_aton(self)[::-1]
 
@@ -70,6 +113,12 @@ def parse(cls, p, size, expected):
         _assert_equal(v, expected)
         return cls(v), p
 
+    @classmethod
+    def parse_from(cls, p, offset, size, expected):
+        v = bytes(p[offset:offset+size])
+        _assert_equal(v, expected)
+        return cls(v), offset + size
+
     def pack(self, size, expected):
         return self
 
@@ -78,8 +127,12 @@ class Tail(bytes):
     def parse(cls, p):
         return cls(p), b""
 
+    @classmethod
+    def parse_from(cls, p, offset):
+        return memoryview(p)[offset:], len(p)
+
     def pack(self):
-        if isinstance(self, bytes):
+        if isinstance(self, (bytes, bytearray, memoryview)):
             return self
         else:
             return self.pack()
@@ -89,133 +142,205 @@ class IntType(int):
 
 class i8be(IntType):
     size = 1
+    fmt = ">b"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack(">b", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack(">b", self)
+        return i8be._struct.pack(self)
 
 class i8le(IntType):
     size = 1
+    fmt = "<b"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack("<b", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack("<b", self)
+        return i8le._struct.pack(self)
 
 i8 = i8be
 
 class u8be(IntType):
     size = 1
+    fmt = ">B"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack(">B", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack(">B", self)
+        return u8be._struct.pack(self)
 
 class u8le(IntType):
     size = 1
+    fmt = "<B"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack("<B", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack("<B", self)
+        return u8le._struct.pack(self)
 
 u8 = u8be
 
 class i16be(IntType):
     size = 2
+    fmt = ">h"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack(">h", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack(">h", self)
+        return i16be._struct.pack(self)
 
 class i16le(IntType):
     size = 2
+    fmt = "<h"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack("<h", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack("<h", self)
+        return i16le._struct.pack(self)
 
 i16 = i16be
 
 class u16be(IntType):
     size = 2
+    fmt = ">H"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack(">H", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack(">H", self)
+        return u16be._struct.pack(self)
 
 class u16le(IntType):
     size = 2
+    fmt = "<H"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack("<H", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack("<H", self)
+        return u16le._struct.pack(self)
 
 u16 = u16be
 
 class i32be(IntType):
     size = 4
+    fmt = ">i"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack(">i", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack(">i", self)
+        return i32be._struct.pack(self)
 
 class i32le(IntType):
     size = 4
+    fmt = "<i"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack("<i", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack("<i", self)
+        return i32le._struct.pack(self)
 
 i32 = i32be
 
 class u32be(IntType):
     size = 4
+    fmt = ">I"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack(">I", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack(">I", self)
+        return u32be._struct.pack(self)
 
 class u32le(IntType):
     size = 4
+    fmt = "<I"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack("<I", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack("<I", self)
+        return u32le._struct.pack(self)
 
 u32 = u32be
 
@@ -0,0 +1,154 @@
+"""Incremental parser for the frames sent over pppp channels.
+
+The DRW packets of a channel carry a byte stream of XZYH frames (video,
+json replies) and AABB frames (file transfer replies). `StreamFramer` is fed
+that stream as it is reassembled, and cuts it into complete frames without
+ever waiting for more data, so it can run on the receive path itself.
+"""
+
+import unittest
+
+from collections import deque
+
+from .pppp import Xzyh, Aabb, P2PCmdType, FileTransfer
+
+
+class StreamFramer:
+    """Cuts a byte stream into `Xzyh` and `Aabb` frames, as the bytes arrive.
+
+    Every call to feed() appends data to the stream, and moves all frames
+    completed by it to `frames`. Received frames carry their payload in
+    `data`, and the CRC of AABB frames is checked.
+
+    The parser only ever looks at the bytes it needs next: first the frame
+    magic, then the header, then the whole frame. Raises ValueError on data
+    that is not a valid frame, or announces a frame larger than `max_size`,
+    after which the stream cannot be resynchronized.
+    """
+
+    def __init__(self, max_size=8 * 1024 * 1024):
+        self.max_size = max_size
+        self.buf = bytearray()
+        self.frames = deque()
+        self.kind = None
+        self.header = None
+        # number of bytes the current parser state needs
+        self.need = 2
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def pending(self):
+        """Number of received bytes that are not yet part of a complete frame"""
+        return len(self.buf)
+
+    def feed(self, data):
+        """Append `data` to the stream, returning the number of frames it completed"""
+        buf = self.buf
+        buf += data
+
+        count = 0
+        pos = 0
+        with memoryview(buf) as view:
+            while len(buf) - pos >= self.need:
+                if self.header is None:
+                    self._parse_header(view[pos:pos + self.need])
+                    continue
+
+                self.frames.append(self._parse_frame(view[pos:pos + self.need]))
+                pos += self.need
+                self.kind, self.header, self.need = None, None, 2
+                count += 1
+
+        # drop consumed frames. at most one partial frame is left
+        del buf[:pos]
+        return count
+
+    def _parse_header(self, view):
+        if self.kind is None:
+            magic = bytes(view)
+            if magic == b"XZ":
+                self.kind, self.need = Xzyh, 16
+            elif magic == b"\xaa\xbb":
+                self.kind, self.need = Aabb, 12
+            else:
+                raise ValueError(f"Unexpected data in stream: {magic!r}")
+            return
+
+        self.header = self.kind.parse(bytes(view))[0]
+        if self.kind is Xzyh:
+            size = 16 + self.header.len
+        else:
+            size = 12 + self.header.len + 2
+
+        if size > self.max_size:
+            raise ValueError(f"{self.kind.__name__} frame of {size} bytes exceeds limit of {self.max_size}")
+
+        self.need = size
+
+    def _parse_frame(self, view):
+        if self.kind is Xzyh:
+            xzyh = self.header
+            xzyh.data = bytes(view[16:])
+            return xzyh
+
+        aabb, data = Aabb.parse_with_crc(bytes(view))[:2]
+        aabb.data = data
+        return aabb
+
+
+class TestStreamFramer(unittest.TestCase):
+
+    def xzyh(self, data):
+        return Xzyh(cmd=P2PCmdType.P2P_JSON_CMD, len=len(data), unk0=0, unk1=0, chan=0,
+                    sign_code=0, unk3=0, dev_type=0, data=data)
+
+    def aabb(self, data, pos=0):
+        return Aabb(frametype=FileTransfer.REPLY, sn=0, pos=pos, len=len(data))
+
+    def stream(self):
+        frames = [
+            self.xzyh(b"x" * 3000).pack(),
+            self.aabb(b"\x00").pack_with_crc(b"\x00"),
+            self.xzyh(b"").pack(),
+            self.aabb(b"abc", pos=1024).pack_with_crc(b"abc"),
+            self.xzyh(b"{}").pack(),
+        ]
+        return frames, b"".join(frames)
+
+    def check(self, frames):
+        self.assertEqual([type(f) for f in frames], [Xzyh, Aabb, Xzyh, Aabb, Xzyh])
+        self.assertEqual([f.data for f in frames], [b"x" * 3000, b"\x00", b"", b"abc", b"{}"])
+        self.assertEqual(frames[3].pos, 1024)
+
+    def test_chunks(self):
+        _, data = self.stream()
+        for size in (1, 2, 7, 15, 16, 1024, len(data)):
+            framer = StreamFramer()
+            for n in range(0, len(data), size):
+                framer.feed(memoryview(data)[n:n + size])
+            self.check(list(framer.frames))
+            self.assertEqual(framer.pending, 0)
+
+    def test_immediate(self):
+        # every frame is available as soon as its last byte arrives, even
+        # frames shorter than a complete XZYH header
+        frames, data = self.stream()
+        framer = StreamFramer()
+        for frame in frames:
+            self.assertEqual(framer.feed(frame[:-1]), 0)
+            self.assertEqual(framer.feed(frame[-1:]), 1)
+        self.check(list(framer.frames))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            StreamFramer().feed(b"GARBAGE")
+
+        crc = bytearray(self.aabb(b"\x00").pack_with_crc(b"\x00"))
+        crc[-1] ^= 0xff
+        with self.assertRaises(ValueError):
+            StreamFramer().feed(crc)
+
+        with self.assertRaises(ValueError):
+            StreamFramer(max_size=1024).feed(self.xzyh(b"x" * 2000).pack()[:16])
@@ -0,0 +1,213 @@
+"""Splitting of the printer's H.264 video stream into access units.
+
+The video frames received over pppp carry an H.264 Annex B byte stream,
+chunked arbitrarily. `AccessUnitParser` is fed those chunks, finds the NAL
+units in them, and groups them into access units (one coded picture, along
+with the parameter sets and SEI messages preceding it).
+"""
+
+import unittest
+
+NAL_SLICE = 1
+NAL_IDR = 5
+NAL_SEI = 6
+NAL_SPS = 7
+NAL_PPS = 8
+NAL_AUD = 9
+
+START_CODE = b"\x00\x00\x00\x01"
+
+# access unit delimiter (any primary picture type), with start code
+AUD = START_CODE + b"\x09\xf0"
+
+# NAL unit types that start a new access unit, when they follow a picture
+AU_START_TYPES = {NAL_SEI, NAL_SPS, NAL_PPS, NAL_AUD}
+
+VCL_TYPES = {NAL_SLICE, NAL_IDR}
+
+
+def nal_type(nal):
+    return nal[0] & 0x1f
+
+
+class AccessUnit:
+    """The NAL units of a single coded picture, without start codes.
+
+    `timestamp` is the time the access unit was completed (in seconds, any
+    monotonic clock), or None.
+    """
+
+    __slots__ = ("nals", "keyframe", "size", "timestamp", "_annexb")
+
+    def __init__(self, nals, timestamp=None):
+        self.nals = nals
+        self.timestamp = timestamp
+        self.keyframe = any(nal_type(nal) == NAL_IDR for nal in nals)
+        self.size = sum(len(nal) for nal in nals)
+        self._annexb = None
+
+    def __repr__(self):
+        types = ",".join(str(nal_type(nal)) for nal in self.nals)
+        return f"AccessUnit(nals=[{types}], keyframe={self.keyframe}, size={self.size})"
+
+    @property
+    def annexb(self):
+        """The access unit as an Annex B byte stream, built once and shared by all readers"""
+        if self._annexb is None:
+            self._annexb = b"".join(START_CODE + nal for nal in self.nals)
+        return self._annexb
+
+
+class NalParser:
+    """Finds the NAL units in an Annex B byte stream, fed in arbitrary chunks.
+
+    A NAL unit is only known to be complete once the start code of the next
+    one has arrived, so the last NAL unit of a chunk is held back until then
+    (or until flush()).
+    """
+
+    def __init__(self):
+        self.buf = bytearray()
+        # offset of the current NAL unit, after its start code
+        self.start = None
+        # offset where the search for the next start code continues
+        self.scan = 0
+
+    def feed(self, data):
+        """Append `data` to the stream, returning the list of NAL units it completed"""
+        buf = self.buf
+        buf += data
+
+        nals = []
+        while (pos := buf.find(b"\x00\x00\x01", self.scan)) >= 0:
+            if self.start is not None:
+                # trailing zeros are either part of a 4-byte start code, or
+                # padding. NAL units always end with a 1 bit.
+                nal = bytes(buf[self.start:pos]).rstrip(b"\x00")
+                if nal:
+                    nals.append(nal)
+            self.start = self.scan = pos + 3
+
+        # a start code may span chunks, so search its first bytes again
+        self.scan = max(len(buf) - 2, self.scan)
+
+        if self.start is None:
+            # no start code yet. keep only what may be its beginning
+            del buf[:self.scan]
+            self.scan = 0
+        elif self.start:
+            del buf[:self.start]
+            self.scan -= self.start
+            self.start = 0
+
+        return nals
+
+    def flush(self):
+        """Return the NAL unit still held back, if any, as a list"""
+        nals = []
+        if self.start is not None:
+            nal = bytes(self.buf[self.start:]).rstrip(b"\x00")
+            if nal:
+                nals.append(nal)
+        self.__init__()
+        return nals
+
+
+class AccessUnitParser:
+    """Groups the NAL units of a byte stream into access units.
+
+    An access unit ends where the next one starts: at an AUD, SPS, PPS or
+    SEI NAL unit, or at the first slice of a new picture, following a
+    picture. Access units are therefore held back until the first NAL unit
+    of the next one has arrived.
+    """
+
+    def __init__(self):
+        self.nals = NalParser()
+        self.pending = []
+        self.picture = False
+
+    def feed(self, data, timestamp=None):
+        """Append `data` to the stream, returning the list of access units it completed.
+
+        The access units are stamped with `timestamp`.
+        """
+        return self._group(self.nals.feed(data), timestamp)
+
+    def flush(self, timestamp=None):
+        units = self._group(self.nals.flush(), timestamp)
+        if self.pending:
+            units.append(AccessUnit(self.pending, timestamp))
+        self.pending = []
+        self.picture = False
+        return units
+
+    def _group(self, nals, timestamp):
+        units = []
+        for nal in nals:
+            typ = nal_type(nal)
+            vcl = typ in VCL_TYPES
+            # first_mb_in_slice is 0 (coded as a single 1 bit) for the first
+            # slice of a picture
+            first_slice = vcl and len(nal) > 1 and nal[1] & 0x80
+
+            if self.picture and (typ in AU_START_TYPES or first_slice):
+                units.append(AccessUnit(self.pending, timestamp))
+                self.pending = []
+                self.picture = False
+
+            self.pending.append(nal)
+            if vcl:
+                self.picture = True
+
+        return units
+
+
+class TestAccessUnitParser(unittest.TestCase):
+
+    SPS = b"\x67\x42\x00\x1f\xe9"
+    PPS = b"\x68\xce\x38\x80"
+    IDR = b"\x65\x88\x84\x00\x33"
+    P = b"\x41\x9a\x02\x00\x11"
+    P2 = b"\x41\x1a\x02\x00\x11"  # second slice of a picture
+
+    def stream(self):
+        units = [[self.SPS, self.PPS, self.IDR], [self.P], [self.P, self.P2], [self.SPS, self.PPS, self.IDR], [self.P]]
+        data = b"".join(START_CODE + nal for unit in units for nal in unit)
+        return units, data
+
+    def test_nals(self):
+        _, data = self.stream()
+        for size in (1, 2, 3, 5, len(data)):
+            parser = NalParser()
+            nals = []
+            for n in range(0, len(data), size):
+                nals += parser.feed(data[n:n + size])
+            nals += parser.flush()
+            self.assertEqual(len(nals), 10)
+            self.assertEqual(nals[:3], [self.SPS, self.PPS, self.IDR])
+
+    def test_short_start_code(self):
+        parser = NalParser()
+        nals = parser.feed(b"\x00\x00\x01" + self.SPS + b"\x00\x00\x01" + self.PPS + b"\x00\x00\x00\x01")
+        self.assertEqual(nals, [self.SPS, self.PPS])
+
+    def test_access_units(self):
+        units, data = self.stream()
+        for size in (1, 7, len(data)):
+            parser = AccessUnitParser()
+            result = []
+            for n in range(0, len(data), size):
+                result += parser.feed(data[n:n + size])
+            result += parser.flush()
+            self.assertEqual([au.nals for au in result], units)
+            self.assertEqual([au.keyframe for au in result], [True, False, False, True, False])
+            self.assertEqual(result[0].annexb, b"".join(START_CODE + nal for nal in units[0]))
+
+    def test_timestamps(self):
+        units, data = self.stream()
+        parser = AccessUnitParser()
+        result = parser.feed(data[:-len(self.P) - 4], timestamp=1.0) + parser.feed(data[-len(self.P) - 4:], timestamp=2.0)
+        result += parser.flush(timestamp=3.0)
+        # the last keyframe is only complete once the final P slice is
+        self.assertEqual([au.timestamp for au in result], [1.0, 1.0, 1.0, 3.0, 3.0])
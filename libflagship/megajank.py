@@ -1,8 +1,20 @@
+import sys
+import random
+import unittest
+import functools
+
+from unittest import mock
+
 import Cryptodome.Util.Padding
 import Cryptodome.Cipher.AES
 import tinyec.registry
 import tinyec.ec
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from libflagship.util import b64e
 
 
@@ -87,30 +99,52 @@ def ecdh_encrypt_login_password(password, partner=anker_ec_v1_public_key):
 
 # pppp init string decoder
 
-def pppp_decode_initstring_raw(input):
-    shuffle = [0x49, 0x59, 0x43, 0x3d, 0xb5, 0xbf, 0x6d, 0xa3, 0x47, 0x53,
-               0x4f, 0x61, 0x65, 0xe3, 0x71, 0xe9, 0x67, 0x7f, 0x02, 0x03,
-               0x0b, 0xad, 0xb3, 0x89, 0x2b, 0x2f, 0x35, 0xc1, 0x6b, 0x8b,
-               0x95, 0x97, 0x11, 0xe5, 0xa7, 0x0d, 0xef, 0xf1, 0x05, 0x07,
-               0x83, 0xfb, 0x9d, 0x3b, 0xc5, 0xc7, 0x13, 0x17, 0x1d, 0x1f,
-               0x25, 0x29, 0xd3, 0xdf]
+PPPP_INITSTRING_SHUFFLE = [
+    0x49, 0x59, 0x43, 0x3d, 0xb5, 0xbf, 0x6d, 0xa3, 0x47, 0x53,
+    0x4f, 0x61, 0x65, 0xe3, 0x71, 0xe9, 0x67, 0x7f, 0x02, 0x03,
+    0x0b, 0xad, 0xb3, 0x89, 0x2b, 0x2f, 0x35, 0xc1, 0x6b, 0x8b,
+    0x95, 0x97, 0x11, 0xe5, 0xa7, 0x0d, 0xef, 0xf1, 0x05, 0x07,
+    0x83, 0xfb, 0x9d, 0x3b, 0xc5, 0xc7, 0x13, 0x17, 0x1d, 0x1f,
+    0x25, 0x29, 0xd3, 0xdf,
+]
 
-    olen = len(input) >> 1
+# per-position key bytes, repeating every len(PPPP_INITSTRING_SHUFFLE) bytes
+_initstring_key = bytes(0x39 ^ x for x in PPPP_INITSTRING_SHUFFLE)
+
+# init strings encode each byte as two letters, "A" to "P"
+_initstring_alphabet = b"ABCDEFGHIJKLMNOP"
+_initstring_hex = bytes.maketrans(_initstring_alphabet, b"0123456789abcdef")
 
-    q = 0
-    output = [0] * olen
 
-    for q in range(olen):
-        xor = 0x39 ^ shuffle[q % 0x36]
+def pppp_decode_initstring_raw(input):
+    # Each output byte is (key ^ value) xor'ed with all previous output bytes.
+    # That running xor always equals (key ^ value) of the previous position, so
+    # output[q] = c[q] ^ c[q-1], where c = key ^ value.
+    olen = len(input) >> 1
+    input = bytes(input[:olen*2])
+    key = (_initstring_key * (olen // len(_initstring_key) + 1))[:olen]
 
-        for p in range(q+1):
-            xor ^= output[p]
+    if input.translate(None, _initstring_alphabet):
+        # slow path for malformed input, behaving exactly like the original
+        # decoder (including raising ValueError for out-of-range bytes)
+        output = [0] * olen
+        prev = 0
+        for q in range(olen):
+            c = key[q] ^ ((input[q*2+1] - 0x41) + ((input[q*2+0] - 0x41) << 4))
+            output[q] = c ^ prev
+            prev = c
+        return bytes(output)
 
-        l = input[q*2+1] - 0x41
-        h = input[q*2+0] - 0x41
-        output[q] = xor ^ (l + (h << 4))
+    # fast path: translate to hex, and let bytes.fromhex() and big integer
+    # xor do all the work, without a python loop per byte
+    value = bytes.fromhex(input.translate(_initstring_hex).decode())
+    c = int.from_bytes(value, "big") ^ int.from_bytes(key, "big")
+    return (c ^ (c >> 8)).to_bytes(olen, "big")
 
-    return bytes(output)
+
+def pppp_decode_initstrings_raw(inputs):
+    """Decode many raw init strings at once, returning a list of bytes"""
+    return [pppp_decode_initstring_raw(input) for input in inputs]
 
 
 def pppp_decode_initstring(input):
@@ -118,6 +152,12 @@ def pppp_decode_initstring(input):
     return res.decode().rstrip(",").split(",")
 
 
+def pppp_decode_initstrings(inputs):
+    """Decode many init strings at once (e.g. for a whole fleet of printers),
+    returning a list of host lists"""
+    return [pppp_decode_initstring(input) for input in inputs]
+
+
 # pppp crypto curses
 
 PPPP_SEED = "EUPRAKM"
@@ -198,21 +238,94 @@ def crypto_curse(input, key, shuffle):
     return output
 
 
+class CurseCipher:
+    """Engine for the pppp "curse" cipher.
+
+    Same algorithm as `crypto_curse()`/`crypto_decurse()`, but the key
+    schedule is run only once, when the engine is created, and data is
+    taken and returned as bytes (or any bytes-like object) instead of lists
+    of ints.
+    """
+
+    def __init__(self, key=PPPP_SEED, shuffle=PPPP_SHUFFLE):
+        if isinstance(key, str):
+            key = key.encode()
+        self.shuffle = tuple(tuple(row) for row in shuffle)
+        self.state = self._advance((1, 3, 5, 7), key)
+
+    def _advance(self, state, data):
+        a, b, c, d = state
+        shuffle = self.shuffle
+
+        for x in data:
+            a, b, c, d = (
+                shuffle[b + (x % a) & 7][x + (c % d) & 7],
+                shuffle[c + (x % b) & 7][x + (d % a) & 7],
+                shuffle[d + (x % c) & 7][x + (a % b) & 7],
+                shuffle[a + (x % d) & 7][x + (b % c) & 7],
+            )
+
+        return a, b, c, d
+
+    def decurse(self, input):
+        a, b, c, d = self.state
+        shuffle = self.shuffle
+
+        # the state only depends on the ciphertext, so collect the keystream
+        # first, and xor it with the input in one go
+        keystream = bytearray(len(input))
+        p = 0
+        for x in input:
+            keystream[p] = a ^ b ^ c ^ d
+            p += 1
+
+            a, b, c, d = (
+                shuffle[b + (x % a) & 7][x + (c % d) & 7],
+                shuffle[c + (x % b) & 7][x + (d % a) & 7],
+                shuffle[d + (x % c) & 7][x + (a % b) & 7],
+                shuffle[a + (x % d) & 7][x + (b % c) & 7],
+            )
+
+        res = int.from_bytes(input, "little") ^ int.from_bytes(keystream, "little")
+        return res.to_bytes(len(input), "little")
+
+    def curse(self, input):
+        a, b, c, d = self.state
+        shuffle = self.shuffle
+
+        # 4 trailing check bytes are appended, encrypting 0x43 ("C")
+        output = bytearray(input)
+        output += b"CCCC"
+
+        for p, x in enumerate(output):
+            x = output[p] = x ^ a ^ b ^ c ^ d
+
+            a, b, c, d = (
+                shuffle[b + (x % a) & 7][x + (c % d) & 7],
+                shuffle[c + (x % b) & 7][x + (d % a) & 7],
+                shuffle[d + (x % c) & 7][x + (a % b) & 7],
+                shuffle[a + (x % d) & 7][x + (b % c) & 7],
+            )
+
+        return bytes(output)
+
+
+pppp_curse = CurseCipher(PPPP_SEED, PPPP_SHUFFLE)
+
+
 def crypto_decurse_string(input):
 
-    output = crypto_decurse(input, key=PPPP_SEED, shuffle=PPPP_SHUFFLE)
+    output = pppp_curse.decurse(input)
 
-    if output[-4:] != [0x43, 0x43, 0x43, 0x43]:
+    if output[-4:] != b"CCCC":
         raise ValueError("Invalid decode")
 
-    return bytes(output[:-4])
+    return output[:-4]
 
 
 def crypto_curse_string(input):
 
-    output = crypto_curse(input, key=PPPP_SEED, shuffle=PPPP_SHUFFLE)
-
-    return bytes(output)
+    return pppp_curse.curse(input)
 
 
 # pppp crypto curse, older(?) version
@@ -259,24 +372,44 @@ def _lookup(hash, b):
     return PPPP_SIMPLE_SHUFFLE[index % len(PPPP_SIMPLE_SHUFFLE)]
 
 
-def simple_decrypt(seed, input):
+# below this size, numpy call overhead makes it slower than bytes.translate()
+SIMPLE_NUMPY_MIN = 4096
+
+
+@functools.lru_cache(maxsize=16)
+def simple_lut(seed):
+    """Return the 256-byte lookup table for `seed`, as used by `_lookup()`"""
     hash = simple_hash(seed)
-    output = [0] * len(input)
+    return bytes(_lookup(hash, b) for b in range(256))
 
-    output[0] = input[0] ^ _lookup(hash, 0)
-    for i in range(1, len(input)):
-        output[i] = input[i] ^ _lookup(hash, input[i-1])
 
-    return bytes(output)
+def simple_decrypt(seed, input):
+    lut = simple_lut(bytes(seed))
+    size = len(input)
+
+    # every output byte only depends on the previous *input* byte, so the
+    # keystream is just the input, shifted by one, translated through the lut
+    if numpy is not None and size >= SIMPLE_NUMPY_MIN:
+        data = numpy.frombuffer(input, dtype=numpy.uint8)
+        keystream = numpy.empty_like(data)
+        keystream[:1] = lut[0]
+        numpy.take(numpy.frombuffer(lut, dtype=numpy.uint8), data[:-1], out=keystream[1:])
+        return (data ^ keystream).tobytes()
+
+    keystream = (b"\x00" + bytes(input[:-1])).translate(lut)
+    res = int.from_bytes(input, "little") ^ int.from_bytes(keystream[:size], "little")
+    return res.to_bytes(size, "little")
 
 
 def simple_encrypt(seed, input):
-    hash = simple_hash(seed)
-    output = [0] * len(input)
+    lut = simple_lut(bytes(seed))
+    output = bytearray(len(input))
 
-    output[0] = input[0] ^ _lookup(hash, 0)
-    for i in range(1, len(input)):
-        output[i] = input[i] ^ _lookup(hash, output[i-1])
+    # each output byte depends on the previous output byte, so this can't be
+    # vectorized like simple_decrypt()
+    prev = 0
+    for i, x in enumerate(input):
+        prev = output[i] = x ^ lut[prev]
 
     return bytes(output)
 
@@ -289,6 +422,164 @@ def simple_encrypt_string(input):
     return simple_encrypt(PPPP_SIMPLE_SEED, input)
 
 
+class TestInitString(unittest.TestCase):
+
+    @staticmethod
+    def decode_reference(input):
+        # original O(n^2) decoder, kept to check the fast one against
+        shuffle = PPPP_INITSTRING_SHUFFLE
+        olen = len(input) >> 1
+        output = [0] * olen
+
+        for q in range(olen):
+            xor = 0x39 ^ shuffle[q % 0x36]
+
+            for p in range(q+1):
+                xor ^= output[p]
+
+            l = input[q*2+1] - 0x41
+            h = input[q*2+0] - 0x41
+            output[q] = xor ^ (l + (h << 4))
+
+        return bytes(output)
+
+    def test_random(self):
+        rng = random.Random(0x39)
+
+        for _ in range(2000):
+            size = rng.randrange(0, 300)
+            input = bytes(rng.choice(_initstring_alphabet) for _ in range(size))
+            self.assertEqual(pppp_decode_initstring_raw(input), self.decode_reference(input))
+
+    def test_malformed(self):
+        rng = random.Random(0x41)
+
+        for _ in range(2000):
+            size = rng.randrange(0, 20)
+            input = bytes(rng.randrange(0x41, 0x51 + rng.randrange(2)) for _ in range(size))
+            try:
+                expected = self.decode_reference(input)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    pppp_decode_initstring_raw(input)
+            else:
+                self.assertEqual(pppp_decode_initstring_raw(input), expected)
+
+    def test_roundtrip(self):
+        hosts = ["34.206.12.63", "52.9.103.221", "3.120.39.177"]
+        encoded = self.encode(",".join(hosts).encode() + b",")
+
+        self.assertEqual(pppp_decode_initstring(encoded.decode()), hosts)
+        self.assertEqual(pppp_decode_initstrings([encoded.decode()] * 3), [hosts] * 3)
+        self.assertEqual(pppp_decode_initstrings_raw([encoded, b""]), [",".join(hosts).encode() + b",", b""])
+
+    @staticmethod
+    def encode(data):
+        output = []
+        prev = 0
+        for q, x in enumerate(data):
+            c = x ^ prev
+            prev = c
+            c ^= _initstring_key[q % len(_initstring_key)]
+            output += [0x41 + (c >> 4), 0x41 + (c & 0xf)]
+        return bytes(output)
+
+
+class TestCurse(unittest.TestCase):
+
+    def test_decurse(self):
+        rng = random.Random(0x43)
+
+        for _ in range(1000):
+            data = rng.randbytes(rng.randrange(0, 200))
+            expected = bytes(crypto_decurse(data, key=PPPP_SEED, shuffle=PPPP_SHUFFLE))
+            self.assertEqual(pppp_curse.decurse(data), expected)
+            self.assertEqual(pppp_curse.decurse(memoryview(data)), expected)
+
+    def test_curse(self):
+        rng = random.Random(0x43)
+
+        for _ in range(1000):
+            data = rng.randbytes(rng.randrange(0, 200))
+            expected = bytes(crypto_curse(data, key=PPPP_SEED, shuffle=PPPP_SHUFFLE))
+            self.assertEqual(pppp_curse.curse(data), expected)
+            self.assertEqual(pppp_curse.curse(memoryview(data)), expected)
+
+    def test_key(self):
+        rng = random.Random(0x43)
+
+        for _ in range(100):
+            key = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(rng.randrange(1, 12)))
+            data = rng.randbytes(64)
+            self.assertEqual(CurseCipher(key).curse(data), bytes(crypto_curse(data, key=key, shuffle=PPPP_SHUFFLE)))
+
+    def test_roundtrip(self):
+        data = b"EUPRAKM-000000-ABCDE"
+        self.assertEqual(crypto_decurse_string(crypto_curse_string(data)), data)
+
+        with self.assertRaises(ValueError):
+            crypto_decurse_string(data)
+
+
+class TestSimple(unittest.TestCase):
+
+    @staticmethod
+    def decrypt_reference(seed, input):
+        hash = simple_hash(seed)
+        output = [0] * len(input)
+
+        output[0] = input[0] ^ _lookup(hash, 0)
+        for i in range(1, len(input)):
+            output[i] = input[i] ^ _lookup(hash, input[i-1])
+
+        return bytes(output)
+
+    @staticmethod
+    def encrypt_reference(seed, input):
+        hash = simple_hash(seed)
+        output = [0] * len(input)
+
+        output[0] = input[0] ^ _lookup(hash, 0)
+        for i in range(1, len(input)):
+            output[i] = input[i] ^ _lookup(hash, output[i-1])
+
+        return bytes(output)
+
+    def test_equivalence(self):
+        rng = random.Random(0x53)
+        seeds = [PPPP_SIMPLE_SEED] + [rng.randbytes(rng.randrange(1, 20)) for _ in range(20)]
+
+        for _ in range(1000):
+            seed = rng.choice(seeds)
+            data = rng.randbytes(rng.randrange(1, 200))
+            self.assertEqual(simple_decrypt(seed, data), self.decrypt_reference(seed, data))
+            self.assertEqual(simple_decrypt(seed, memoryview(data)), self.decrypt_reference(seed, data))
+            self.assertEqual(simple_encrypt(seed, data), self.encrypt_reference(seed, data))
+
+    def check_large(self):
+        rng = random.Random(0x54)
+        for size in (SIMPLE_NUMPY_MIN - 1, SIMPLE_NUMPY_MIN, 5000, 70000):
+            seed = rng.randbytes(rng.randrange(1, 20))
+            data = rng.randbytes(size)
+            expected = self.decrypt_reference(seed, data)
+            self.assertEqual(simple_decrypt(seed, data), expected)
+            self.assertEqual(simple_decrypt(seed, memoryview(data)), expected)
+            self.assertEqual(simple_decrypt(seed, memoryview(b"xx" + data)[2:]), expected)
+
+    @unittest.skipUnless(numpy, "numpy not installed")
+    def test_large_numpy(self):
+        self.check_large()
+
+    def test_large_without_numpy(self):
+        with mock.patch.object(sys.modules[__name__], "numpy", None):
+            self.check_large()
+
+    def test_roundtrip(self):
+        data = bytes(range(256)) * 4
+        self.assertEqual(simple_decrypt_string(simple_encrypt_string(data)), data)
+        self.assertEqual(simple_decrypt_string(b""), b"")
+
+
 if __name__ == "__main__":
     print(simple_encrypt_string(b"foo"))
     print(simple_decrypt_string(simple_encrypt_string(b"foo")))
@@ -21,6 +21,10 @@ class MqttPktType(enum.IntEnum):
     def parse(cls, p):
         return cls(struct.unpack("B", p[:1])[0]), p[1:]
 
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(p[offset]), offset + 1
+
     def pack(self):
         return struct.pack("B", self)
 
@@ -73,10 +77,14 @@ class MqttMsgType(enum.IntEnum):
     def parse(cls, p):
         return cls(struct.unpack("B", p[:1])[0]), p[1:]
 
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(p[offset]), offset + 1
+
     def pack(self):
         return struct.pack("B", self)
 
-@dataclass
+@dataclass(slots=True)
 class _MqttMsg:
     signature  : bytes = field(repr=False, kw_only=True, default=b'MA') # Signature: 'MA'
     size       : u16le # length of packet, including header and checksum (minimum 65).
@@ -92,41 +100,42 @@ class _MqttMsg:
     padding    : bytes # padding bytes, unknown usage
     data       : bytes # payload data
 
+    _struct0 = struct.Struct("<2sHBBBBBBHI37s11s")
+
     @classmethod
     def parse(cls, p):
-        signature, p = Magic.parse(p, 2, b'MA')
-        size, p = u16le.parse(p)
-        m3, p = u8.parse(p)
-        m4, p = u8.parse(p)
-        m5, p = u8.parse(p)
-        m6, p = u8.parse(p)
-        m7, p = u8.parse(p)
-        packet_type, p = MqttPktType.parse(p)
-        packet_num, p = u16le.parse(p)
-        time, p = u32le.parse(p)
-        device_guid, p = String.parse(p, 37)
-        padding, p = Bytes.parse(p, 11)
+        try:
+            signature, size, m3, m4, m5, m6, m7, packet_type, packet_num, time, device_guid, padding = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        signature = Magic.parse(signature, 2, b'MA')[0]
+        packet_type = MqttPktType(packet_type)
+        device_guid = String.parse(device_guid, 37)[0]
+        p = p[64:]
         data, p = Tail.parse(p)
         return cls(signature=signature, size=size, m3=m3, m4=m4, m5=m5, m6=m6, m7=m7, packet_type=packet_type, packet_num=packet_num, time=time, device_guid=device_guid, padding=padding, data=data), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        try:
+            signature, size, m3, m4, m5, m6, m7, packet_type, packet_num, time, device_guid, padding = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        signature = Magic.parse(signature, 2, b'MA')[0]
+        packet_type = MqttPktType(packet_type)
+        device_guid = String.parse(device_guid, 37)[0]
+        offset += 64
+        data, offset = Tail.parse_from(p, offset)
+        return cls(signature=signature, size=size, m3=m3, m4=m4, m5=m5, m6=m6, m7=m7, packet_type=packet_type, packet_num=packet_num, time=time, device_guid=device_guid, padding=padding, data=data), offset
+
     def pack(self):
-        p  = Magic.pack(self.signature, 2, b'MA')
-        p += u16le.pack(self.size)
-        p += u8.pack(self.m3)
-        p += u8.pack(self.m4)
-        p += u8.pack(self.m5)
-        p += u8.pack(self.m6)
-        p += u8.pack(self.m7)
-        p += MqttPktType.pack(self.packet_type)
-        p += u16le.pack(self.packet_num)
-        p += u32le.pack(self.time)
-        p += String.pack(self.device_guid, 37)
-        p += Bytes.pack(self.padding, 11)
+        p  = self._struct0.pack(Magic.pack(self.signature, 2, b'MA'), self.size, self.m3, self.m4, self.m5, self.m6, self.m7, self.packet_type, self.packet_num, self.time, String.pack(self.device_guid, 37), Bytes.pack(self.padding, 11))
         p += Tail.pack(self.data)
         return p
 
 
 class MqttMsg(_MqttMsg):
+    __slots__ = ()
 
     @classmethod
     def parse(cls, p, key):
@@ -0,0 +1,89 @@
+import logging
+import dataclasses
+
+from .pppp import Type
+
+
+class PacketTracer:
+    """Debug logging of pppp packets.
+
+    Packets are only formatted when debug logging is enabled, and the packet
+    passes the configured filters: `types` and `chans` restrict tracing to
+    those packet types and channels (packets without a channel always pass
+    the channel filter), and `sample` traces only every n'th matching packet.
+    """
+
+    def __init__(self, logger=None, types=None, chans=None, sample=1, limit=128):
+        self.logger = logger or logging.getLogger()
+        self.limit = limit
+        self.configure(types, chans, sample)
+
+    def configure(self, types=None, chans=None, sample=1):
+        if sample < 1:
+            raise ValueError(f"sample must be at least 1, not {sample}")
+        self.types = set(types) if types is not None else None
+        self.chans = set(chans) if chans is not None else None
+        self.sample = sample
+        self.count = 0
+
+    @staticmethod
+    def parse_spec(spec):
+        """Parse a trace specification into configure() arguments.
+
+        The specification is a comma-separated list of packet type names,
+        `chan=N` and `sample=N` items, for example "DRW,DRW_ACK,chan=1,sample=100".
+        """
+        types, chans, sample = set(), set(), 1
+
+        for item in filter(None, (s.strip() for s in spec.split(","))):
+            key, _, value = item.partition("=")
+            if not value:
+                try:
+                    types.add(Type[key.upper()])
+                except KeyError:
+                    raise ValueError(f"Unknown pppp packet type {key!r}") from None
+            elif key == "chan":
+                chans.add(int(value))
+            elif key == "sample":
+                sample = int(value)
+            else:
+                raise ValueError(f"Unknown pppp trace option {key!r}")
+
+        if sample < 1:
+            raise ValueError(f"sample must be at least 1, not {sample}")
+
+        return dict(types=types or None, chans=chans or None, sample=sample)
+
+    def wants(self, msg):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return False
+
+        if self.types is not None and msg.type not in self.types:
+            return False
+
+        if self.chans is not None:
+            chan = getattr(msg, "chan", None)
+            if chan is not None and chan not in self.chans:
+                return False
+
+        count, self.count = self.count, self.count + 1
+        return count % self.sample == 0
+
+    def format(self, msg):
+        data = getattr(msg, "data", None)
+        if isinstance(data, memoryview):
+            # received payloads are views of the datagram. show their contents
+            msg = dataclasses.replace(msg, data=bytes(data[:self.limit]))
+        return str(msg)[:self.limit]
+
+    def rx(self, msg):
+        if self.wants(msg):
+            self.logger.debug(f"RX <--  {self.format(msg)}")
+
+    def tx(self, msg):
+        if self.wants(msg):
+            self.logger.debug(f"TX  --> {self.format(msg)}")
+
+
+# shared by all pppp connections, unless they are given their own tracer
+tracer = PacketTracer()
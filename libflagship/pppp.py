@@ -8,6 +8,7 @@
 import struct
 import enum
 from dataclasses import dataclass, field
+from typing import ClassVar
 from .amtypes import *
 from .amtypes import _assert_equal
 from .megajank import crypto_curse_string, crypto_decurse_string, simple_encrypt_string, simple_decrypt_string
@@ -92,6 +93,11 @@ def parse(cls, p, typ=u8):
         d = typ.parse(p)
         return cls(d[0]), d[1]
 
+    @classmethod
+    def parse_from(cls, p, offset, typ=u8):
+        d = typ.parse_from(p, offset)
+        return cls(d[0]), d[1]
+
     def pack(self, typ=u8):
         return typ.pack(self)
 
@@ -203,6 +209,11 @@ def parse(cls, p, typ=u16le):
         d = typ.parse(p)
         return cls(d[0]), d[1]
 
+    @classmethod
+    def parse_from(cls, p, offset, typ=u16le):
+        d = typ.parse_from(p, offset)
+        return cls(d[0]), d[1]
+
     def pack(self, typ=u16le):
         return typ.pack(self)
 
@@ -220,6 +231,11 @@ def parse(cls, p, typ=u16le):
         d = typ.parse(p)
         return cls(d[0]), d[1]
 
+    @classmethod
+    def parse_from(cls, p, offset, typ=u16le):
+        d = typ.parse_from(p, offset)
+        return cls(d[0]), d[1]
+
     def pack(self, typ=u16le):
         return typ.pack(self)
 
@@ -235,6 +251,11 @@ def parse(cls, p, typ=u8):
         d = typ.parse(p)
         return cls(d[0]), d[1]
 
+    @classmethod
+    def parse_from(cls, p, offset, typ=u8):
+        d = typ.parse_from(p, offset)
+        return cls(d[0]), d[1]
+
     def pack(self, typ=u8):
         return typ.pack(self)
 
@@ -250,6 +271,11 @@ def parse(cls, p, typ=u8):
         d = typ.parse(p)
         return cls(d[0]), d[1]
 
+    @classmethod
+    def parse_from(cls, p, offset, typ=u8):
+        d = typ.parse_from(p, offset)
+        return cls(d[0]), d[1]
+
     def pack(self, typ=u8):
         return typ.pack(self)
 
@@ -301,18 +327,27 @@ def parse(cls, p, typ=u32):
         d = typ.parse(p)
         return cls(d[0]), d[1]
 
+    @classmethod
+    def parse_from(cls, p, offset, typ=u32):
+        d = typ.parse_from(p, offset)
+        return cls(d[0]), d[1]
+
     def pack(self, typ=u32):
         return typ.pack(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
 
-    type: Type = field(repr=False, init=False)
+    type: ClassVar[Type]
+
+    _header = struct.Struct(">BBH")
 
     @classmethod
     def parse(cls, m):
-        magic, type, size = struct.unpack(">BBH", m[:4])
+        if len(m) < 4:
+            raise ValueError(f"expected message header but found {len(m)} bytes")
+        magic, type, size = cls._header.unpack_from(m)
         assert magic == 0xF1
         type = Type(type)
         p = m[4:4+size]
@@ -321,13 +356,32 @@ def parse(cls, m):
         else:
             raise ValueError(f"unknown message type {type:02x}")
 
+    @classmethod
+    def parse_from(cls, m, offset=0):
+        """Parse message at `offset` in `m`, returning (message, new_offset).
+
+        Variable-length fields (like `PktDrw.data`) are returned as memoryview
+        slices of `m`, instead of copies."""
+        if len(m) - offset < 4:
+            raise ValueError(f"expected message header but found {len(m) - offset} bytes")
+        magic, type, size = cls._header.unpack_from(m, offset)
+        assert magic == 0xF1
+        type = Type(type)
+        offset += 4
+        p = memoryview(m)[:offset+size]
+        if type in MessageTypeTable:
+            return MessageTypeTable[type].parse_from(p, offset)
+        else:
+            raise ValueError(f"unknown message type {type:02x}")
+
     def pack(self, p):
-        return struct.pack(">BBH", 0xF1, self.type, len(p)) + p
+        return self._header.pack(0xF1, self.type, len(p)) + p
 
 class _Host:
-    pass
+    __slots__ = ()
 
 class _Duid:
+    __slots__ = ()
 
     @classmethod
     def from_string(cls, str):
@@ -338,9 +392,12 @@ def __str__(self):
         return f"{self.prefix}-{self.serial:06}-{self.check}"
 
 class _Xzyh:
-    pass
+    __slots__ = ()
 
 class _Aabb:
+    # payload of a received frame, attached by the reader, since it is not
+    # part of the header
+    __slots__ = ("data",)
 
     @classmethod
     def parse_with_crc(cls, m):
@@ -358,12 +415,12 @@ def pack_with_crc(self, data):
         return header + data + ppcs_crc16(header[2:] + data)
 
 class _Dsk:
-    pass
+    __slots__ = ()
 
 class _Version:
-    pass
+    __slots__ = ()
 
-@dataclass
+@dataclass(slots=True)
 class Host(_Host):
     pad0 : bytes = field(repr=False, kw_only=True, default='\x00' * 1) # unknown
     afam : u8le # Adress family. Set to AF_INET (2)
@@ -371,54 +428,86 @@ class Host(_Host):
     addr : IPv4 # IP address
     pad1 : bytes = field(repr=False, kw_only=True, default='\x00' * 8) # unknown
 
+    _struct0 = struct.Struct("<1sBH4s8s")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        pad0, p = Zeroes.parse(p, 1)
-        afam, p = u8le.parse(p)
-        port, p = u16le.parse(p)
-        addr, p = IPv4.parse(p)
-        pad1, p = Zeroes.parse(p, 8)
+        try:
+            pad0, afam, port, addr, pad1 = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad0 = Zeroes.parse(pad0, 1)[0]
+        addr = IPv4.parse(addr)[0]
+        pad1 = Zeroes.parse(pad1, 8)[0]
+        p = p[16:]
 
         return cls(pad0=pad0, afam=afam, port=port, addr=addr, pad1=pad1), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            pad0, afam, port, addr, pad1 = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad0 = Zeroes.parse(pad0, 1)[0]
+        addr = IPv4.parse(addr)[0]
+        pad1 = Zeroes.parse(pad1, 8)[0]
+        offset += 16
+
+        return cls(pad0=pad0, afam=afam, port=port, addr=addr, pad1=pad1), offset
+
     def pack(self):
-        p  = Zeroes.pack(self.pad0, 1)
-        p += u8le.pack(self.afam)
-        p += u16le.pack(self.port)
-        p += IPv4.pack(self.addr)
-        p += Zeroes.pack(self.pad1, 8)
+        p  = self._struct0.pack(Zeroes.pack(self.pad0, 1), self.afam, self.port, IPv4.pack(self.addr), Zeroes.pack(self.pad1, 8))
 
         # not encrypted
         return p
 
-@dataclass
+@dataclass(slots=True)
 class Duid(_Duid):
     prefix : bytes # duid "prefix", 7 chars + NULL terminator
     serial : u32 # device serial number
     check  : bytes # checkcode relating to prefix+serial
     pad0   : bytes = field(repr=False, kw_only=True, default='\x00' * 2) # padding
 
+    _struct0 = struct.Struct(">8sI6s2s")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        prefix, p = String.parse(p, 8)
-        serial, p = u32.parse(p)
-        check, p = String.parse(p, 6)
-        pad0, p = Zeroes.parse(p, 2)
+        try:
+            prefix, serial, check, pad0 = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        prefix = String.parse(prefix, 8)[0]
+        check = String.parse(check, 6)[0]
+        pad0 = Zeroes.parse(pad0, 2)[0]
+        p = p[20:]
 
         return cls(prefix=prefix, serial=serial, check=check, pad0=pad0), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            prefix, serial, check, pad0 = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        prefix = String.parse(prefix, 8)[0]
+        check = String.parse(check, 6)[0]
+        pad0 = Zeroes.parse(pad0, 2)[0]
+        offset += 20
+
+        return cls(prefix=prefix, serial=serial, check=check, pad0=pad0), offset
+
     def pack(self):
-        p  = String.pack(self.prefix, 8)
-        p += u32.pack(self.serial)
-        p += String.pack(self.check, 6)
-        p += Zeroes.pack(self.pad0, 2)
+        p  = self._struct0.pack(String.pack(self.prefix, 8), self.serial, String.pack(self.check, 6), Zeroes.pack(self.pad0, 2))
 
         # not encrypted
         return p
 
-@dataclass
+@dataclass(slots=True)
 class Xzyh(_Xzyh):
     magic     : bytes = field(repr=False, kw_only=True, default=b'XZYH') # unknown
     cmd       : P2PCmdType # Command field (P2PCmdType)
@@ -431,38 +520,44 @@ class Xzyh(_Xzyh):
     dev_type  : u8 # unknown
     data      : bytes # unknown
 
+    _struct0 = struct.Struct("<4sHIBBBBBB")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        magic, p = Magic.parse(p, 4, b'XZYH')
-        cmd, p = P2PCmdType.parse(p, u16le)
-        len, p = u32le.parse(p)
-        unk0, p = u8.parse(p)
-        unk1, p = u8.parse(p)
-        chan, p = u8.parse(p)
-        sign_code, p = u8.parse(p)
-        unk3, p = u8.parse(p)
-        dev_type, p = u8.parse(p)
+        try:
+            magic, cmd, len, unk0, unk1, chan, sign_code, unk3, dev_type = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        magic = Magic.parse(magic, 4, b'XZYH')[0]
+        cmd = P2PCmdType(cmd)
+        p = p[16:]
         data, p = Bytes.parse(p, len)
 
         return cls(magic=magic, cmd=cmd, len=len, unk0=unk0, unk1=unk1, chan=chan, sign_code=sign_code, unk3=unk3, dev_type=dev_type, data=data), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            magic, cmd, len, unk0, unk1, chan, sign_code, unk3, dev_type = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        magic = Magic.parse(magic, 4, b'XZYH')[0]
+        cmd = P2PCmdType(cmd)
+        offset += 16
+        data, offset = Bytes.parse_from(p, offset, len)
+
+        return cls(magic=magic, cmd=cmd, len=len, unk0=unk0, unk1=unk1, chan=chan, sign_code=sign_code, unk3=unk3, dev_type=dev_type, data=data), offset
+
     def pack(self):
-        p  = Magic.pack(self.magic, 4, b'XZYH')
-        p += P2PCmdType.pack(self.cmd, u16le)
-        p += u32le.pack(self.len)
-        p += u8.pack(self.unk0)
-        p += u8.pack(self.unk1)
-        p += u8.pack(self.chan)
-        p += u8.pack(self.sign_code)
-        p += u8.pack(self.unk3)
-        p += u8.pack(self.dev_type)
+        p  = self._struct0.pack(Magic.pack(self.magic, 4, b'XZYH'), self.cmd, self.len, self.unk0, self.unk1, self.chan, self.sign_code, self.unk3, self.dev_type)
         p += Bytes.pack(self.data, self.len)
 
         # not encrypted
         return p
 
-@dataclass
+@dataclass(slots=True)
 class Aabb(_Aabb):
     signature : bytes = field(repr=False, kw_only=True, default=b'\xaa\xbb') # Signature bytes. Must be 0xAABB
     frametype : FileTransfer # Frame type (file transfer control)
@@ -470,72 +565,115 @@ class Aabb(_Aabb):
     pos       : u32le # File offset to write to
     len       : u32le # Length field
 
+    _struct0 = struct.Struct("<2sBBII")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        signature, p = Magic.parse(p, 2, b'\xaa\xbb')
-        frametype, p = FileTransfer.parse(p)
-        sn, p = u8.parse(p)
-        pos, p = u32le.parse(p)
-        len, p = u32le.parse(p)
+        try:
+            signature, frametype, sn, pos, len = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        signature = Magic.parse(signature, 2, b'\xaa\xbb')[0]
+        frametype = FileTransfer(frametype)
+        p = p[12:]
 
         return cls(signature=signature, frametype=frametype, sn=sn, pos=pos, len=len), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            signature, frametype, sn, pos, len = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        signature = Magic.parse(signature, 2, b'\xaa\xbb')[0]
+        frametype = FileTransfer(frametype)
+        offset += 12
+
+        return cls(signature=signature, frametype=frametype, sn=sn, pos=pos, len=len), offset
+
     def pack(self):
-        p  = Magic.pack(self.signature, 2, b'\xaa\xbb')
-        p += FileTransfer.pack(self.frametype)
-        p += u8.pack(self.sn)
-        p += u32le.pack(self.pos)
-        p += u32le.pack(self.len)
+        p  = self._struct0.pack(Magic.pack(self.signature, 2, b'\xaa\xbb'), self.frametype, self.sn, self.pos, self.len)
 
         # not encrypted
         return p
 
-@dataclass
+@dataclass(slots=True)
 class Dsk(_Dsk):
     key : bytes # unknown
     pad : bytes = field(repr=False, kw_only=True, default='\x00' * 4) # unknown
 
+    _struct0 = struct.Struct(">20s4s")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        key, p = Bytes.parse(p, 20)
-        pad, p = Zeroes.parse(p, 4)
+        try:
+            key, pad = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad = Zeroes.parse(pad, 4)[0]
+        p = p[24:]
 
         return cls(key=key, pad=pad), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            key, pad = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad = Zeroes.parse(pad, 4)[0]
+        offset += 24
+
+        return cls(key=key, pad=pad), offset
+
     def pack(self):
-        p  = Bytes.pack(self.key, 20)
-        p += Zeroes.pack(self.pad, 4)
+        p  = self._struct0.pack(Bytes.pack(self.key, 20), Zeroes.pack(self.pad, 4))
 
         # not encrypted
         return p
 
-@dataclass
+@dataclass(slots=True)
 class Version(_Version):
     major : u8 # unknown
     minor : u8 # unknown
     patch : u8 # unknown
 
+    _struct0 = struct.Struct(">BBB")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        major, p = u8.parse(p)
-        minor, p = u8.parse(p)
-        patch, p = u8.parse(p)
+        try:
+            major, minor, patch = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[3:]
 
         return cls(major=major, minor=minor, patch=patch), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            major, minor, patch = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 3
+
+        return cls(major=major, minor=minor, patch=patch), offset
+
     def pack(self):
-        p  = u8.pack(self.major)
-        p += u8.pack(self.minor)
-        p += u8.pack(self.patch)
+        p  = self._struct0.pack(self.major, self.minor, self.patch)
 
         # not encrypted
         return p
 
 
-@dataclass
+@dataclass(slots=True)
 class PktDrw(Message):
     type = Type.DRW
     signature : bytes = field(repr=False, kw_only=True, default=b'\xd1') # Signature byte. Must be 0xD1
@@ -543,26 +681,42 @@ class PktDrw(Message):
     index     : u16 # Packet index
     data      : bytes # Payload
 
+    _struct0 = struct.Struct(">1sBH")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        signature, p = Magic.parse(p, 1, b'\xd1')
-        chan, p = u8.parse(p)
-        index, p = u16.parse(p)
+        try:
+            signature, chan, index = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        signature = Magic.parse(signature, 1, b'\xd1')[0]
+        p = p[4:]
         data, p = Tail.parse(p)
 
         return cls(signature=signature, chan=chan, index=index, data=data), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            signature, chan, index = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        signature = Magic.parse(signature, 1, b'\xd1')[0]
+        offset += 4
+        data, offset = Tail.parse_from(p, offset)
+
+        return cls(signature=signature, chan=chan, index=index, data=data), offset
+
     def pack(self):
-        p  = Magic.pack(self.signature, 1, b'\xd1')
-        p += u8.pack(self.chan)
-        p += u16.pack(self.index)
+        p  = self._struct0.pack(Magic.pack(self.signature, 1, b'\xd1'), self.chan, self.index)
         p += Tail.pack(self.data)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktDrwAck(Message):
     type = Type.DRW_ACK
     signature : bytes = field(repr=False, kw_only=True, default=b'\xd1') # Signature byte. Must be 0xD1
@@ -570,26 +724,42 @@ class PktDrwAck(Message):
     count     : u16 # Number of acks following
     acks      : list[u16] # Array of acknowledged DRW packet
 
+    _struct0 = struct.Struct(">1sBH")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        signature, p = Magic.parse(p, 1, b'\xd1')
-        chan, p = u8.parse(p)
-        count, p = u16.parse(p)
+        try:
+            signature, chan, count = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        signature = Magic.parse(signature, 1, b'\xd1')[0]
+        p = p[4:]
         acks, p = Array.parse(p, u16, count)
 
         return cls(signature=signature, chan=chan, count=count, acks=acks), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            signature, chan, count = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        signature = Magic.parse(signature, 1, b'\xd1')[0]
+        offset += 4
+        acks, offset = Array.parse_from(p, offset, u16, count)
+
+        return cls(signature=signature, chan=chan, count=count, acks=acks), offset
+
     def pack(self):
-        p  = Magic.pack(self.signature, 1, b'\xd1')
-        p += u8.pack(self.chan)
-        p += u16.pack(self.count)
+        p  = self._struct0.pack(Magic.pack(self.signature, 1, b'\xd1'), self.chan, self.count)
         p += Array.pack(self.acks, u16, self.count)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktPunchTo(Message):
     type = Type.PUNCH_TO
     host : Host # unknown
@@ -601,13 +771,20 @@ def parse(cls, p):
 
         return cls(host=host), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        host, offset = Host.parse_from(p, offset)
+
+        return cls(host=host), offset
+
     def pack(self):
         p  = Host.pack(self.host)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktHello(Message):
     type = Type.HELLO
 
@@ -617,13 +794,19 @@ def parse(cls, p):
 
         return cls(), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+
+        return cls(), offset
+
     def pack(self):
         p = b""
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktLanSearch(Message):
     type = Type.LAN_SEARCH
 
@@ -633,13 +816,19 @@ def parse(cls, p):
 
         return cls(), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+
+        return cls(), offset
+
     def pack(self):
         p = b""
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyHello(Message):
     type = Type.RLY_HELLO
 
@@ -649,13 +838,19 @@ def parse(cls, p):
 
         return cls(), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+
+        return cls(), offset
+
     def pack(self):
         p = b""
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyHelloAck(Message):
     type = Type.RLY_HELLO_ACK
 
@@ -665,13 +860,19 @@ def parse(cls, p):
 
         return cls(), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+
+        return cls(), offset
+
     def pack(self):
         p = b""
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyPort(Message):
     type = Type.RLY_PORT
 
@@ -681,79 +882,136 @@ def parse(cls, p):
 
         return cls(), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+
+        return cls(), offset
+
     def pack(self):
         p = b""
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyPortAck(Message):
     type = Type.RLY_PORT_ACK
     mark : u32 # unknown
     port : u16 # unknown
     pad  : bytes = field(repr=False, kw_only=True, default='\x00' * 2) # unknown
 
+    _struct0 = struct.Struct(">IH2s")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        mark, p = u32.parse(p)
-        port, p = u16.parse(p)
-        pad, p = Zeroes.parse(p, 2)
+        try:
+            mark, port, pad = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad = Zeroes.parse(pad, 2)[0]
+        p = p[8:]
 
         return cls(mark=mark, port=port, pad=pad), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            mark, port, pad = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad = Zeroes.parse(pad, 2)[0]
+        offset += 8
+
+        return cls(mark=mark, port=port, pad=pad), offset
+
     def pack(self):
-        p  = u32.pack(self.mark)
-        p += u16.pack(self.port)
-        p += Zeroes.pack(self.pad, 2)
+        p  = self._struct0.pack(self.mark, self.port, Zeroes.pack(self.pad, 2))
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyReq(Message):
     type = Type.RLY_REQ
     duid : Duid # unknown
     host : Host # unknown
     mark : u32 # unknown
 
+    _struct0 = struct.Struct(">I")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
         duid, p = Duid.parse(p)
         host, p = Host.parse(p)
-        mark, p = u32.parse(p)
+        try:
+            mark, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[4:]
 
         return cls(duid=duid, host=host, mark=mark), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        duid, offset = Duid.parse_from(p, offset)
+        host, offset = Host.parse_from(p, offset)
+        try:
+            mark, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 4
+
+        return cls(duid=duid, host=host, mark=mark), offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
         p += Host.pack(self.host)
-        p += u32.pack(self.mark)
+        p += self._struct0.pack(self.mark)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyReqAck(Message):
     type = Type.RLY_REQ_ACK
     mark : u32 # unknown
 
+    _struct0 = struct.Struct(">I")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        mark, p = u32.parse(p)
+        try:
+            mark, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[4:]
 
         return cls(mark=mark), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            mark, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 4
+
+        return cls(mark=mark), offset
+
     def pack(self):
-        p  = u32.pack(self.mark)
+        p  = self._struct0.pack(self.mark)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktAlive(Message):
     type = Type.ALIVE
 
@@ -763,13 +1021,19 @@ def parse(cls, p):
 
         return cls(), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+
+        return cls(), offset
+
     def pack(self):
         p = b""
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktAliveAck(Message):
     type = Type.ALIVE_ACK
 
@@ -779,13 +1043,19 @@ def parse(cls, p):
 
         return cls(), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+
+        return cls(), offset
+
     def pack(self):
         p = b""
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktClose(Message):
     type = Type.CLOSE
 
@@ -795,13 +1065,19 @@ def parse(cls, p):
 
         return cls(), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+
+        return cls(), offset
+
     def pack(self):
         p = b""
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktHelloAck(Message):
     type = Type.HELLO_ACK
     host : Host # unknown
@@ -813,13 +1089,20 @@ def parse(cls, p):
 
         return cls(host=host), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        host, offset = Host.parse_from(p, offset)
+
+        return cls(host=host), offset
+
     def pack(self):
         p  = Host.pack(self.host)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktPunchPkt(Message):
     type = Type.PUNCH_PKT
     duid : Duid # unknown
@@ -831,13 +1114,20 @@ def parse(cls, p):
 
         return cls(duid=duid), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        duid, offset = Duid.parse_from(p, offset)
+
+        return cls(duid=duid), offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktP2pRdy(Message):
     type = Type.P2P_RDY
     duid : Duid # unknown
@@ -849,13 +1139,20 @@ def parse(cls, p):
 
         return cls(duid=duid), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        duid, offset = Duid.parse_from(p, offset)
+
+        return cls(duid=duid), offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktP2pReq(Message):
     type = Type.P2P_REQ
     duid : Duid # unknown
@@ -869,32 +1166,57 @@ def parse(cls, p):
 
         return cls(duid=duid, host=host), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        duid, offset = Duid.parse_from(p, offset)
+        host, offset = Host.parse_from(p, offset)
+
+        return cls(duid=duid, host=host), offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
         p += Host.pack(self.host)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktP2pReqAck(Message):
     type = Type.P2P_REQ_ACK
     mark : u32 # unknown
 
+    _struct0 = struct.Struct(">I")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        mark, p = u32.parse(p)
+        try:
+            mark, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[4:]
 
         return cls(mark=mark), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            mark, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 4
+
+        return cls(mark=mark), offset
+
     def pack(self):
-        p  = u32.pack(self.mark)
+        p  = self._struct0.pack(self.mark)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktP2pReqDsk(Message):
     type = Type.P2P_REQ_DSK
     duid     : Duid # unknown
@@ -903,52 +1225,94 @@ class PktP2pReqDsk(Message):
     version  : Version # unknown
     dsk      : Dsk # unknown
 
+    _struct0 = struct.Struct(">B")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
         duid, p = Duid.parse(p)
         host, p = Host.parse(p)
-        nat_type, p = u8.parse(p)
+        try:
+            nat_type, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[1:]
         version, p = Version.parse(p)
         dsk, p = Dsk.parse(p)
 
         return cls(duid=duid, host=host, nat_type=nat_type, version=version, dsk=dsk), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        duid, offset = Duid.parse_from(p, offset)
+        host, offset = Host.parse_from(p, offset)
+        try:
+            nat_type, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 1
+        version, offset = Version.parse_from(p, offset)
+        dsk, offset = Dsk.parse_from(p, offset)
+
+        return cls(duid=duid, host=host, nat_type=nat_type, version=version, dsk=dsk), offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
         p += Host.pack(self.host)
-        p += u8.pack(self.nat_type)
+        p += self._struct0.pack(self.nat_type)
         p += Version.pack(self.version)
         p += Dsk.pack(self.dsk)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktP2pRdyAck(Message):
     type = Type.P2P_RDY_ACK
     duid : Duid # unknown
     host : Host # unknown
     pad  : bytes = field(repr=False, kw_only=True, default='\x00' * 8) # unknown
 
+    _struct0 = struct.Struct(">8s")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
         duid, p = Duid.parse(p)
         host, p = Host.parse(p)
-        pad, p = Zeroes.parse(p, 8)
+        try:
+            pad, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad = Zeroes.parse(pad, 8)[0]
+        p = p[8:]
 
         return cls(duid=duid, host=host, pad=pad), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        duid, offset = Duid.parse_from(p, offset)
+        host, offset = Host.parse_from(p, offset)
+        try:
+            pad, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad = Zeroes.parse(pad, 8)[0]
+        offset += 8
+
+        return cls(duid=duid, host=host, pad=pad), offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
         p += Host.pack(self.host)
-        p += Zeroes.pack(self.pad, 8)
+        p += self._struct0.pack(Zeroes.pack(self.pad, 8))
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktListReqDsk(Message):
     type = Type.LIST_REQ_DSK
     duid : Duid # Device id
@@ -962,38 +1326,64 @@ def parse(cls, p):
 
         return cls(duid=duid, dsk=dsk), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        duid, offset = Duid.parse_from(p, offset)
+        dsk, offset = Dsk.parse_from(p, offset)
+
+        return cls(duid=duid, dsk=dsk), offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
         p += Dsk.pack(self.dsk)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktListReqAck(Message):
     type = Type.LIST_REQ_ACK
     numr   : u8 # Number of relays
     pad    : bytes = field(repr=False, kw_only=True, default='\x00' * 3) # Padding
     relays : list[Host] # Available relay hosts
 
+    _struct0 = struct.Struct(">B3s")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        numr, p = u8.parse(p)
-        pad, p = Zeroes.parse(p, 3)
+        try:
+            numr, pad = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad = Zeroes.parse(pad, 3)[0]
+        p = p[4:]
         relays, p = Array.parse(p, Host, numr)
 
         return cls(numr=numr, pad=pad, relays=relays), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            numr, pad = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad = Zeroes.parse(pad, 3)[0]
+        offset += 4
+        relays, offset = Array.parse_from(p, offset, Host, numr)
+
+        return cls(numr=numr, pad=pad, relays=relays), offset
+
     def pack(self):
-        p  = u8.pack(self.numr)
-        p += Zeroes.pack(self.pad, 3)
+        p  = self._struct0.pack(self.numr, Zeroes.pack(self.pad, 3))
         p += Array.pack(self.relays, Host, self.numr)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktDevLgnCrc(Message):
     type = Type.DEV_LGN_CRC
     duid     : Duid # unknown
@@ -1001,71 +1391,138 @@ class PktDevLgnCrc(Message):
     version  : Version # unknown
     host     : Host # unknown
 
+    _struct0 = struct.Struct(">B")
+
     @classmethod
     def parse(cls, p):
         p = crypto_decurse_string(p)
         duid, p = Duid.parse(p)
-        nat_type, p = u8.parse(p)
+        try:
+            nat_type, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[1:]
         version, p = Version.parse(p)
         host, p = Host.parse(p)
 
         return cls(duid=duid, nat_type=nat_type, version=version, host=host), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        end, p, offset = len(p), crypto_decurse_string(p[offset:]), 0
+        duid, offset = Duid.parse_from(p, offset)
+        try:
+            nat_type, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 1
+        version, offset = Version.parse_from(p, offset)
+        host, offset = Host.parse_from(p, offset)
+
+        return cls(duid=duid, nat_type=nat_type, version=version, host=host), end - len(p) + offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
-        p += u8.pack(self.nat_type)
+        p += self._struct0.pack(self.nat_type)
         p += Version.pack(self.version)
         p += Host.pack(self.host)
 
         p = crypto_curse_string(p)
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyTo(Message):
     type = Type.RLY_TO
     host : Host # unknown
     mark : u32 # unknown
 
+    _struct0 = struct.Struct(">I")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
         host, p = Host.parse(p)
-        mark, p = u32.parse(p)
+        try:
+            mark, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[4:]
 
         return cls(host=host, mark=mark), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        host, offset = Host.parse_from(p, offset)
+        try:
+            mark, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 4
+
+        return cls(host=host, mark=mark), offset
+
     def pack(self):
         p  = Host.pack(self.host)
-        p += u32.pack(self.mark)
+        p += self._struct0.pack(self.mark)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyPkt(Message):
     type = Type.RLY_PKT
     mark : u32 # unknown
     duid : Duid # unknown
     unk  : u32 # unknown
 
+    _struct0 = struct.Struct(">I")
+
+    _struct1 = struct.Struct(">I")
+
     @classmethod
     def parse(cls, p):
         # not encrypted
-        mark, p = u32.parse(p)
+        try:
+            mark, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[4:]
         duid, p = Duid.parse(p)
-        unk, p = u32.parse(p)
+        try:
+            unk, = cls._struct1.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        p = p[4:]
 
         return cls(mark=mark, duid=duid, unk=unk), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        try:
+            mark, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 4
+        duid, offset = Duid.parse_from(p, offset)
+        try:
+            unk, = cls._struct1.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        offset += 4
+
+        return cls(mark=mark, duid=duid, unk=unk), offset
+
     def pack(self):
-        p  = u32.pack(self.mark)
+        p  = self._struct0.pack(self.mark)
         p += Duid.pack(self.duid)
-        p += u32.pack(self.unk)
+        p += self._struct1.pack(self.unk)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktRlyRdy(Message):
     type = Type.RLY_RDY
     duid : Duid # unknown
@@ -1077,31 +1534,57 @@ def parse(cls, p):
 
         return cls(duid=duid), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        # not encrypted
+        duid, offset = Duid.parse_from(p, offset)
+
+        return cls(duid=duid), offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
 
         # not encrypted
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktDevLgnAckCrc(Message):
     type = Type.DEV_LGN_ACK_CRC
     pad0 : bytes = field(repr=False, kw_only=True, default='\x00' * 4) # unknown
 
+    _struct0 = struct.Struct(">4s")
+
     @classmethod
     def parse(cls, p):
         p = crypto_decurse_string(p)
-        pad0, p = Zeroes.parse(p, 4)
+        try:
+            pad0, = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad0 = Zeroes.parse(pad0, 4)[0]
+        p = p[4:]
 
         return cls(pad0=pad0), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        end, p, offset = len(p), crypto_decurse_string(p[offset:]), 0
+        try:
+            pad0, = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad0 = Zeroes.parse(pad0, 4)[0]
+        offset += 4
+
+        return cls(pad0=pad0), end - len(p) + offset
+
     def pack(self):
-        p  = Zeroes.pack(self.pad0, 4)
+        p  = self._struct0.pack(Zeroes.pack(self.pad0, 4))
 
         p = crypto_curse_string(p)
-        return super().pack(p)
+        return Message.pack(self, p)
 
-@dataclass
+@dataclass(slots=True)
 class PktSessionReady(Message):
     type = Type.REPORT_SESSION_READY
     duid           : Duid # unknown
@@ -1118,42 +1601,49 @@ class PktSessionReady(Message):
     addr_wan       : Host # unknown
     addr_relay     : Host # unknown
 
+    _struct0 = struct.Struct(">iHHHBBBB2s")
+
     @classmethod
     def parse(cls, p):
         p = simple_decrypt_string(p)
         duid, p = Duid.parse(p)
-        handle, p = i32.parse(p)
-        max_handles, p = u16.parse(p)
-        active_handles, p = u16.parse(p)
-        startup_ticks, p = u16.parse(p)
-        b1, p = u8.parse(p)
-        b2, p = u8.parse(p)
-        b3, p = u8.parse(p)
-        b4, p = u8.parse(p)
-        pad0, p = Zeroes.parse(p, 2)
+        try:
+            handle, max_handles, active_handles, startup_ticks, b1, b2, b3, b4, pad0 = cls._struct0.unpack_from(p)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad0 = Zeroes.parse(pad0, 2)[0]
+        p = p[16:]
         addr_local, p = Host.parse(p)
         addr_wan, p = Host.parse(p)
         addr_relay, p = Host.parse(p)
 
         return cls(duid=duid, handle=handle, max_handles=max_handles, active_handles=active_handles, startup_ticks=startup_ticks, b1=b1, b2=b2, b3=b3, b4=b4, pad0=pad0, addr_local=addr_local, addr_wan=addr_wan, addr_relay=addr_relay), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+        end, p, offset = len(p), simple_decrypt_string(p[offset:]), 0
+        duid, offset = Duid.parse_from(p, offset)
+        try:
+            handle, max_handles, active_handles, startup_ticks, b1, b2, b3, b4, pad0 = cls._struct0.unpack_from(p, offset)
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+        pad0 = Zeroes.parse(pad0, 2)[0]
+        offset += 16
+        addr_local, offset = Host.parse_from(p, offset)
+        addr_wan, offset = Host.parse_from(p, offset)
+        addr_relay, offset = Host.parse_from(p, offset)
+
+        return cls(duid=duid, handle=handle, max_handles=max_handles, active_handles=active_handles, startup_ticks=startup_ticks, b1=b1, b2=b2, b3=b3, b4=b4, pad0=pad0, addr_local=addr_local, addr_wan=addr_wan, addr_relay=addr_relay), end - len(p) + offset
+
     def pack(self):
         p  = Duid.pack(self.duid)
-        p += i32.pack(self.handle)
-        p += u16.pack(self.max_handles)
-        p += u16.pack(self.active_handles)
-        p += u16.pack(self.startup_ticks)
-        p += u8.pack(self.b1)
-        p += u8.pack(self.b2)
-        p += u8.pack(self.b3)
-        p += u8.pack(self.b4)
-        p += Zeroes.pack(self.pad0, 2)
+        p += self._struct0.pack(self.handle, self.max_handles, self.active_handles, self.startup_ticks, self.b1, self.b2, self.b3, self.b4, Zeroes.pack(self.pad0, 2))
         p += Host.pack(self.addr_local)
         p += Host.pack(self.addr_wan)
         p += Host.pack(self.addr_relay)
 
         p = simple_encrypt_string(p)
-        return super().pack(p)
+        return Message.pack(self, p)
 
 
 MessageTypeTable = {
@@ -1,26 +1,47 @@
 import os
+import sys
+import time
+import heapq
 import socket
+import struct
+import select
 import string
 import hashlib
+import unittest
 import logging as log
 
 from enum import Enum
+from collections import deque
 from multiprocessing import Pipe
 from datetime import datetime, timedelta
-from threading import Thread, Event, Lock
+from threading import Thread, Event, Lock, Condition
 from socket import AF_INET
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-from libflagship.cyclic import CyclicU16
+from libflagship import pkttrace
+from libflagship import seqnum
 from libflagship.pppp import Type, \
     PktDrw, PktDrwAck, PktClose, PktSessionReady, PktAliveAck, PktDevLgnAckCrc, \
     PktHelloAck, PktP2pRdyAck, PktP2pRdy, PktLanSearch, \
-    Host, Message, Xzyh, Aabb, FileTransferReply
+    Host, Duid, Message, Xzyh, Aabb, FileTransfer, FileTransferReply
 
 
 PPPP_LAN_PORT = 32108
 PPPP_WAN_PORT = 32100
 
+# largest datagram we expect to receive
+PPPP_MAX_DATAGRAM = 4096
+
+# socket receive buffer size. video bursts easily overflow the (often much
+# smaller) system default, and every datagram lost there must be retransmitted
+PPPP_RCVBUF = 1024 * 1024
+
+# most datagrams received in one go, before processing them
+PPPP_RECV_BATCH = 64
+
+# kernel drop counter, delivered as ancillary data (linux only)
+SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40 if sys.platform.startswith("linux") else None)
+
 
 class PPPPError(Exception):
 
@@ -54,8 +75,37 @@ def sanitize(c):
 
     @classmethod
     def from_file(cls, filename, user_name, user_id, machine_id, type=0):
-        data = open(filename, "rb").read()
-        return cls.from_data(data, filename, user_name, user_id, machine_id, type=0)
+        with open(filename, "rb") as fd:
+            return cls.from_fd(fd, filename, user_name, user_id, machine_id, type=type)
+
+    @classmethod
+    def from_fd(cls, fd, filename, user_name, user_id, machine_id, type=0, blocksize=1024 * 1024):
+        """Compute upload info in a single pass over `fd`, without reading it into memory.
+
+        The file position is restored afterwards, so `fd` must be seekable.
+        """
+        if not fd.seekable():
+            raise ValueError(f"Cannot upload {filename!r}: file must be seekable (not a pipe)")
+
+        start = fd.tell()
+        md5 = hashlib.md5()
+        size = 0
+
+        while chunk := fd.read(blocksize):
+            md5.update(chunk)
+            size += len(chunk)
+
+        fd.seek(start)
+
+        return cls(
+            name=cls.sanitize_filename(os.path.basename(filename)),
+            size=size,
+            md5=md5.hexdigest(),
+            user_name=user_name,
+            user_id=user_id,
+            machine_id=machine_id,
+            type=type
+        )
 
     @classmethod
     def from_data(cls, data, filename, user_name, user_id, machine_id, type=0):
@@ -77,12 +127,95 @@ def __bytes__(self):
 
 
 class Wire:
+    """Byte stream reassembled from the DRW packets of a single channel.
+
+    Incoming data is kept as a queue of the received chunks, along with a read
+    offset into the first chunk. Reads and peeks return a `memoryview` into
+    that storage, so data is only copied when a request spans several chunks.
+    Consuming data is amortized O(1), since fully read chunks are simply
+    dropped from the front of the queue.
+
+    Chunks are handed from the writer to the reader thread in-process, guarded
+    by a condition variable. See `PipeWire` for a variant that passes the
+    chunks through a `multiprocessing.Pipe` instead.
+    """
 
     def __init__(self):
-        self.buf = []
-        self.rx, self.tx = Pipe(False)
+        self.chunks = deque()
+        self.offset = 0
+        self.size = 0
+        self.cond = Condition()
+
+    def __len__(self):
+        return self.size
+
+    def _view(self, size):
+        if not self.chunks:
+            return memoryview(b"")
+
+        end = self.offset + size
+
+        if len(self.chunks[0]) < end:
+            # the requested range spans several chunks, so join them into a
+            # single chunk. this only happens once per range, since the joined
+            # chunk replaces the original ones.
+            parts = []
+            length = 0
+            while length < end:
+                chunk = self.chunks.popleft()
+                parts.append(chunk)
+                length += len(chunk)
+            self.chunks.appendleft(b"".join(parts))
+
+        return memoryview(self.chunks[0])[self.offset:end]
+
+    def _consume(self, size):
+        self.size -= size
+        offset = self.offset + size
+        while self.chunks and offset >= len(self.chunks[0]):
+            offset -= len(self.chunks.popleft())
+        self.offset = offset
+
+    def _append(self, chunk):
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+
+    def _fill(self, size, timeout):
+        return self.cond.wait_for(lambda: self.size >= size, timeout=timeout)
 
     def peek(self, size, timeout=None):
+        with self.cond:
+            if not self._fill(size, timeout):
+                return None
+            return self._view(size)
+
+    def read(self, size, timeout=None):
+        with self.cond:
+            if not self._fill(size, timeout):
+                return None
+            res = self._view(size)
+            self._consume(size)
+            return res
+
+    def write(self, data):
+        with self.cond:
+            self._append(data)
+            self.cond.notify_all()
+
+
+class PipeWire(Wire):
+    """Wire that passes chunks through a `multiprocessing.Pipe`.
+
+    Slower than the in-process `Wire`, since every chunk is pickled and sent
+    through a socket pair, but allows the reading end to be handed to another
+    process.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rx, self.tx = Pipe(False)
+
+    def _fill(self, size, timeout):
         # Zero timeout on self.rx.poll() means "wait forever", but we want it to
         # mean "no wait", so we emulate that by setting it to 1us.
         if timeout == 0.0:
@@ -91,93 +224,405 @@ def peek(self, size, timeout=None):
         if timeout is not None:
             deadline = datetime.now() + timedelta(seconds=timeout)
 
-        while len(self.buf) < size:
+        while self.size < size:
             if timeout and not self.rx.poll(timeout=(deadline - datetime.now()).total_seconds()):
-                return None
-            self.buf.extend(self.rx.recv())
-
-        return bytes(self.buf[:size])
+                return False
+            self._append(self.rx.recv_bytes())
 
-    def read(self, size, timeout=None):
-        res = self.peek(size, timeout)
-        if res:
-            self.buf = self.buf[size:]
-        return res
+        return True
 
     def write(self, data):
-        self.tx.send(data)
+        # send raw bytes, since received chunks are memoryviews, which
+        # cannot be pickled
+        self.tx.send_bytes(data)
+
+
+@dataclass
+class ChannelStats:
+    transmits: int = 0
+    retransmits: int = 0
+    rtt_samples: int = 0
+    rtt_sum: float = 0.0
+    rtt_min: float = None
+    rtt_max: float = None
+
+    @property
+    def rtt_avg(self):
+        if not self.rtt_samples:
+            return None
+        return self.rtt_sum / self.rtt_samples
+
+    def add_rtt(self, rtt):
+        self.rtt_samples += 1
+        self.rtt_sum += rtt
+        if self.rtt_min is None or rtt < self.rtt_min:
+            self.rtt_min = rtt
+        if self.rtt_max is None or rtt > self.rtt_max:
+            self.rtt_max = rtt
+
+
+@dataclass
+class RecvStats:
+    batches: int = 0
+    packets: int = 0
+    max_batch: int = 0
+    truncated: int = 0
+    dropped: int = 0
+    malformed: int = 0
+
+    @property
+    def avg_batch(self):
+        if not self.batches:
+            return None
+        return self.packets / self.batches
+
+    def add_batch(self, size):
+        self.batches += 1
+        self.packets += size
+        if size > self.max_batch:
+            self.max_batch = size
+
+
+class RttEstimator:
+    """Retransmission timeout estimator, as described in RFC 6298.
+
+    Keeps a smoothed round-trip time (SRTT) and its variation (RTTVAR), and
+    derives the retransmission timeout (RTO) from those. Callers must only
+    feed samples from packets that were transmitted exactly once (Karn's
+    algorithm).
+    """
+
+    alpha = 1 / 8
+    beta = 1 / 4
+
+    def __init__(self, initial=0.5, min=0.05, max=5.0, granularity=0.005):
+        self.min = min
+        self.max = max
+        self.granularity = granularity
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+
+        self.rto = self._clamp(self.srtt + max(self.granularity, 4 * self.rttvar))
+
+    def backoff(self):
+        self.rto = self._clamp(self.rto * 2)
+
+    def _clamp(self, rto):
+        return min(max(rto, self.min), self.max)
+
+
+class CongestionWindow:
+    """AIMD congestion window, limiting the number of DRW packets in flight.
+
+    The window grows by one packet per ACK until it reaches the slow-start
+    threshold, and by one packet per window of ACKs after that. On packet
+    loss, the window is halved, at most once per `holdoff` seconds.
+    """
+
+    def __init__(self, initial=32, min=2, max=512):
+        self.min = min
+        self.max = max
+        self.cwnd = float(initial)
+        self.ssthresh = float(max)
+        self.last_loss = None
+
+    @property
+    def size(self):
+        return int(self.cwnd)
+
+    def on_ack(self):
+        if self.cwnd < self.ssthresh:
+            self.cwnd += 1
+        else:
+            self.cwnd += 1 / self.cwnd
+        self.cwnd = min(self.cwnd, self.max)
+
+    def on_loss(self, now, holdoff):
+        if self.last_loss is not None and now - self.last_loss < holdoff:
+            return
+
+        self.last_loss = now
+        self.ssthresh = max(self.cwnd / 2, self.min)
+        self.cwnd = self.ssthresh
+
+
+@dataclass
+class ReorderStats:
+    queued: int = 0
+    refused: int = 0
+    skipped: int = 0
+    max_depth: int = 0
+    max_bytes: int = 0
+    # distances[n] counts packets that arrived between 2**(n-1) and 2**n - 1
+    # packets ahead of the next expected one
+    distances: list = field(default_factory=lambda: [0] * 17)
+
+    def add(self, distance, depth, size):
+        self.queued += 1
+        self.distances[distance.bit_length()] += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if size > self.max_bytes:
+            self.max_bytes = size
+
+    def histogram(self):
+        """Return a list of ((min, max), count) reorder distance buckets, skipping empty ones"""
+        return [((1 << n >> 1, (1 << n) - 1), count) for n, count in enumerate(self.distances) if count]
+
+
+class ReorderBuffer:
+    """Out-of-order DRW packets, waiting for the packets before them.
+
+    Packets are accepted up to `window` packets ahead of the next expected
+    packet, as long as all queued payloads fit in `budget` bytes. Queued
+    payloads are copied, so they do not hold on to receive buffers.
+
+    Packets that do not fit are refused, and must not be acknowledged, so the
+    peer sends them again later. With the "skip" policy, the channel instead
+    gives up on the missing packets, and delivers the queued ones with a gap
+    in the stream. This only suits readers that can resynchronize.
+    """
+
+    def __init__(self, window=1024, budget=1024 * 1024, policy="refuse"):
+        if policy not in {"refuse", "skip"}:
+            raise ValueError(f"Unknown reorder policy {policy!r}")
+        if not 0 < window <= 0x8000:
+            raise ValueError(f"Reorder window must be 1..{0x8000}, not {window!r}")
+        self.window = window
+        self.budget = budget
+        self.policy = policy
+        self.queue = {}
+        self.size = 0
+        self.stats = ReorderStats()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def push(self, index, distance, data):
+        if index in self.queue:
+            return True
+
+        if distance >= self.window or self.size + len(data) > self.budget:
+            self.stats.refused += 1
+            return False
+
+        self.queue[index] = bytes(data)
+        self.size += len(data)
+        self.stats.add(distance, len(self.queue), self.size)
+        return True
+
+    def pop(self, index):
+        data = self.queue.pop(index, None)
+        if data is not None:
+            self.size -= len(data)
+        return data
+
+    def first(self, expected):
+        """Return the queued index closest after `expected`"""
+        return min(self.queue, key=lambda index: seqnum.sub(index, expected))
+
+
+class InFlight:
+    """A transmitted DRW packet that is waiting for acknowledgment."""
+
+    __slots__ = ("index", "data", "deadline", "sent", "count")
+
+    def __init__(self, index, data):
+        self.index = index
+        self.data = data
+        self.deadline = None
+        self.sent = None
+        self.count = 0
 
 
 class Channel:
 
-    def __init__(self, index, max_in_flight=64, max_age_warn=128):
+    def __init__(self, index, max_age_warn=128, wire=Wire, rtt=None, cwnd=None, reorder=None):
         self.index = index
-        self.rxqueue = {}
-        self.txqueue = []
-        self.backlog = []
-        self.rx_ctr = CyclicU16(0)
-        self.tx_ctr = CyclicU16(0)
-        self.tx_ack = CyclicU16(0)
-        self.rx = Wire()
-        self.tx = Wire()
-        self.timeout = timedelta(seconds=0.5)
+        self.reorder = ReorderBuffer(**(reorder or {}))
+        self.inflight = {}
+        self.txheap = []
+        self.backlog = deque()
+        # sequence numbers, see libflagship.seqnum
+        self.rx_ctr = 0
+        self.tx_ctr = 0
+        self.tx_ack = 0
+        self.rx = wire()
+        self.rtt = RttEstimator(**(rtt or {}))
+        self.cwnd = CongestionWindow(**(cwnd or {}))
         self.acks = set()
         self.event = Event()
-        self.max_in_flight = max_in_flight
         self.max_age_warn = max_age_warn
         self.lock = Lock()
+        self.stats = ChannelStats()
+        self.wakeup = None
+        # optional libflagship.framer.StreamFramer, which then receives the
+        # stream instead of `rx`
+        self.framer = None
+        # the error of the framer, once it rejected the stream. nothing more
+        # is received then, and the reader must reconnect.
+        self.error = None
 
     def rx_ack(self, acks):
-        # remove all ACKed packets from transmission queue
-        self.txqueue = [tx for tx in self.txqueue if tx[1] not in acks]
+        now = time.monotonic()
+
+        # remove all ACKed packets from the in-flight index. their entries in
+        # the retransmit heap are skipped when they reach the top.
+        for ack in acks:
+            pkt = self.inflight.pop(ack, None)
+            if not pkt:
+                continue
+
+            self.cwnd.on_ack()
+
+            # only sample packets that were transmitted once, since an ACK for
+            # a retransmitted packet is ambiguous (Karn's algorithm)
+            if pkt.count == 1:
+                self.stats.add_rtt(now - pkt.sent)
+                self.rtt.sample(now - pkt.sent)
 
         # record any ACKs that are not yet confirmed
         for ack in acks:
-            if ack >= self.tx_ack:
+            if seqnum.ge(ack, self.tx_ack):
                 self.acks.add(ack)
 
         # update tx_ack step by step
         while self.tx_ack in self.acks:
             self.acks.remove(self.tx_ack)
-            self.tx_ack += 1
+            self.tx_ack = seqnum.add(self.tx_ack, 1)
 
     def rx_drw(self, index, data):
-        # drop any packets we have already recieved
-        if self.rx_ctr > index:
-            if self.max_age_warn and (self.rx_ctr - index > self.max_age_warn):
+        """Handle a received DRW packet.
+
+        Returns False if the packet was refused by the reorder buffer. It must
+        then not be acknowledged, so the peer sends it again.
+        """
+        # drop any packets we have already recieved. this goes by forward
+        # distance, since the reorder window reaches further ahead than the
+        # wraparound rule of seqnum.gt() allows.
+        if seqnum.sub(index, self.rx_ctr) >= 0x8000:
+            if self.max_age_warn and (seqnum.sub(self.rx_ctr, index) > self.max_age_warn):
                 log.warn(f"Dropping old packet: index {index} while expecting {self.rx_ctr}.")
-            return
+            return True
+
+        if index != self.rx_ctr:
+            if self.reorder.push(index, seqnum.sub(index, self.rx_ctr), data):
+                return True
+
+            if self.reorder.policy != "skip" or not self.reorder:
+                return False
+
+            # give up on the missing packets, and try again
+            first = self.reorder.first(self.rx_ctr)
+            log.warning(f"Skipping packets {self.rx_ctr} to {seqnum.sub(first, 1)} on channel {self.index}")
+            self.reorder.stats.skipped += seqnum.sub(first, self.rx_ctr)
+            self.rx_ctr = first
+            self._deliver()
+            return self.rx_drw(index, data)
+
+        self.rx_ctr = seqnum.add(self.rx_ctr, 1)
+        self._write(data)
+        self._deliver()
+        return True
+
+    def _deliver(self):
+        # recombine data from the reorder buffer
+        while (data := self.reorder.pop(self.rx_ctr)) is not None:
+            self.rx_ctr = seqnum.add(self.rx_ctr, 1)
+            self._write(data)
+
+    def _write(self, data):
+        if self.framer is None:
+            self.rx.write(data)
+        elif self.error is None:
+            # this runs on the receive path, so the error is left for the
+            # reader to raise, instead of ending the receive loop
+            try:
+                self.framer.feed(data)
+            except ValueError as E:
+                log.error(f"Corrupt stream on channel {self.index}: {E}")
+                self.error = E
 
-        # record packet in queue
-        self.rxqueue[index] = data
+    @property
+    def ready(self):
+        """Number of new packets the congestion window allows poll() to send now"""
+        if not self.backlog:
+            return 0
+        return max(min(len(self.backlog), self.cwnd.size - len(self.inflight)), 0)
 
-        # recombine data from queue
-        while self.rx_ctr in self.rxqueue:
-            data = self.rxqueue[self.rx_ctr]
-            del self.rxqueue[self.rx_ctr]
-            self.rx_ctr += 1
-            self.rx.write(data)
+    @property
+    def deadline(self):
+        """Time at which poll() next has packets to (re)transmit, or None"""
+        if self.ready:
+            return 0.0
+        return self.retransmit_deadline
 
-    def poll(self):
+    @property
+    def retransmit_deadline(self):
+        """Time at which poll() next has packets to retransmit, or None"""
+        # drop entries for acknowledged packets from the top of the heap, so
+        # they do not cause early wakeups
+        heap = self.txheap
+        while heap:
+            deadline, index = heap[0]
+            pkt = self.inflight.get(index)
+            if pkt is not None and pkt.deadline == deadline:
+                return deadline
+            heapq.heappop(heap)
+
+        return None
+
+    def poll(self, limit=None):
+        """Return the packets to (re)transmit now, sending at most `limit` new ones"""
         # signal event to make blocking reads check status again
         self.event.set()
 
-        txq = self.txqueue
+        now = time.monotonic()
+        heap = self.txheap
 
-        if self.backlog and len(txq) < self.max_in_flight:
-            while self.backlog and len(txq) < self.max_in_flight:
-                txq.append(self.backlog.pop(0))
-
-            # sort list to make sure oldest deadline is first
-            txq.sort()
+        # move packets from backlog into flight, due for transmission now
+        count = self.ready if limit is None else min(self.ready, limit)
+        for _ in range(count):
+            pkt = self.backlog.popleft()
+            pkt.deadline = now
+            self.inflight[pkt.index] = pkt
+            heapq.heappush(heap, (now, pkt.index))
 
         res = []
-        now = datetime.now()
+        lost = False
+
+        while heap and heap[0][0] <= now:
+            deadline, index = heapq.heappop(heap)
+            pkt = self.inflight.get(index)
+
+            # skip entries for packets that have since been acknowledged
+            if pkt is None or pkt.deadline != deadline:
+                continue
 
-        while txq and txq[0][0] < now:
-            deadline, index, pkt = txq.pop(0)
-            res.append(PktDrw(chan=self.index, index=index, data=pkt))
-            txq.append((deadline + self.timeout, index, pkt))
+            if pkt.count:
+                self.stats.retransmits += 1
+                if not lost:
+                    # retransmit timeout: back off, and shrink the window
+                    lost = True
+                    self.rtt.backoff()
+                    self.cwnd.on_loss(now, holdoff=self.rtt.srtt or self.rtt.rto)
+            self.stats.transmits += 1
+
+            pkt.count += 1
+            pkt.sent = now
+            pkt.deadline = now + self.rtt.rto
+            heapq.heappush(heap, (pkt.deadline, index))
+
+            res.append(PktDrw(chan=self.index, index=index, data=pkt.data))
 
         # the returned chunks will be (re)transmitted
         return res
@@ -193,31 +638,270 @@ def read(self, nbytes, timeout=None):
         return self.rx.read(nbytes, timeout)
 
     def write(self, payload, block=True):
-        pdata = payload[:]
-
         tx_ctr_start = self.tx_ctr
 
-        # schedule all packets, starting from current time
-        deadline = datetime.now()
-        while pdata:
-            # schedule transmission in 1kb chunks
-            data, pdata = pdata[:1024], pdata[1024:]
-            self.backlog.append((deadline, self.tx_ctr, data))
-            self.tx_ctr += 1
+        # schedule all packets for transmission, in 1kb chunks
+        for offset in range(0, len(payload), 1024):
+            self.backlog.append(InFlight(self.tx_ctr, payload[offset:offset + 1024]))
+            self.tx_ctr = seqnum.add(self.tx_ctr, 1)
 
         tx_ctr_done = self.tx_ctr
 
+        if self.wakeup:
+            self.wakeup()
+
         while block:
             # if doing a blocking write, loop on self.event until we have
             # received acknowledgment of our data
             self.wait()
 
-            if self.tx_ack >= tx_ctr_done:
+            if seqnum.ge(self.tx_ack, tx_ctr_done):
                 break
 
         return (tx_ctr_start, tx_ctr_done)
 
 
+@dataclass
+class AckStats:
+    acks: int = 0
+    packets: int = 0
+    latency_sum: float = 0.0
+    latency_max: float = 0.0
+
+    @property
+    def saved(self):
+        return self.acks - self.packets
+
+    @property
+    def latency_avg(self):
+        if not self.acks:
+            return None
+        return self.latency_sum / self.acks
+
+
+class AckCoalescer:
+    """Collects DRW_ACK indices per channel, to send them as multi-ack packets.
+
+    Pending ACKs for a channel are flushed as a single `PktDrwAck` once the
+    oldest one has waited for `delay` seconds, or when `max_pending` ACKs
+    have been collected, whichever comes first.
+    """
+
+    def __init__(self, delay=0.005, max_pending=32):
+        self.delay = delay
+        self.max_pending = max_pending
+        self.pending = {}
+        self.first = {}
+        self.times = {}
+        self.stats = AckStats()
+
+    def add(self, chan, index, now):
+        pending = self.pending.get(chan)
+        if pending is None:
+            pending = self.pending[chan] = []
+            self.first[chan] = now
+            self.times[chan] = 0.0
+
+        pending.append(index)
+        self.times[chan] += now
+        self.stats.acks += 1
+
+        if len(pending) >= self.max_pending or not self.delay:
+            return self._flush(chan, now)
+
+    def _flush(self, chan, now):
+        acks = self.pending.pop(chan)
+        first = self.first.pop(chan)
+
+        self.stats.packets += 1
+        self.stats.latency_sum += len(acks) * now - self.times.pop(chan)
+        self.stats.latency_max = max(self.stats.latency_max, now - first)
+
+        return PktDrwAck(chan=chan, count=len(acks), acks=acks)
+
+    @property
+    def deadline(self):
+        if not self.first:
+            return None
+        return min(self.first.values()) + self.delay
+
+    def poll(self, now):
+        return [self._flush(chan, now) for chan, first in list(self.first.items()) if now - first >= self.delay]
+
+    def flush(self, now):
+        return [self._flush(chan, now) for chan in list(self.pending)]
+
+
+class TxScheduler:
+    """Decides which channels may transmit new DRW packets, and how many.
+
+    Channels are served in order of priority (lowest value first). Channels
+    of the top priority class, by default only channel 0 with its json
+    control commands, always send everything their congestion window allows.
+
+    All other channels share a budget of `budget` packets in flight (None
+    for no limit besides their congestion windows). It is handed out by
+    priority class, and between channels of the same class by deficit round
+    robin, in proportion to their weight. This keeps bulk transfers (e.g. file
+    uploads on channel 1) from queueing up so much data ahead of control
+    commands that those are delayed by seconds.
+
+    Retransmissions are never held back.
+    """
+
+    def __init__(self, chans, priorities=None, weights=None, budget=128, quantum=4):
+        priorities = {0: 0} if priorities is None else priorities
+        weights = weights or {}
+        # deficits are counted in whole packets. a zero share would never
+        # let an active channel send anything.
+        for name, value in [("quantum", quantum), *((f"weight of channel {k}", v) for k, v in weights.items())]:
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(f"Scheduler {name} must be a positive integer, not {value!r}")
+        self.weights = weights
+        self.budget = budget
+        self.quantum = quantum
+        self.deficit = {ch.index: 0 for ch in chans}
+
+        classes = {}
+        for ch in chans:
+            classes.setdefault(priorities.get(ch.index, 1), []).append(ch)
+        self.top, *self.classes = [classes[prio] for prio in sorted(classes)]
+        self.bulk = [ch for group in self.classes for ch in group]
+
+    def available(self):
+        """Number of packets the budget allows lower priority channels to send now"""
+        if self.budget is None:
+            return sys.maxsize
+        return max(self.budget - sum(len(ch.inflight) for ch in self.bulk), 0)
+
+    @property
+    def deadline(self):
+        """Time at which poll() next has packets to (re)transmit, or None"""
+        if any(ch.ready for ch in self.top):
+            return 0.0
+        if self.available() and any(ch.ready for ch in self.bulk):
+            return 0.0
+
+        deadlines = [ch.retransmit_deadline for ch in self.top + self.bulk]
+        return min((d for d in deadlines if d is not None), default=None)
+
+    def poll(self):
+        """Return the packets all channels should (re)transmit now, in order"""
+        res = []
+        for ch in self.top:
+            res.extend(ch.poll())
+
+        available = self.available()
+        for group in self.classes:
+            active = [ch for ch in group if ch.ready and available]
+            for ch in group:
+                if ch not in active:
+                    # retransmissions only
+                    res.extend(ch.poll(limit=0))
+
+            # deficit round robin. every active channel is polled at least
+            # once, so its retransmissions are sent even without budget
+            while active:
+                for ch in active:
+                    if not available:
+                        # budget used up. keep the deficit for the next round
+                        res.extend(ch.poll(limit=0))
+                        continue
+                    deficit = self.deficit[ch.index] + self.quantum * self.weights.get(ch.index, 1)
+                    count = min(deficit, ch.ready, available)
+                    res.extend(ch.poll(limit=count))
+                    available -= count
+                    # idle channels do not save up their share
+                    self.deficit[ch.index] = deficit - count if ch.ready else 0
+                active = [ch for ch in active if ch.ready and available]
+
+        return res
+
+
+class AabbUploader:
+    """Sends file chunks as AABB DATA frames, keeping up to `window` in flight.
+
+    Instead of waiting for the reply to each chunk before sending the next,
+    up to `window` chunks are outstanding at any time. Replies are matched to
+    chunks by their `pos` field (falling back to the oldest outstanding chunk,
+    since replies arrive in order), and chunks that are rejected by the
+    printer are resent up to `retries` times.
+
+    `recv_reply` must block until the next AABB reply arrives, and return it
+    as an `(aabb, data)` tuple, like `AnkerPPPPApi.recv_aabb()`.
+    """
+
+    def __init__(self, api, recv_reply, chan=1, window=4, retries=3):
+        self.api = api
+        self.recv_reply = recv_reply
+        self.chan = chan
+        self.window = window
+        self.retries = retries
+        self.pending = {}
+
+    def _send(self, pos, chunk, attempt):
+        self.pending[pos] = (chunk, attempt)
+        self.api.send_aabb(chunk, frametype=FileTransfer.DATA, pos=pos, chan=self.chan, block=False)
+
+    def _complete(self):
+        aabb, data = self.recv_reply()
+        if len(data) != 1:
+            raise ValueError(f"Unexpected reply from aabb request: {data}")
+
+        pos = aabb.pos if aabb.pos in self.pending else next(iter(self.pending))
+        chunk, attempt = self.pending.pop(pos)
+
+        res = FileTransferReply(data[0])
+        if res == FileTransferReply.OK:
+            return len(chunk)
+
+        if attempt >= self.retries:
+            raise PPPPError(res, f"Aabb request failed at offset {pos}: {res.name}")
+
+        log.warning(f"Aabb request failed at offset {pos}: {res.name}. Retrying..")
+        self._send(pos, chunk, attempt + 1)
+        return 0
+
+    def upload(self, chunks):
+        """Send all (pos, chunk) pairs, yielding the size of each acknowledged chunk"""
+        for pos, chunk in chunks:
+            while len(self.pending) >= self.window:
+                yield self._complete()
+            self._send(pos, chunk, 0)
+
+        while self.pending:
+            yield self._complete()
+
+
+class BufferPool:
+    """Preallocated receive buffers, for `socket.recvmsg_into()`.
+
+    Messages parsed from a buffer keep referring to it (DRW payloads are
+    memoryviews of the datagram), possibly for a long time, e.g. when waiting
+    for a missing packet. Buffers are handed out round-robin, and only reused
+    once the pool holds the last reference to them. A buffer that is still in
+    use is left to its users, and replaced by a fresh one.
+    """
+
+    def __init__(self, count=2 * PPPP_RECV_BATCH, size=PPPP_MAX_DATAGRAM):
+        self.size = size
+        self.buffers = [bytearray(size) for _ in range(count)]
+        self.next = 0
+        self.misses = 0
+
+    def get(self):
+        index = self.next
+        self.next = (index + 1) % len(self.buffers)
+
+        buf = self.buffers[index]
+        # referenced by self.buffers, `buf`, and the getrefcount() argument
+        if sys.getrefcount(buf) > 3:
+            buf = self.buffers[index] = bytearray(self.size)
+            self.misses += 1
+
+        return buf
+
+
 class PPPPState(Enum):
     Idle         = 1
     Connecting   = 2
@@ -227,40 +911,71 @@ class PPPPState(Enum):
 
 class AnkerPPPPBaseApi(Thread):
 
-    def __init__(self, sock, duid, addr=None):
+    def __init__(self, sock, duid, addr=None, wire=Wire, chan_config=None, ack_config=None,
+                 sched_config=None, rcvbuf=PPPP_RCVBUF, batch=PPPP_RECV_BATCH):
         super().__init__()
         self.sock = sock
         self.duid = duid
         self.addr = addr
 
         self.state = PPPPState.Idle
-        self.chans = [Channel(n) for n in range(8)]
+        # chan_config maps channel index to Channel() arguments, for example
+        # {1: {"rtt": {"initial": 0.2}, "cwnd": {"max": 1024}}}
+        chan_config = chan_config or {}
+        self.chans = [Channel(n, wire=wire, **chan_config.get(n, {})) for n in range(8)]
+        self.acker = AckCoalescer(**(ack_config or {}))
+        self.scheduler = TxScheduler(self.chans, **(sched_config or {}))
+
+        self.batch = batch
+        self.pool = BufferPool(count=2 * batch)
+        self.rxstats = RecvStats()
+        if sock:
+            self._setup_socket(rcvbuf)
 
         self.running = True
         self.stopped = Event()
         self.dumper = None
+        self.tracer = pkttrace.tracer
+        self.wakeup = None
 
     @classmethod
-    def open(cls, duid, host, port):
+    def open(cls, duid, host, port, **kwargs):
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        return cls(sock, duid, addr=(host, port))
+        return cls(sock, duid, addr=(host, port), **kwargs)
 
     @classmethod
-    def open_lan(cls, duid, host):
-        return cls.open(duid, host, PPPP_LAN_PORT)
+    def open_lan(cls, duid, host, **kwargs):
+        return cls.open(duid, host, PPPP_LAN_PORT, **kwargs)
 
     @classmethod
-    def open_wan(cls, duid, host):
-        return cls.open(duid, host, PPPP_WAN_PORT)
+    def open_wan(cls, duid, host, **kwargs):
+        return cls.open(duid, host, PPPP_WAN_PORT, **kwargs)
 
     @classmethod
-    def open_broadcast(cls, bind_addr=None):
+    def open_broadcast(cls, bind_addr=None, **kwargs):
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
         if bind_addr is not None:
             sock.bind((bind_addr, 0))
         addr = ("255.255.255.255", PPPP_LAN_PORT)
-        return cls(sock, duid=None, addr=addr)
+        return cls(sock, duid=None, addr=addr, **kwargs)
+
+    def _setup_socket(self, rcvbuf):
+        if rcvbuf:
+            # the kernel may clamp the size (see net.core.rmem_max on linux)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+
+        self._ancbufsize = 0
+        if SO_RXQ_OVFL is not None and hasattr(self.sock, "recvmsg_into"):
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+                self._ancbufsize = socket.CMSG_SPACE(4)
+            except OSError:
+                pass
+
+    @property
+    def rcvbuf(self):
+        return self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
 
     def connect_lan_search(self):
         self.state = PPPPState.Connecting
@@ -269,24 +984,89 @@ def connect_lan_search(self):
     def set_dumper(self, dumper):
         self.dumper = dumper
 
+    def set_tracer(self, tracer):
+        self.tracer = tracer
+
     def stop(self):
         self.running = False
+        if self.wakeup:
+            self.wakeup()
         self.stopped.wait()
 
+    def _recv_timeout(self, timeout):
+        # wake up in time to send any pending ACKs
+        deadline = self.acker.deadline
+        if deadline is None:
+            return timeout
+
+        # a zero timeout would put the socket in non-blocking mode, so wait
+        # for at least 1ms
+        delay = max(deadline - time.monotonic(), 0.001)
+        if timeout is None:
+            return delay
+        return min(timeout, delay)
+
+    @property
+    def deadline(self):
+        """Time at which _poll_channels() next has work to do, or None"""
+        deadlines = [self.scheduler.deadline, self.acker.deadline]
+        deadlines = [d for d in deadlines if d is not None]
+        return min(deadlines, default=None)
+
+    def _poll_channels(self):
+        for pkt in self.acker.poll(time.monotonic()):
+            self.send(pkt)
+
+        for pkt in self.scheduler.poll():
+            self.send(pkt)
+
     def run(self):
         log.debug("Started pppp thread")
-        while self.running:
+
+        # writes from other threads wake up the loop, so new packets are sent
+        # right away instead of after the next receive timeout
+        wake_rx, wake_tx = socket.socketpair()
+        wake_rx.setblocking(False)
+        wake_tx.setblocking(False)
+
+        def wake():
             try:
-                msg = self.recv(timeout=0.05)
-                self.process(msg)
-            except TimeoutError:
+                wake_tx.send(b"\x00")
+            except OSError:
+                # wakeup already pending, or the loop has already exited
                 pass
-            except ConnectionResetError:
-                break
 
-            for idx, ch in enumerate(self.chans):
-                for pkt in ch.poll():
-                    self.send(pkt)
+        self.wakeup = wake
+        for ch in self.chans:
+            ch.wakeup = wake
+
+        try:
+            while self.running:
+                try:
+                    ready, _, _ = select.select([self.sock, wake_rx], [], [], self._recv_timeout(0.05))
+                    if wake_rx in ready:
+                        wake_rx.recv(4096)
+                    if self.sock in ready:
+                        for msg in self.recv_batch(timeout=0):
+                            self.process(msg)
+                except BlockingIOError:
+                    pass
+                except ConnectionResetError:
+                    break
+
+                self._poll_channels()
+        finally:
+            self.wakeup = None
+            for ch in self.chans:
+                ch.wakeup = None
+            wake_rx.close()
+            wake_tx.close()
+
+        self._shutdown()
+
+    def _shutdown(self):
+        for pkt in self.acker.flush(time.monotonic()):
+            self.send(pkt)
 
         self.send(PktClose())
 
@@ -321,8 +1101,12 @@ def process(self, msg):
             self.send(PktAliveAck())
 
         elif msg.type == Type.DRW:
-            self.send(PktDrwAck(chan=msg.chan, count=1, acks=[msg.index]))
-            self.chans[msg.chan].rx_drw(msg.index, msg.data)
+            # packets refused by the reorder buffer are not acknowledged, so
+            # the printer sends them again later
+            if self.chans[msg.chan].rx_drw(msg.index, msg.data):
+                ack = self.acker.add(msg.chan, msg.index, time.monotonic())
+                if ack:
+                    self.send(ack)
 
         elif msg.type == Type.DRW_ACK:
             self.chans[msg.chan].rx_ack(msg.acks)
@@ -350,11 +1134,65 @@ def recv(self, timeout=None):
             raise ConnectionError(f"Tried to recv packet in state {self.state}")
 
         self.sock.settimeout(timeout)
-        data, self.addr = self.sock.recvfrom(4096)
+        msg = self._recv_into()
+        self.rxstats.add_batch(1)
+        return msg
+
+    def recv_batch(self, timeout=None):
+        """Wait for a datagram, then return it along with all others that are ready.
+
+        At most `batch` messages are returned. Raises TimeoutError (or
+        BlockingIOError, for a zero timeout) if nothing arrives in time.
+        """
+        if self.state in {PPPPState.Idle, PPPPState.Disconnected}:
+            raise ConnectionError(f"Tried to recv packet in state {self.state}")
+
+        self.sock.settimeout(timeout)
+        msgs = [self._recv_into()]
+
+        # drain whatever else is ready, without blocking
+        self.sock.setblocking(False)
+        try:
+            while len(msgs) < self.batch:
+                msgs.append(self._recv_into())
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        self.rxstats.add_batch(len(msgs))
+        return msgs
+
+    def _recv_into(self):
+        while True:
+            buf = self.pool.get()
+
+            if self._ancbufsize:
+                nbytes, ancdata, flags, addr = self.sock.recvmsg_into([buf], self._ancbufsize)
+                for level, type, data in ancdata:
+                    if level == socket.SOL_SOCKET and type == SO_RXQ_OVFL:
+                        # total number of datagrams dropped by the kernel
+                        self.rxstats.dropped = int.from_bytes(data[:4], sys.byteorder)
+                if flags & socket.MSG_TRUNC:
+                    self.rxstats.truncated += 1
+                    log.warning(f"Dropping oversized datagram from {addr[0]}:{addr[1]}")
+                    continue
+            else:
+                nbytes, addr = self.sock.recvfrom_into(buf)
+
+            try:
+                return self._decode(memoryview(buf)[:nbytes], addr)
+            except (ValueError, struct.error) as E:
+                # e.g. truncated, or an unknown message type
+                self.rxstats.malformed += 1
+                log.warning(f"Dropping malformed datagram from {addr[0]}:{addr[1]}: {E}")
+
+    def _decode(self, data, addr):
+        self.addr = addr
         if self.dumper:
             self.dumper.rx(data, self.addr)
-        msg = Message.parse(data)[0]
-        log.debug(f"RX <--  {str(msg)[:128]}")
+        # variable-length fields (e.g. DRW payloads) refer directly to the
+        # received datagram, so payloads are never copied before reassembly
+        msg = Message.parse_from(data)[0]
+        self.tracer.rx(msg)
         return msg
 
     def send(self, pkt, addr=None):
@@ -364,9 +1202,11 @@ def send(self, pkt, addr=None):
         resp = pkt.pack()
         if self.dumper:
             self.dumper.tx(resp, self.addr)
-        msg = Message.parse(resp)[0]
-        log.debug(f"TX  --> {str(msg)[:128]}")
-        self.sock.sendto(resp, addr or self.addr)
+        self.tracer.tx(pkt)
+        self._sendto(resp, addr or self.addr)
+
+    def _sendto(self, data, addr):
+        self.sock.sendto(data, addr)
 
     def send_xzyh(self, data, cmd, chan=0, unk0=0, unk1=0, sign_code=0, unk3=0, dev_type=0, block=True):
         xzyh = Xzyh(
@@ -396,8 +1236,10 @@ def send_aabb(self, data, sn=0, pos=0, frametype=0, chan=1, block=True):
 
 class AnkerPPPPApi(AnkerPPPPBaseApi):
 
-    def __init__(self, sock, duid, addr=None):
-        super().__init__(sock, duid, addr)
+    def __init__(self, sock, duid, addr=None, wire=Wire, chan_config=None, ack_config=None,
+                 sched_config=None, rcvbuf=PPPP_RCVBUF, batch=PPPP_RECV_BATCH):
+        super().__init__(sock, duid, addr, wire=wire, chan_config=chan_config, ack_config=ack_config,
+                         sched_config=sched_config, rcvbuf=rcvbuf, batch=batch)
         self.daemon = True
 
     def recv_xzyh(self, chan=1, timeout=None):
@@ -414,7 +1256,7 @@ def recv_xzyh(self, chan=1, timeout=None):
             if not data:
                 return None
 
-            xzyh.data = data[16:]
+            xzyh.data = bytes(data[16:])
             return xzyh
 
     def recv_aabb(self, chan=1):
@@ -422,7 +1264,7 @@ def recv_aabb(self, chan=1):
 
         data = fd.read(12)
         aabb = Aabb.parse(data)[0]
-        p = data + fd.read(aabb.len + 2)
+        p = bytes(data) + fd.read(aabb.len + 2)
         aabb, data = Aabb.parse_with_crc(p)[:2]
         return aabb, data
 
@@ -441,19 +1283,124 @@ def aabb_request(self, data, frametype, pos=0, chan=1, check=True):
         self.send_aabb(data=data, frametype=frametype, chan=chan, pos=pos)
         return self.recv_aabb_reply(chan, check)
 
+    def aabb_upload(self, chunks, chan=1, window=4, retries=3):
+        uploader = AabbUploader(self, lambda: self.recv_aabb(chan), chan=chan, window=window, retries=retries)
+        return uploader.upload(chunks)
+
 
 class AnkerPPPPAsyncApi(AnkerPPPPBaseApi):
 
     def poll(self, timeout=None):
         msg = None
         try:
-            msg = self.recv(timeout=timeout)
+            msg = self.recv(timeout=self._recv_timeout(timeout))
             self.process(msg)
         except TimeoutError:
             pass
 
-        for idx, ch in enumerate(self.chans):
-            for pkt in ch.poll():
-                self.send(pkt)
+        self._poll_channels()
 
         return msg
+
+    def poll_batch(self, timeout=None):
+        """Like poll(), but receives and processes a batch of messages at once"""
+        msgs = []
+        try:
+            msgs = self.recv_batch(timeout=self._recv_timeout(timeout))
+            for msg in msgs:
+                self.process(msg)
+        except TimeoutError:
+            pass
+
+        self._poll_channels()
+
+        return msgs
+
+
+class TestChannel(unittest.TestCase):
+
+    def test_reorder_across_wrap(self):
+        ch = Channel(1)
+        ch.rx_ctr = 0xFF00
+        indexes = [seqnum.add(0xFF00, n) for n in range(600)]
+
+        # everything but the first packet arrives (in reverse), then the first
+        for index in reversed(indexes[1:]):
+            self.assertTrue(ch.rx_drw(index, index.to_bytes(2, "big")))
+        self.assertEqual(len(ch.rx), 0)
+        self.assertTrue(ch.rx_drw(indexes[0], indexes[0].to_bytes(2, "big")))
+
+        data = ch.rx.read(1200, timeout=0)
+        self.assertEqual(bytes(data), b"".join(index.to_bytes(2, "big") for index in indexes))
+        self.assertEqual(ch.rx_ctr, seqnum.add(0xFF00, 600))
+
+        # packets from before rx_ctr are acknowledged, but dropped
+        self.assertTrue(ch.rx_drw(0xFF00, b"xx"))
+        self.assertEqual(len(ch.rx), 0)
+
+    def test_corrupt_frame(self):
+        from libflagship.framer import StreamFramer
+
+        api = AnkerPPPPBaseApi(None, None)
+        ch = api.chans[1]
+        ch.framer = StreamFramer()
+
+        api.process(PktDrw(chan=1, index=0, data=b"JUNK" * 4))
+        self.assertIsInstance(ch.error, ValueError)
+
+        # the rest of the stream is discarded
+        api.process(PktDrw(chan=1, index=1, data=b"XZYH" + bytes(12)))
+        self.assertEqual(ch.rx_ctr, 2)
+        self.assertFalse(ch.framer.frames)
+
+
+class TestAabb(unittest.TestCase):
+
+    def test_data(self):
+        aabb = Aabb(frametype=FileTransfer.REPLY, sn=0, pos=0, len=1)
+        header, data, rest = Aabb.parse_with_crc(aabb.pack_with_crc(b"\x00"))
+        # payloads are attached to received frames, see Channel.framer
+        header.data = data
+        self.assertEqual(header.data, b"\x00")
+        self.assertEqual(rest, b"")
+
+
+class TestParse(unittest.TestCase):
+
+    def test_truncated(self):
+        pkt = PktP2pRdyAck(duid=Duid.from_string("ABCDEFG-123456-ABCDE"), host=Host(afam=AF_INET, addr="10.0.0.1", port=32108)).pack()
+        self.assertEqual(Message.parse_from(pkt)[0].host.port, 32108)
+
+        for size in (2, 8, len(pkt) - 1):
+            # the size in the header is left as is, like a datagram cut short
+            with self.assertRaises(ValueError):
+                Message.parse_from(pkt[:size])
+            with self.assertRaises(ValueError):
+                Message.parse(pkt[:size])
+
+    def test_drop_malformed(self):
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        rx.bind(("127.0.0.1", 0))
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        tx.connect(rx.getsockname())
+        api = AnkerPPPPBaseApi(rx, None)
+        api.state = PPPPState.Connected
+        tx.send(PktP2pRdy(Duid.from_string("ABCDEFG-123456-ABCDE")).pack()[:10])
+        tx.send(PktAliveAck().pack())
+        try:
+            self.assertEqual(api.recv(timeout=1).type, Type.ALIVE_ACK)
+            self.assertEqual(api.rxstats.malformed, 1)
+        finally:
+            rx.close()
+            tx.close()
+
+
+class TestTxScheduler(unittest.TestCase):
+
+    def test_invalid_shares(self):
+        chans = [Channel(n) for n in range(8)]
+        for kwargs in ({"quantum": 0}, {"quantum": 2.5}, {"weights": {1: 0}}, {"weights": {1: 0.5}}):
+            with self.assertRaises(ValueError):
+                TxScheduler(chans, **kwargs)
+
+        TxScheduler(chans, weights={1: 3}, quantum=1)
@@ -0,0 +1,212 @@
+import time
+import asyncio
+import logging as log
+
+from libflagship import seqnum
+from libflagship.pppp import Type, Xzyh, Aabb, FileTransferReply
+from libflagship.ppppapi import AnkerPPPPBaseApi, PPPPState, PPPPError
+
+
+class _PPPPProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, api):
+        self.api = api
+
+    def datagram_received(self, data, addr):
+        self.api._datagram_received(data, addr)
+
+    def error_received(self, exc):
+        log.warning(f"pppp socket error: {exc}")
+
+    def connection_lost(self, exc):
+        self.api._connection_lost()
+
+
+class AnkerPPPPAsyncioApi(AnkerPPPPBaseApi):
+    """PPPP client running on an asyncio event loop.
+
+    Packet handling and reliability (retransmission, ACKs, reassembly) is
+    shared with the threaded clients, but datagrams are received through an
+    `asyncio.DatagramProtocol`, and retransmit timers are scheduled on the
+    event loop. This allows a single event loop to drive many printers,
+    without a thread per connection.
+
+    Like `AnkerPPPPAsyncApi`, this class is never started as a thread.
+    """
+
+    def __init__(self, duid, addr, **kwargs):
+        super().__init__(None, duid, addr, **kwargs)
+        self.transport = None
+        self._timer = None
+        self._timer_deadline = None
+        self._connected = asyncio.Event()
+        self._rx_events = [asyncio.Event() for _ in self.chans]
+        self._tx_events = [asyncio.Event() for _ in self.chans]
+
+    @classmethod
+    def open(cls, duid, host, port, **kwargs):
+        return cls(duid, (host, port), **kwargs)
+
+    async def connect_lan(self, timeout=None):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _PPPPProtocol(self),
+            local_addr=("0.0.0.0", 0),
+        )
+
+        self.connect_lan_search()
+
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.stop()
+            raise ConnectionRefusedError("Connection rejected by device")
+
+    def stop(self):
+        self.running = False
+
+        if self.transport is None:
+            return
+
+        if self.state == PPPPState.Connected:
+            self._shutdown()
+
+        self._connection_lost()
+
+    def _sendto(self, data, addr):
+        self.transport.sendto(data, addr)
+
+    def _datagram_received(self, data, addr):
+        if self.state in {PPPPState.Idle, PPPPState.Disconnected}:
+            return
+
+        msg = self._decode(data, addr)
+
+        try:
+            self.process(msg)
+        except ConnectionResetError:
+            self.stop()
+            return
+
+        if self.state == PPPPState.Connected:
+            self._connected.set()
+
+        if msg.type == Type.DRW:
+            self._rx_events[msg.chan].set()
+        elif msg.type == Type.DRW_ACK:
+            self._tx_events[msg.chan].set()
+
+        self._schedule()
+
+    def _connection_lost(self):
+        self.state = PPPPState.Disconnected
+
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+
+        # wake up all waiters, so they can notice the connection is gone
+        for event in self._rx_events + self._tx_events:
+            event.set()
+
+    def _schedule(self):
+        """(Re)arm the poll timer for the earliest retransmit or ACK deadline"""
+        if self.transport is None:
+            return
+
+        deadline = self.deadline
+        if deadline is None:
+            return
+
+        if self._timer and self._timer_deadline <= deadline:
+            return
+
+        if self._timer:
+            self._timer.cancel()
+
+        loop = asyncio.get_running_loop()
+        self._timer_deadline = deadline
+        self._timer = loop.call_later(max(deadline - time.monotonic(), 0), self._poll)
+
+    def _poll(self):
+        self._timer = None
+        self._poll_channels()
+        self._schedule()
+
+    async def _wait(self, events, chan):
+        if self.state == PPPPState.Disconnected:
+            raise ConnectionResetError("pppp connection closed")
+
+        event = events[chan]
+        event.clear()
+        await event.wait()
+
+    async def _write(self, chan, start_done, block):
+        self._schedule()
+
+        tx_ctr_done = start_done[1]
+
+        while block and seqnum.lt(self.chans[chan].tx_ack, tx_ctr_done):
+            await self._wait(self._tx_events, chan)
+
+        return start_done
+
+    async def _read(self, chan, size, peek=False):
+        fd = self.chans[chan]
+
+        while len(fd.rx) < size:
+            await self._wait(self._rx_events, chan)
+
+        if peek:
+            return fd.peek(size, timeout=0)
+        else:
+            return fd.read(size, timeout=0)
+
+    async def send_xzyh(self, data, cmd, chan=0, block=True, **kwargs):
+        res = super().send_xzyh(data, cmd, chan=chan, block=False, **kwargs)
+        return await self._write(chan, res, block)
+
+    async def send_aabb(self, data, sn=0, pos=0, frametype=0, chan=1, block=True):
+        res = super().send_aabb(data, sn=sn, pos=pos, frametype=frametype, chan=chan, block=False)
+        return await self._write(chan, res, block)
+
+    async def _recv_xzyh(self, chan):
+        hdr = await self._read(chan, 16, peek=True)
+        xzyh = Xzyh.parse(hdr)[0]
+
+        data = await self._read(chan, xzyh.len + 16)
+        xzyh.data = bytes(data[16:])
+        return xzyh
+
+    async def recv_xzyh(self, chan=1, timeout=None):
+        try:
+            return await asyncio.wait_for(self._recv_xzyh(chan), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def recv_aabb(self, chan=1):
+        hdr = await self._read(chan, 12, peek=True)
+        aabb = Aabb.parse(hdr)[0]
+
+        p = await self._read(chan, aabb.len + 14)
+        aabb, data = Aabb.parse_with_crc(bytes(p))[:2]
+        return aabb, data
+
+    async def recv_aabb_reply(self, chan=1, check=True):
+        aabb, data = await self.recv_aabb(chan=chan)
+        if len(data) != 1:
+            raise ValueError(f"Unexpected reply from aabb request: {data}")
+
+        res = FileTransferReply(data[0])
+        if check and res != FileTransferReply.OK:
+            raise PPPPError(res, f"Aabb request failed: {res.name}")
+
+        return res
+
+    async def aabb_request(self, data, frametype, pos=0, chan=1, check=True):
+        await self.send_aabb(data=data, frametype=frametype, chan=chan, pos=pos)
+        return await self.recv_aabb_reply(chan, check)
@@ -0,0 +1,178 @@
+import time
+import socket
+import selectors
+import logging as log
+
+from threading import Thread, Lock
+
+
+class PPPPReactor(Thread):
+    """Single-threaded event loop, driving any number of pppp connections.
+
+    Instead of running one thread per `AnkerPPPPApi` (or polling each
+    `AnkerPPPPAsyncApi`), connections are registered with the reactor, which
+    waits for all their sockets at once using `selectors`. Retransmissions and
+    pending ACKs are handled at their exact deadline, rather than on a fixed
+    polling interval.
+
+    Connections must be set up (e.g. by calling `connect_lan_search()`) before
+    being registered. After that, they are used exactly as before: blocking
+    reads and writes from other threads work unchanged, and `api.stop()`
+    closes the connection and removes it from the reactor.
+
+    `register()` and `unregister()` may be called from any thread. The
+    selector itself is only touched by the reactor thread, which applies
+    the changes before it waits again.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.daemon = True
+        self.running = True
+        self.sel = selectors.DefaultSelector()
+        self.apis = {}
+        self.handlers = {}
+        # (sock, api) to register, or (sock, None) to unregister, in order
+        self.changes = []
+        self.lock = Lock()
+        self._wake_rx, self._wake_tx = socket.socketpair()
+        self._wake_rx.setblocking(False)
+        self._wake_tx.setblocking(False)
+        self.sel.register(self._wake_rx, selectors.EVENT_READ)
+
+    def wake(self):
+        try:
+            self._wake_tx.send(b"\x00")
+        except OSError:
+            # wakeup already pending, or the reactor has already stopped
+            pass
+
+    def register(self, api, handler=None):
+        """Drive `api` from the reactor, optionally calling handler(api, msg) for every received message"""
+        with self.lock:
+            self.apis[api.sock] = api
+            if handler:
+                self.handlers[api.sock] = handler
+            self.changes.append((api.sock, api))
+
+        api.wakeup = self.wake
+        for ch in api.chans:
+            ch.wakeup = self.wake
+
+        self.wake()
+
+    def unregister(self, api):
+        with self.lock:
+            del self.apis[api.sock]
+            self.handlers.pop(api.sock, None)
+            self.changes.append((api.sock, None))
+
+        api.wakeup = None
+        for ch in api.chans:
+            ch.wakeup = None
+
+        self.wake()
+
+    def _apply_changes(self):
+        with self.lock:
+            changes, self.changes = self.changes, []
+
+        for sock, api in changes:
+            if api:
+                self.sel.register(sock, selectors.EVENT_READ, api)
+            else:
+                self.sel.unregister(sock)
+
+    def stop(self):
+        self.running = False
+        self.wake()
+        self.join()
+
+        for api in list(self.apis.values()):
+            api.running = False
+            self._close(api)
+
+        self.sel.close()
+        self._wake_rx.close()
+        self._wake_tx.close()
+
+    def _close(self, api):
+        self.unregister(api)
+        try:
+            api._shutdown()
+        except OSError as E:
+            # not connected (anymore), so CLOSE cannot be sent
+            log.warning(f"Failed to close pppp connection: {E}")
+            api.stopped.set()
+
+    def _read(self, api):
+        handler = self.handlers.get(api.sock)
+
+        # drain all datagrams that are ready, without blocking
+        while True:
+            try:
+                msgs = api.recv_batch(timeout=0.0)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionError as E:
+                log.warning(f"Dropping pppp connection: {E}")
+                api.running = False
+                return
+
+            for msg in msgs:
+                try:
+                    api.process(msg)
+                except ConnectionResetError:
+                    api.running = False
+                    return
+                except Exception:
+                    log.exception(f"Unexpected exception while processing pppp message: {msg}")
+                    continue
+
+                if handler:
+                    try:
+                        handler(api, msg)
+                    except Exception:
+                        log.exception(f"Unexpected exception in pppp message handler: {msg}")
+
+    def _timeout(self, now):
+        with self.lock:
+            deadlines = [api.deadline for api in self.apis.values()]
+        deadlines = [d for d in deadlines if d is not None]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - now, 0)
+
+    def run(self):
+        log.debug("Started pppp reactor thread")
+        while self.running:
+            self._apply_changes()
+            events = self.sel.select(self._timeout(time.monotonic()))
+
+            for key, mask in events:
+                if key.fileobj is self._wake_rx:
+                    while True:
+                        try:
+                            self._wake_rx.recv(4096)
+                        except BlockingIOError:
+                            break
+                elif self.apis.get(key.fileobj) is key.data:
+                    # (not unregistered since the last select)
+                    self._read(key.data)
+
+            with self.lock:
+                apis = list(self.apis.values())
+
+            for api in apis:
+                if not api.running:
+                    self._close(api)
+                    continue
+
+                # polling is cheap when nothing is due, and guarantees blocking
+                # writers are woken up as soon as their data is acknowledged
+                try:
+                    api._poll_channels()
+                except OSError as E:
+                    log.warning(f"Failed to send pppp packet: {E}")
+
+        log.debug("Stopped pppp reactor thread")
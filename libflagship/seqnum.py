@@ -0,0 +1,82 @@
+"""Arithmetic on 16-bit pppp sequence numbers, using plain ints.
+
+These functions implement the same wraparound rules as `CyclicU16`, but
+without allocating a new object for every operation, which makes them
+suitable for per-packet bookkeeping. All arguments must be in the range
+0..0xFFFF, and all results are.
+"""
+
+import random
+import unittest
+
+from .cyclic import CyclicU16
+
+MASK = 0xFFFF
+
+# numbers this close past zero are considered to have recently wrapped
+# around, when compared to numbers in the upper half of the range
+WRAP = 0x100
+
+
+def add(n, k):
+    return (n + k) & MASK
+
+
+def sub(a, b):
+    """Return the distance from `b` forward to `a`"""
+    return (a - b) & MASK
+
+
+def lt(a, b):
+    # if sign bit differs, take wrap into account
+    if (a ^ b) & 0x8000:
+        return (a - WRAP) & MASK < (b - WRAP) & MASK
+    return a < b
+
+
+def gt(a, b):
+    # if sign bit differs, take wrap into account
+    if (a ^ b) & 0x8000:
+        return (a - WRAP) & MASK > (b - WRAP) & MASK
+    return a > b
+
+
+def le(a, b):
+    return not gt(a, b)
+
+
+def ge(a, b):
+    return not lt(a, b)
+
+
+class TestSeqnum(unittest.TestCase):
+
+    def test_add_sub(self):
+        self.assertEqual(add(0xFFFE, 1), 0xFFFF)
+        self.assertEqual(add(0xFFFF, 1), 0x0000)
+        self.assertEqual(add(0xFFFF, 0x10), 0x000F)
+        self.assertEqual(sub(0x0001, 0xFFFF), 2)
+        self.assertEqual(sub(0xFFFF, 0x0001), 0xFFFE)
+
+    def test_compare(self):
+        self.assertTrue(lt(0xFFFE, 0x10))
+        self.assertFalse(lt(0xFFFE, 0x110))
+        self.assertTrue(gt(0x10, 0xFFFE))
+        self.assertFalse(gt(0x110, 0xFFFE))
+        self.assertTrue(le(0x1, 0x1))
+        self.assertTrue(ge(0xFFFF, 0xFFFF))
+
+    def test_cyclic(self):
+        C = CyclicU16
+        rng = random.Random(1)
+
+        pairs = [(rng.randrange(0x10000), rng.randrange(0x10000)) for _ in range(10000)]
+        pairs += [(a, b) for a in (0, 0xFF, 0x100, 0x7FFF, 0x8000, 0xFFFF) for b in (0, 0xFF, 0x100, 0x7FFF, 0x8000, 0xFFFF)]
+
+        for a, b in pairs:
+            self.assertEqual(lt(a, b), C(a) < C(b))
+            self.assertEqual(gt(a, b), C(a) > C(b))
+            self.assertEqual(le(a, b), C(a) <= C(b))
+            self.assertEqual(ge(a, b), C(a) >= C(b))
+            self.assertEqual(add(a, b), C(a) + b)
+            self.assertEqual(sub(a, b), C(a) - b)
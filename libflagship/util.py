@@ -19,6 +19,10 @@ def b64d(s):
     return binascii.a2b_base64(s)
 
 
+# building the lookup table is far more expensive than using it, so only do
+# it once
+_crc16 = crcmod.mkCrcFun(0x11021, rev=False, initCrc=0x0000, xorOut=0x0000)
+
+
 def ppcs_crc16(data):
-    crc16 = crcmod.mkCrcFun(0x11021, rev=False, initCrc=0x0000, xorOut=0x0000)
-    return struct.pack("<H", crc16(data))
+    return struct.pack("<H", _crc16(data))
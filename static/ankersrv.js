@@ -392,6 +392,7 @@ $(function () {
         binary: true,
 
         open: function () {
+            this.timestamp = null;
             this.jmuxer = new JMuxer({
                 node: "player",
                 mode: "video",
@@ -407,10 +408,27 @@ $(function () {
             });
         },
 
+        /* Each message holds one or more complete access units, each preceded
+         * by a header of flags (u8), timestamp in ms (u32) and length (u32).
+         * See Packetizer in web/lib/videohub.py */
         message: function (event) {
-            this.jmuxer.feed({
-                video: new Uint8Array(event.data),
-            });
+            const view = new DataView(event.data);
+            let pos = 0;
+            while (pos + 9 <= view.byteLength) {
+                const timestamp = view.getUint32(pos + 1);
+                const length = view.getUint32(pos + 5);
+                /* Passing a duration makes jmuxer emit the frame right away,
+                 * instead of waiting for the next one */
+                let duration = 1000 / 15;
+                if (this.timestamp !== null && timestamp > this.timestamp)
+                    duration = timestamp - this.timestamp;
+                this.timestamp = timestamp;
+                this.jmuxer.feed({
+                    video: new Uint8Array(event.data, pos + 9, length),
+                    duration: duration,
+                });
+                pos += 9 + length;
+            }
         },
 
         close: function () {
@@ -1,3 +1,18 @@
+import os
+
+## Generator options, taken from the environment when running transwarp:
+##
+##   PY_SLOTS=0  emit plain dataclasses, parsing integer fields into their int
+##               subclasses (u8, u16le, ...). By default, slotted dataclasses
+##               are emitted, storing integer fields as plain ints. They are
+##               only converted to their wire type when packed.
+SLOTS = os.environ.get("PY_SLOTS", "1") != "0"
+
+def dataclass():
+    if SLOTS:
+        return "@dataclass(slots=True)"
+    return "@dataclass"
+
 def header():
     return \
         "## ------------------------------------------\n" \
@@ -41,10 +56,9 @@ def typename(field):
     else:
         return tp.name
 
-def typeparse(field, p):
+def _parseargs(field, args):
     tp = field.type
-    name = _parsetable.get(tp.name, tp.name)
-    args = [p]
+    skip = len(args)
     for i in range(len(tp)):
         if tp[i].name == "field":
             args.append(tp[i][0].name)
@@ -52,9 +66,19 @@ def typeparse(field, p):
             args.append(tp[i].name)
 
     if tp.name == "magic":
-        args[2] = repr(magic_default(tp))
+        args[skip + 1] = repr(magic_default(tp))
+
+    return ", ".join(args)
 
-    return f"{name}.parse({', '.join(args)})"
+def typeparse(field, p):
+    tp = field.type
+    name = _parsetable.get(tp.name, tp.name)
+    return f"{name}.parse({_parseargs(field, [p])})"
+
+def typeparse_from(field, p, offset):
+    tp = field.type
+    name = _parsetable.get(tp.name, tp.name)
+    return f"{name}.parse_from({_parseargs(field, [p, offset])})"
 
 def typepack(field):
     tp = field.type
@@ -73,3 +97,164 @@ def typepack(field):
     if name in _parsetable:
         name = _parsetable[name]
     return f"{name}.pack({', '.join(args)})"
+
+## Fixed-layout fields are grouped into runs, each parsed and packed by a
+## single precompiled struct.Struct, instead of field by field.
+
+_intformat = {
+    "i8":  "b",
+    "u8":  "B",
+    "i16": "h",
+    "u16": "H",
+    "i32": "i",
+    "u32": "I",
+}
+
+_byteorder = {
+    "le": "<",
+    "be": ">",
+    "":   ">",
+}
+
+def _intlayout(name):
+    base, order = name[:-2], name[-2:]
+    if order not in {"le", "be"}:
+        base, order = name, ""
+
+    if base not in _intformat:
+        return None
+
+    # single bytes have no byte order
+    if base.endswith("8"):
+        return None, _intformat[base]
+
+    return _byteorder[order], _intformat[base]
+
+def _enumtype(field, spec):
+    tp = field.type
+    if len(tp) == 1:
+        return tp[0].name
+
+    try:
+        enum = spec.get(tp.name)
+    except KeyError:
+        return None
+
+    if enum is None or enum.expr != "enum":
+        return None
+
+    typ = enum.field("@type")
+    if typ is None:
+        return "u8"
+    return str(typ.type)
+
+def fieldlayout(field, spec):
+    """Return (byteorder, format) for fields with a fixed layout, or None.
+
+    The byteorder is None for fields where byte order does not matter."""
+    tp = field.type
+
+    if tp.name in {"zeroes", "magic"}:
+        return None, f"{int(str(tp[0]))}s"
+    elif tp.name in {"bytes", "string"}:
+        if tp[0].name == "field":
+            return None
+        return None, f"{int(str(tp[0]))}s"
+    elif tp.name == "IPv4":
+        return None, "4s"
+
+    layout = _intlayout(tp.name)
+    if layout:
+        return layout
+
+    enumtype = _enumtype(field, spec)
+    if enumtype:
+        return _intlayout(enumtype)
+
+    return None
+
+def isint(field, spec):
+    return fieldlayout(field, spec)[1][-1] != "s"
+
+class Run:
+
+    def __init__(self, index, offset):
+        self.index = index
+        self.offset = offset
+        self.order = None
+        self.format = ""
+        self.fields = []
+        self.last = True
+
+    @property
+    def name(self):
+        return f"_struct{self.index}"
+
+    @property
+    def struct(self):
+        return f"struct.Struct(\"{self.order or '>'}{self.format}\")"
+
+    @property
+    def size(self):
+        import struct
+        return struct.calcsize(f"{self.order or '>'}{self.format}")
+
+    @property
+    def names(self):
+        if len(self.fields) == 1:
+            return f"{self.fields[0].name},"
+        return ", ".join(f.name for f in self.fields)
+
+def layout(struct, spec):
+    """Split struct fields into runs of fixed-layout fields (as `Run`
+    objects), and the remaining fields, which are parsed one by one."""
+    res = []
+    run = None
+    for field in struct.fields:
+        fl = fieldlayout(field, spec)
+        if fl is None:
+            res.append(field)
+            run = None
+            continue
+
+        order, format = fl
+        if run is None or (order and run.order and order != run.order):
+            offset = run.offset + run.size if run else 0
+            run = Run(len(runs(res)), offset)
+            res.append(run)
+
+        run.order = run.order or order
+        run.format += format
+        run.fields.append(field)
+
+    # the last run before a variable field (or the end) consumes the input
+    for group, next in zip(res, res[1:] + [None]):
+        if isinstance(group, Run):
+            group.last = not isinstance(next, Run)
+
+    return res
+
+def runs(groups):
+    return [g for g in groups if isinstance(g, Run)]
+
+def isrun(group):
+    return isinstance(group, Run)
+
+def fieldconvert(field, spec):
+    """Return an expression converting a value unpacked by struct.Struct into the field type"""
+    tp = field.type
+    if tp.name == "bytes":
+        return None
+    elif tp.name in _parsetable or tp.name == "IPv4":
+        return f"{typeparse(field, field.name)}[0]"
+    elif isint(field, spec):
+        if SLOTS and _intlayout(tp.name):
+            # plain ints are stored as unpacked
+            return None
+        return f"{tp.name}({field.name})"
+
+def fieldpack(field, spec):
+    """Return an expression for the value struct.Struct should pack for this field"""
+    if isint(field, spec):
+        return f"self.{field.name}"
+    return typepack(field)
@@ -17,6 +17,12 @@ class Zeroes:
         _assert_equal(set(body) - {0}, set())
         return body, p[num:]
 
+    @classmethod
+    def parse_from(cls, p, offset, num):
+        body = bytes(p[offset:offset+num])
+        _assert_equal(set(body) - {0}, set())
+        return body, offset + num
+
     def pack(self, num):
         return b"\x00" * num
 
@@ -25,6 +31,10 @@ class Bytes(bytes):
     def parse(cls, p, size):
         return p[:size], p[size:]
 
+    @classmethod
+    def parse_from(cls, p, offset, size):
+        return memoryview(p)[offset:offset+size], offset + size
+
     def pack(self, size):
         return self
 
@@ -35,19 +45,55 @@ class String(Bytes):
         _assert_equal(body[-1], 0)
         return body[:-1].decode(), p
 
+    @classmethod
+    def parse_from(cls, p, offset, size):
+        body = bytes(p[offset:offset+size])
+        _assert_equal(body[-1], 0)
+        return body[:-1].decode(), offset + size
+
     def pack(self, size):
         return self[:size-1].ljust(size, '\x00').encode()
 
 class Array:
     @classmethod
     def parse(cls, p, elem, num):
+        if issubclass(elem, IntType):
+            # unpack all integers at once
+            fmt = f"{elem.fmt[0]}{num}{elem.fmt[1]}"
+%if python.SLOTS:
+            res = list(struct.unpack_from(fmt, p))
+%else:
+            res = [elem(v) for v in struct.unpack_from(fmt, p)]
+%endif
+            return res, p[elem.size * num:]
+
         res = []
         for _ in range(num):
             item, p = elem.parse(p)
             res.append(item)
         return res, p
 
+    @classmethod
+    def parse_from(cls, p, offset, elem, num):
+        if issubclass(elem, IntType):
+            fmt = f"{elem.fmt[0]}{num}{elem.fmt[1]}"
+%if python.SLOTS:
+            res = list(struct.unpack_from(fmt, p, offset))
+%else:
+            res = [elem(v) for v in struct.unpack_from(fmt, p, offset)]
+%endif
+            return res, offset + elem.size * num
+
+        res = []
+        for _ in range(num):
+            item, offset = elem.parse_from(p, offset)
+            res.append(item)
+        return res, offset
+
     def pack(self, cls, num):
+        if issubclass(cls, IntType):
+            return struct.pack(f"{cls.fmt[0]}{len(self)}{cls.fmt[1]}", *self)
+
         return b"".join(cls.pack(e) for e in self)
 
 class IPv4(str):
@@ -56,6 +102,11 @@ class IPv4(str):
         addr = p[:4][::-1]
         return cls(socket.inet_ntoa(addr)), p[4:]
 
+    @classmethod
+    def parse_from(cls, p, offset):
+        addr = bytes(p[offset:offset+4])[::-1]
+        return cls(socket.inet_ntoa(addr)), offset + 4
+
     def pack(self):
         return socket.inet_aton(self)[::-1]
 
@@ -66,6 +117,12 @@ class Magic(bytes):
         _assert_equal(v, expected)
         return cls(v), p
 
+    @classmethod
+    def parse_from(cls, p, offset, size, expected):
+        v = bytes(p[offset:offset+size])
+        _assert_equal(v, expected)
+        return cls(v), offset + size
+
     def pack(self, size, expected):
         return self
 
@@ -74,8 +131,12 @@ class Tail(bytes):
     def parse(cls, p):
         return cls(p), b""
 
+    @classmethod
+    def parse_from(cls, p, offset):
+        return memoryview(p)[offset:], len(p)
+
     def pack(self):
-        if isinstance(self, bytes):
+        if isinstance(self, (bytes, bytearray, memoryview)):
             return self
         else:
             return self.pack()
@@ -93,23 +154,35 @@ class IntType(int):
                            ]:
 class ${name}be(IntType):
     size = ${size}
+    fmt = ">${desc}"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack(">${desc}", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack(">${desc}", self)
+        return ${name}be._struct.pack(self)
 
 class ${name}le(IntType):
     size = ${size}
+    fmt = "<${desc}"
+    _struct = struct.Struct(fmt)
 
     @classmethod
     def parse(cls, p):
-        return cls(struct.unpack("<${desc}", p[:cls.size])[0]), p[cls.size:]
+        return cls(cls._struct.unpack_from(p)[0]), p[cls.size:]
+
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(cls._struct.unpack_from(p, offset)[0]), offset + cls.size
 
     def pack(self):
-        return struct.pack("<${desc}", self)
+        return ${name}le._struct.pack(self)
 
 ${name} = ${name}be
 
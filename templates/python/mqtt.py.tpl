@@ -18,6 +18,10 @@ class ${enum.name}(enum.IntEnum):
     def parse(cls, p):
         return cls(struct.unpack("B", p[:1])[0]), p[1:]
 
+    @classmethod
+    def parse_from(cls, p, offset):
+        return cls(p[offset]), offset + 1
+
     def pack(self):
         return struct.pack("B", self)
 
@@ -25,23 +29,67 @@ class ${enum.name}(enum.IntEnum):
 % endfor
 % for struct in _mqtt:
 % if struct.expr == "struct":
-@dataclass
+${python.dataclass()}
 class ${struct.name}:
     % for field in struct.fields:
     ${field.aligned_name}: ${python.typename(field)} # ${"".join(field.comment)}
     % endfor
+    % for run in python.runs(python.layout(struct, _mqtt)):
+
+    ${run.name} = ${run.struct}
+    % endfor
 
     @classmethod
     def parse(cls, p):
-    %for field in struct.fields:
-        ${field.name}, p = ${python.typeparse(field, "p")}
+    %for group in python.layout(struct, _mqtt):
+        %if python.isrun(group):
+        try:
+            ${group.names} = cls.${group.name}.unpack_from(p${f", {group.offset}" if group.offset else ""})
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+            %for field in group.fields:
+                %if python.fieldconvert(field, _mqtt):
+        ${field.name} = ${python.fieldconvert(field, _mqtt)}
+                %endif
+            %endfor
+            %if group.last:
+        p = p[${group.offset + group.size}:]
+            %endif
+        %else:
+        ${group.name}, p = ${python.typeparse(group, "p")}
+        %endif
     %endfor
         return cls(${", ".join(f"{f.name}={f.name}" for f in struct.fields)}), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+    %for group in python.layout(struct, _mqtt):
+        %if python.isrun(group):
+        try:
+            ${group.names} = cls.${group.name}.unpack_from(p, offset${f" + {group.offset}" if group.offset else ""})
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+            %for field in group.fields:
+                %if python.fieldconvert(field, _mqtt):
+        ${field.name} = ${python.fieldconvert(field, _mqtt)}
+                %endif
+            %endfor
+            %if group.last:
+        offset += ${group.offset + group.size}
+            %endif
+        %else:
+        ${group.name}, offset = ${python.typeparse_from(group, "p", "offset")}
+        %endif
+    %endfor
+        return cls(${", ".join(f"{f.name}={f.name}" for f in struct.fields)}), offset
+
     def pack(self):
-        p  = ${python.typepack(struct.fields[0])}
-    %for field in struct.fields[1:]:
-        p += ${python.typepack(field)}
+    %for i, group in enumerate(python.layout(struct, _mqtt)):
+        %if python.isrun(group):
+        p ${"+" if i else " "}= self.${group.name}.pack(${", ".join(python.fieldpack(f, _mqtt) for f in group.fields)})
+        %else:
+        p ${"+" if i else " "}= ${python.typepack(group)}
+        %endif
     %endfor
         return p
 
@@ -49,6 +97,7 @@ class ${struct.name}:
 % endfor
 
 class MqttMsg(_MqttMsg):
+    __slots__ = ()
 
     @classmethod
     def parse(cls, p, key):
@@ -23,11 +23,25 @@ ${python.header()}
 </%def>\
 ##
 ##
+<%def name="decrypt_from(struct)">\
+    %if struct.const("@crypto_type", 0) == 1:
+        end, p, offset = len(p), simple_decrypt_string(p[offset:]), 0\
+    %elif struct.const("@crypto_type", 0) == 2:
+        end, p, offset = len(p), crypto_decurse_string(p[offset:]), 0\
+    %else:
+        # not encrypted\
+    %endif
+</%def>\
+##
+##
 <%def name="pack_fields(struct)">\
 %if len(struct.fields) > 0:
-        p  = ${python.typepack(struct.fields[0])}
-    %for field in struct.fields[1:]:
-        p += ${python.typepack(field)}
+    %for i, group in enumerate(python.layout(struct, _pppp)):
+        %if python.isrun(group):
+        p ${"+" if i else " "}= self.${group.name}.pack(${", ".join(python.fieldpack(f, _pppp) for f in group.fields)})
+        %else:
+        p ${"+" if i else " "}= ${python.typepack(group)}
+        %endif
     %endfor
 %else:
         p = b""
@@ -36,22 +50,73 @@ ${python.header()}
 ##
 ##
 <%def name="unpack_fields(struct)">\
-    %for field in struct.fields:
-        ${field.name}, p = ${python.typeparse(field, "p")}
+    %for group in python.layout(struct, _pppp):
+        %if python.isrun(group):
+        try:
+            ${group.names} = cls.${group.name}.unpack_from(p${f", {group.offset}" if group.offset else ""})
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+            %for field in group.fields:
+                %if python.fieldconvert(field, _pppp):
+        ${field.name} = ${python.fieldconvert(field, _pppp)}
+                %endif
+            %endfor
+            %if group.last:
+        p = p[${group.offset + group.size}:]
+            %endif
+        %else:
+        ${group.name}, p = ${python.typeparse(group, "p")}
+        %endif
     %endfor
 </%def>\
 ##
 ##
+<%def name="unpack_fields_from(struct)">\
+    %for group in python.layout(struct, _pppp):
+        %if python.isrun(group):
+        try:
+            ${group.names} = cls.${group.name}.unpack_from(p, offset${f" + {group.offset}" if group.offset else ""})
+        except struct.error as E:
+            raise ValueError(f"truncated {cls.__name__}: {E}") from None
+            %for field in group.fields:
+                %if python.fieldconvert(field, _pppp):
+        ${field.name} = ${python.fieldconvert(field, _pppp)}
+                %endif
+            %endfor
+            %if group.last:
+        offset += ${group.offset + group.size}
+            %endif
+        %else:
+        ${group.name}, offset = ${python.typeparse_from(group, "p", "offset")}
+        %endif
+    %endfor
+</%def>\
+##
+##
+<%def name="return_from(struct)">\
+    %if struct.const("@crypto_type", 0):
+        return cls(${", ".join(f"{f.name}={f.name}" for f in struct.fields)}), end - len(p) + offset
+    %else:
+        return cls(${", ".join(f"{f.name}={f.name}" for f in struct.fields)}), offset
+    %endif
+</%def>\
+##
+##
 <%def name="declare_fields(struct)">\
     %for field in struct.fields:
     ${field.aligned_name} : ${python.typename(field)} # ${"".join(field.comment or "unknown")}
     %endfor
+    %for run in python.runs(python.layout(struct, _pppp)):
+
+    ${run.name} = ${run.struct}
+    %endfor
 </%def>\
 ##
 ##
 import struct
 import enum
 from dataclasses import dataclass, field
+from typing import ClassVar
 from .amtypes import *
 from .amtypes import _assert_equal
 from .megajank import crypto_curse_string, crypto_decurse_string, simple_encrypt_string, simple_decrypt_string
@@ -69,20 +134,29 @@ class ${enum.name}(enum.IntEnum):
         d = typ.parse(p)
         return cls(d[0]), d[1]
 
+    @classmethod
+    def parse_from(cls, p, offset, typ=${enum.field("@type").type}):
+        d = typ.parse_from(p, offset)
+        return cls(d[0]), d[1]
+
     def pack(self, typ=${enum.field("@type").type}):
         return typ.pack(self)
 
 %endif
 %endfor
 
-@dataclass
+${python.dataclass()}
 class Message:
 
-    type: Type = field(repr=False, init=False)
+    type: ClassVar[Type]
+
+    _header = struct.Struct(">BBH")
 
     @classmethod
     def parse(cls, m):
-        magic, type, size = struct.unpack(">BBH", m[:4])
+        if len(m) < 4:
+            raise ValueError(f"expected message header but found {len(m)} bytes")
+        magic, type, size = cls._header.unpack_from(m)
         assert magic == 0xF1
         type = Type(type)
         p = m[4:4+size]
@@ -91,13 +165,32 @@ class Message:
         else:
             raise ValueError(f"unknown message type {type:02x}")
 
+    @classmethod
+    def parse_from(cls, m, offset=0):
+        """Parse message at `offset` in `m`, returning (message, new_offset).
+
+        Variable-length fields (like `PktDrw.data`) are returned as memoryview
+        slices of `m`, instead of copies."""
+        if len(m) - offset < 4:
+            raise ValueError(f"expected message header but found {len(m) - offset} bytes")
+        magic, type, size = cls._header.unpack_from(m, offset)
+        assert magic == 0xF1
+        type = Type(type)
+        offset += 4
+        p = memoryview(m)[:offset+size]
+        if type in MessageTypeTable:
+            return MessageTypeTable[type].parse_from(p, offset)
+        else:
+            raise ValueError(f"unknown message type {type:02x}")
+
     def pack(self, p):
-        return struct.pack(">BBH", 0xF1, self.type, len(p)) + p
+        return self._header.pack(0xF1, self.type, len(p)) + p
 
 class _Host:
-    pass
+    __slots__ = ()
 
 class _Duid:
+    __slots__ = ()
 
     @classmethod
     def from_string(cls, str):
@@ -108,9 +201,12 @@ class _Duid:
         return f"{self.prefix}-{self.serial:06}-{self.check}"
 
 class _Xzyh:
-    pass
+    __slots__ = ()
 
 class _Aabb:
+    # payload of a received frame, attached by the reader, since it is not
+    # part of the header
+    __slots__ = ("data",)
 
     @classmethod
     def parse_with_crc(cls, m):
@@ -128,15 +224,15 @@ class _Aabb:
         return header + data + ppcs_crc16(header[2:] + data)
 
 class _Dsk:
-    pass
+    __slots__ = ()
 
 class _Version:
-    pass
+    __slots__ = ()
 
 ## output all "struct" blocks
 %for struct in _pppp.without("Message"):
 %if struct.expr == "struct":
-@dataclass
+${python.dataclass()}
 class ${struct.name}(_${struct.name}):
 ${declare_fields(struct)}
     @classmethod
@@ -145,6 +241,11 @@ ${decrypt(struct)}
 ${unpack_fields(struct)}
         return cls(${", ".join(f"{f.name}={f.name}" for f in struct.fields)}), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+${decrypt_from(struct)}
+${unpack_fields_from(struct)}
+${return_from(struct)}
     def pack(self):
 ${pack_fields(struct)}
 ${encrypt(struct)}
@@ -156,7 +257,7 @@ ${encrypt(struct)}
 ## output all "packet" blocks
 %for struct in _pppp.without("Message"):
 %if struct.expr == "packet":
-@dataclass
+${python.dataclass()}
 class ${struct.name}(Message):
 %for f in _pppp.get("MessageType").fields:
   %if f.type.name == struct.name:
@@ -170,10 +271,15 @@ ${decrypt(struct)}
 ${unpack_fields(struct)}
         return cls(${", ".join(f"{f.name}={f.name}" for f in struct.fields)}), p
 
+    @classmethod
+    def parse_from(cls, p, offset=0):
+${decrypt_from(struct)}
+${unpack_fields_from(struct)}
+${return_from(struct)}
     def pack(self):
 ${pack_fields(struct)}
 ${encrypt(struct)}
-        return super().pack(p)
+        return Message.pack(self, p)
 
 %endif
 %endfor
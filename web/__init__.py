@@ -36,6 +36,7 @@
 from libflagship import ROOT_DIR
 
 from web.lib.service import ServiceManager
+from web.lib.videohub import Packetizer
 
 import web.config
 import web.platform
@@ -80,11 +81,15 @@ def mqtt(sock):
 def video(sock):
     """
     Handles receiving and sending messages on the 'videoqueue' stream service through websocket
+
+    Sends complete access units with timestamps, batching those ready at once
+    into one message (see web.lib.videohub.Packetizer for the format)
     """
     if not app.config["login"]:
         return
-    for msg in app.svc.stream("videoqueue"):
-        sock.send(msg.data)
+    packer = Packetizer()
+    for units in app.svc.stream("videoqueue", batch=64 * 1024):
+        sock.send(packer.pack(units))
 
 
 @sock.route("/ws/ctrl")
@@ -120,8 +125,8 @@ def video_download():
     def generate():
         if not app.config["login"]:
             return
-        for msg in app.svc.stream("videoqueue"):
-            yield msg.data
+        for au in app.svc.stream("videoqueue"):
+            yield au.annexb
 
     return Response(generate(), mimetype="video/mp4")
 
@@ -335,6 +340,18 @@ def app_api_ankerctl_server_internal_reload(success_message: str=None):
     return web.util.flash_redirect(url_for('app_root'), success_message, "success")
 
 
+@app.get("/api/ankerctl/server/subscribers")
+def app_api_ankerctl_server_subscribers():
+    """
+    Returns the queue depth, lag and dropped notifications of every service subscriber,
+    and the state of the video viewers
+
+    Returns:
+        A dictionary mapping service names to their metrics
+    """
+    return app.svc.metrics()
+
+
 @app.post("/api/ankerctl/file/upload")
 def app_api_ankerctl_file_upload():
     if request.method != "POST":
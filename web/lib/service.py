@@ -1,11 +1,14 @@
+import time
 import atexit
 import logging as log
 import contextlib
 
 from enum import Enum
-from threading import Thread, Event
+from queue import Empty
+from collections import deque
+from dataclasses import dataclass, asdict
+from threading import Thread, Event, Condition
 from datetime import datetime, timedelta
-from multiprocessing import Queue
 
 
 class Holdoff:
@@ -39,6 +42,144 @@ class ServiceRestartSignal(ServiceSignal):
     pass
 
 
+@dataclass
+class SubscriberStats:
+    delivered: int = 0
+    dropped: int = 0
+    max_depth: int = 0
+    # longest time a notification has waited in the queue, in seconds
+    max_lag: float = 0.0
+
+
+class Subscriber:
+    """Bounded queue of notifications from a service, for a single consumer.
+
+    `Service.notify()` only appends to the queue of every subscriber, so a
+    slow consumer (e.g. a websocket to a browser on a bad connection) never
+    holds up the service, or the other subscribers. With a `handler`, a
+    worker thread calls it for every notification. Without one, the
+    consumer calls get().
+
+    When the queue already holds `maxsize` notifications, `policy` decides
+    what happens to a new one:
+
+     - "drop-oldest": discard the oldest queued notification
+     - "drop-newest": discard the new notification
+     - "block": wait for room. Only for consumers that are known to be fast,
+       since this stalls the notifying service.
+     - "disconnect": close the subscriber. get() then raises EOFError.
+    """
+
+    POLICIES = {"drop-oldest", "drop-newest", "block", "disconnect"}
+
+    def __init__(self, name, handler=None, maxsize=256, policy="drop-oldest"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}")
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.queue = deque()
+        self.cond = Condition()
+        self.closed = False
+        self.stats = SubscriberStats()
+
+        self.worker = None
+        if handler:
+            self.worker = Thread(target=self._run, name=name, daemon=True)
+            self.worker.start()
+
+    def __len__(self):
+        return len(self.queue)
+
+    @property
+    def lag(self):
+        """Time the oldest queued notification has been waiting, in seconds"""
+        try:
+            return time.monotonic() - self.queue[0][0]
+        except IndexError:
+            return 0.0
+
+    def put(self, data):
+        """Queue `data`, returning False if it was dropped"""
+        with self.cond:
+            if len(self.queue) >= self.maxsize and not self.closed:
+                if self.policy == "block":
+                    self.cond.wait_for(lambda: len(self.queue) < self.maxsize or self.closed)
+                elif self.policy == "drop-oldest":
+                    self.queue.popleft()
+                    self._dropped()
+                elif self.policy == "drop-newest":
+                    self._dropped()
+                    return False
+                else:
+                    log.warning(f"Subscriber {self.name}: Queue full, disconnecting")
+                    self.closed = True
+                    self.cond.notify_all()
+
+            if self.closed:
+                return False
+
+            self.queue.append((time.monotonic(), data))
+            if len(self.queue) > self.stats.max_depth:
+                self.stats.max_depth = len(self.queue)
+            self.cond.notify_all()
+            return True
+
+    def _dropped(self):
+        self.stats.dropped += 1
+        # log the first drop, and then progressively less often
+        if not self.stats.dropped & (self.stats.dropped - 1):
+            log.warning(f"Subscriber {self.name}: Lagging behind, dropped {self.stats.dropped} notification(s)")
+
+    def get(self, timeout=None):
+        """Return the next notification.
+
+        Raises queue.Empty on timeout, and EOFError once the subscriber is
+        closed.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.queue or self.closed, timeout=timeout):
+                raise Empty
+            if self.closed:
+                raise EOFError(f"Subscriber {self.name} closed")
+
+            queued, data = self.queue.popleft()
+            self.stats.delivered += 1
+            lag = time.monotonic() - queued
+            if lag > self.stats.max_lag:
+                self.stats.max_lag = lag
+            self.cond.notify_all()
+            return data
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.queue.clear()
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            try:
+                data = self.get()
+            except EOFError:
+                return
+
+            try:
+                self.handler(data)
+            except Exception:
+                log.exception(f"Subscriber {self.name}: Unexpected exception in handler")
+
+    def metrics(self):
+        return {
+            "name": self.name,
+            "policy": self.policy,
+            "depth": len(self.queue),
+            "lag": self.lag,
+            **asdict(self.stats),
+        }
+
+
 class RunState(Enum):
     Starting = 2
     Running  = 3
@@ -49,6 +190,10 @@ class RunState(Enum):
 
 class Service(Thread):
 
+    # seconds to keep the worker running after the last user released the
+    # service, so that a returning user does not have to wait for a restart
+    linger = 0
+
     def __init__(self):
         super().__init__()
         self.running = True
@@ -56,8 +201,10 @@ def __init__(self):
         self.state = RunState.Stopped
         self.wanted = False
         self._event = Event()
-        self.handlers = []
+        self.subscribers = []
         self._holdoff = Holdoff()
+        self._linger = Holdoff()
+        self._linger.reset()
         self.daemon = True
         super().start()
 
@@ -70,9 +217,10 @@ def start(self):
         self.wanted = True
         self._event.set()
 
-    def stop(self):
+    def stop(self, linger=False):
         log.info(f"{self.name}: Requesting stop")
         self.wanted = False
+        self._linger.reset(delay=self.linger if linger else None)
         self._event.set()
 
     def restart(self):
@@ -152,7 +300,7 @@ def run(self):
                     self.idle(timeout=0.1)
 
             elif self.state == RunState.Running:
-                if self.wanted:
+                if self.wanted or not self._linger.passed:
                     self._attempt_run()
                 else:
                     log.debug(f"{self.name}: Stopping worker")
@@ -177,7 +325,8 @@ def run(self):
 
         log.debug(f"{self.name}: Shutting down thread")
         if self.state == RunState.Running:
-            self.handlers.clear()
+            for sub in list(self.subscribers):
+                self.unsubscribe(sub)
             self.worker_stop()
         log.debug(f"{self.name}: Thread exit")
 
@@ -194,16 +343,47 @@ def worker_stop(self):
         pass
 
     def notify(self, data):
-        for handler in self.handlers:
-            handler(data)
+        # never waits for subscribers, unless they use the "block" policy
+        for sub in self.subscribers:
+            sub.put(data)
+
+    def subscribe(self, handler=None, name=None, **kwargs):
+        """Return a new `Subscriber` to all notifications, see its arguments"""
+        if name is None:
+            name = getattr(handler, "__qualname__", "stream")
+        sub = Subscriber(f"{self.name}/{name}", handler, **kwargs)
+        # replace the list, so notify() can iterate it without locking
+        self.subscribers = self.subscribers + [sub]
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers = [s for s in self.subscribers if s is not sub]
+        sub.close()
+
+    def stream(self, **kwargs):
+        """Yield notifications from a new subscriber, while the service is running"""
+        sub = self.subscribe(**kwargs)
+        try:
+            while self.state == RunState.Running:
+                try:
+                    yield sub.get(timeout=0.5)
+                except Empty:
+                    pass
+        finally:
+            self.unsubscribe(sub)
+
+    def metrics(self):
+        return {
+            "subscribers": [sub.metrics() for sub in self.subscribers],
+        }
 
     @contextlib.contextmanager
-    def tap(self, handler):
-        self.handlers.append(handler)
+    def tap(self, handler, **kwargs):
+        sub = self.subscribe(handler, **kwargs)
         try:
             yield self
         finally:
-            self.handlers.remove(handler)
+            self.unsubscribe(sub)
 
     def await_ready(self):
         while True:
@@ -342,7 +522,7 @@ def put(self, name: str):
         self.refs[name] -= 1
 
         if not self.refs[name]:
-            svc.stop()
+            svc.stop(linger=True)
 
     @contextlib.contextmanager
     def borrow(self, name: str):
@@ -352,13 +532,13 @@ def borrow(self, name: str):
         finally:
             self.put(name)
 
-    def stream(self, name: str):
+    def stream(self, name: str, **kwargs):
         try:
             with self.borrow(name) as svc:
-                queue = Queue()
-
-                with svc.tap(lambda data: queue.put(data)):
-                    while svc.state == RunState.Running:
-                        yield queue.get()
+                yield from svc.stream(**kwargs)
         except (EOFError, OSError, ServiceStoppedError):
             return
+
+    def metrics(self):
+        """Return the metrics of every service, e.g. the state of its subscribers"""
+        return {name: svc.metrics() for name, svc in self.svcs.items()}
@@ -0,0 +1,341 @@
+import struct
+import unittest
+
+from queue import Empty
+from collections import deque
+from threading import Condition
+
+from libflagship.h264 import AccessUnit, nal_type, NAL_SPS, NAL_PPS, AUD
+
+
+class Viewer:
+    """Read position of a single viewer in a `VideoHub`."""
+
+    def __init__(self, hub):
+        self.hub = hub
+        # sequence number of the next access unit to read
+        self.cursor = hub.end
+        # False while waiting for a keyframe to (re)start from
+        self.synced = False
+        self.delivered = 0
+        self.skipped = 0
+
+    def get(self, timeout=None):
+        """Return the next access unit for this viewer, see `VideoHub.get()`"""
+        return self.hub.get(self, timeout)
+
+    def get_many(self, timeout=None, max_bytes=64 * 1024):
+        """Return the next access units for this viewer, see `VideoHub.get_many()`"""
+        return self.hub.get_many(self, timeout, max_bytes)
+
+    def close(self):
+        self.hub.leave(self)
+
+
+class VideoHub:
+    """Shared ring of recent access units, read by any number of viewers.
+
+    Every access unit is stored once, no matter how many viewers there are.
+    The ring holds at most `size` access units and `max_bytes` bytes of
+    video. Each viewer only keeps a cursor into the ring.
+
+    The ring always keeps the most recent keyframe and the access units
+    following it (within `max_bytes`), even if that is more than `size`
+    access units. New viewers start at that keyframe, so they can decode
+    right away, instead of waiting for the next one. Keyframes are published
+    with the latest SPS and PPS prepended, if they do not carry their own.
+
+    A viewer that falls behind so far that its next access unit has already
+    left the ring skips ahead to the oldest keyframe still in the ring (or
+    waits for the next one), since the frames in between cannot be decoded
+    without the ones it missed. A viewer never holds on to more than the
+    ring itself.
+    """
+
+    def __init__(self, size=64, max_bytes=8 * 1024 * 1024):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.ring = deque()
+        # sequence number of ring[0]
+        self.first = 0
+        self.bytes = 0
+        # sequence number of the most recent keyframe, or None
+        self.key = None
+        # latest parameter sets, by nal type
+        self.params = {}
+        self.viewers = set()
+        self.closed = False
+        self.cond = Condition()
+
+    @property
+    def end(self):
+        """Sequence number of the next access unit to be published"""
+        return self.first + len(self.ring)
+
+    def _with_params(self, au):
+        """Return keyframe `au`, with any parameter sets it lacks prepended"""
+        types = {nal_type(nal) for nal in au.nals}
+        missing = [nal for typ, nal in self.params.items() if typ not in types]
+        if missing:
+            au = AccessUnit(missing + au.nals, au.timestamp)
+        return au
+
+    def publish(self, au):
+        with self.cond:
+            for nal in au.nals:
+                if nal_type(nal) in (NAL_SPS, NAL_PPS):
+                    self.params[nal_type(nal)] = nal
+
+            if au.keyframe:
+                au = self._with_params(au)
+                self.key = self.end
+
+            self.ring.append(au)
+            self.bytes += au.size
+            while (len(self.ring) > self.size and (self.key is None or self.first < self.key)) or \
+                  (self.bytes > self.max_bytes and len(self.ring) > 1):
+                self.bytes -= self.ring.popleft().size
+                self.first += 1
+            self.cond.notify_all()
+
+    def join(self):
+        """Return a new viewer, starting at the most recent keyframe, if any"""
+        with self.cond:
+            viewer = Viewer(self)
+            if self.key is not None and self.key >= self.first:
+                viewer.cursor = self.key
+            self.viewers.add(viewer)
+        return viewer
+
+    def leave(self, viewer):
+        with self.cond:
+            self.viewers.discard(viewer)
+
+    def close(self):
+        """Make all viewers (current and future) raise EOFError"""
+        with self.cond:
+            self.closed = True
+            self.ring.clear()
+            self.bytes = 0
+            self.key = None
+            self.params = {}
+            self.cond.notify_all()
+
+    def _keyframe(self, start):
+        """Return the sequence number of the first keyframe at or after `start`, or None"""
+        for seq in range(max(start, self.first), self.end):
+            if self.ring[seq - self.first].keyframe:
+                return seq
+        return None
+
+    def get(self, viewer, timeout=None):
+        """Return the next access unit for `viewer`.
+
+        Raises queue.Empty on timeout, and EOFError once the hub is closed.
+        """
+        with self.cond:
+            while True:
+                if self.closed:
+                    raise EOFError("Video hub closed")
+
+                if viewer.cursor < self.first:
+                    # fell behind the ring
+                    viewer.skipped += self.first - viewer.cursor
+                    viewer.cursor = self.first
+                    viewer.synced = False
+
+                if not viewer.synced:
+                    seq = self._keyframe(viewer.cursor)
+                    if seq is None:
+                        seq = self.end
+                    else:
+                        viewer.synced = True
+                    viewer.skipped += seq - viewer.cursor
+                    viewer.cursor = seq
+
+                if viewer.synced and viewer.cursor < self.end:
+                    au = self.ring[viewer.cursor - self.first]
+                    viewer.cursor += 1
+                    viewer.delivered += 1
+                    return au
+
+                if not self.cond.wait(timeout):
+                    raise Empty
+
+    def get_many(self, viewer, timeout=None, max_bytes=64 * 1024):
+        """Return a list of the access units available to `viewer`, waiting for at least one.
+
+        Further access units are only added while the total stays within
+        `max_bytes`. Raises like `get()`.
+        """
+        with self.cond:
+            au = self.get(viewer, timeout)
+            units = [au]
+            size = au.size
+            while viewer.cursor < self.end:
+                au = self.ring[viewer.cursor - self.first]
+                size += au.size
+                if size > max_bytes:
+                    break
+                units.append(au)
+                viewer.cursor += 1
+                viewer.delivered += 1
+            return units
+
+    def metrics(self):
+        with self.cond:
+            return {
+                "size": len(self.ring),
+                "bytes": self.bytes,
+                "viewers": [
+                    {
+                        "lag": self.end - viewer.cursor,
+                        "delivered": viewer.delivered,
+                        "skipped": viewer.skipped,
+                    }
+                    for viewer in self.viewers
+                ],
+            }
+
+
+class Packetizer:
+    """Packs access units into the binary messages sent to video clients.
+
+    A message holds one or more records, each made of (big endian):
+
+        u8   flags: 1 for keyframes
+        u32  timestamp, in ms since the first access unit packed
+        u32  length of data
+        data the access unit, as Annex B, followed by an access unit delimiter
+
+    The trailing delimiter lets clients that split the byte stream on start
+    codes (like jmuxer) tell that the access unit is complete, without
+    waiting for the next one.
+    """
+
+    header = struct.Struct(">BII")
+
+    def __init__(self):
+        self.epoch = None
+
+    def pack(self, units):
+        parts = []
+        for au in units:
+            timestamp = au.timestamp or 0
+            if self.epoch is None:
+                self.epoch = timestamp
+            millis = int((timestamp - self.epoch) * 1000) & 0xffffffff
+            parts.append(self.header.pack(au.keyframe, millis, len(au.annexb) + len(AUD)))
+            parts.append(au.annexb)
+            parts.append(AUD)
+        return b"".join(parts)
+
+
+class TestVideoHub(unittest.TestCase):
+
+    IDR = b"\x65\x88"
+    P = b"\x41\x9a"
+
+    def units(self, pattern):
+        return [AccessUnit([self.IDR if c == "I" else self.P]) for c in pattern]
+
+    def drain(self, viewer):
+        res = []
+        try:
+            while True:
+                res.append(viewer.get(timeout=0))
+        except Empty:
+            return res
+
+    def test_start_at_keyframe(self):
+        hub = VideoHub()
+        viewer = hub.join()
+        self.assertEqual(self.drain(viewer), [])
+
+        units = self.units("PPIPPIP")
+        for au in units:
+            hub.publish(au)
+        self.assertEqual(self.drain(viewer), units[2:])
+        self.assertEqual(viewer.skipped, 2)
+
+    def test_skip_to_keyframe(self):
+        hub = VideoHub(size=4)
+        viewer = hub.join()
+        units = self.units("IPPPPIPP")
+        hub.publish(units[0])
+        self.assertIs(viewer.get(timeout=0), units[0])
+
+        # units[1] leaves the ring, so continue at the next keyframe
+        for au in units[1:]:
+            hub.publish(au)
+        self.assertEqual(self.drain(viewer), units[5:])
+        self.assertEqual(viewer.skipped, 4)
+
+        # falling behind again, after the next keyframe evicted the old group
+        for au in self.units("PPPPP"):
+            hub.publish(au)
+        hub.publish(units[0])
+        self.assertEqual(self.drain(viewer), [units[0]])
+
+    def test_join_at_keyframe(self):
+        hub = VideoHub(size=2)
+        units = self.units("PIPPP")
+        for au in units:
+            hub.publish(au)
+
+        # the whole group of pictures is kept, and replayed to new viewers
+        self.assertEqual(len(hub.ring), 4)
+        viewer = hub.join()
+        self.assertEqual(self.drain(viewer), units[1:])
+        self.assertEqual(viewer.skipped, 0)
+
+    def test_parameter_sets(self):
+        sps, pps = b"\x67\x42", b"\x68\xce"
+        hub = VideoHub()
+        hub.publish(AccessUnit([sps, pps, self.IDR]))
+        hub.publish(AccessUnit([self.P]))
+        hub.publish(AccessUnit([self.IDR]))
+
+        viewer = hub.join()
+        self.assertEqual(viewer.get(timeout=0).nals, [sps, pps, self.IDR])
+
+    def test_get_many(self):
+        hub = VideoHub()
+        viewer = hub.join()
+        units = self.units("IPPPP")
+        for au in units:
+            hub.publish(au)
+        self.assertEqual(viewer.get_many(timeout=0, max_bytes=6), units[:3])
+        self.assertEqual(viewer.get_many(timeout=0, max_bytes=1), units[3:4])
+        self.assertEqual(viewer.get_many(timeout=0), units[4:])
+        with self.assertRaises(Empty):
+            viewer.get_many(timeout=0)
+
+    def test_packetizer(self):
+        units = self.units("IP")
+        units[0].timestamp = 10.0
+        units[1].timestamp = 10.0667
+
+        data = Packetizer().pack(units)
+        pos = 0
+        for au, flags, millis in zip(units, (1, 0), (0, 66)):
+            header = Packetizer.header.unpack_from(data, pos)
+            pos += Packetizer.header.size
+            self.assertEqual(header, (flags, millis, len(au.annexb) + len(AUD)))
+            self.assertEqual(data[pos:pos + header[2]], au.annexb + AUD)
+            pos += header[2]
+        self.assertEqual(pos, len(data))
+
+    def test_memory(self):
+        hub = VideoHub(size=8, max_bytes=10)
+        for au in self.units("IPPPPPPPPPP"):
+            hub.publish(au)
+        self.assertEqual(len(hub.ring), 5)
+        self.assertEqual(hub.bytes, 10)
+
+    def test_close(self):
+        hub = VideoHub()
+        viewer = hub.join()
+        hub.close()
+        with self.assertRaises(EOFError):
+            viewer.get(timeout=0)
@@ -27,7 +27,7 @@ def worker_start(self):
 
         self.api_id = id(self.pppp._api)
 
-        self.pppp.handlers.append(self._handler)
+        self._sub = self.pppp.subscribe(self._handler)
 
     def worker_run(self, timeout):
         self.idle(timeout=timeout)
@@ -39,6 +39,6 @@ def worker_run(self, timeout):
             raise ServiceRestartSignal("New pppp connection detected, restarting video feed")
 
     def worker_stop(self):
-        self.pppp.handlers.remove(self._handler)
+        self.pppp.unsubscribe(self._sub)
 
         app.svc.put("pppp")
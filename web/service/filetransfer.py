@@ -7,7 +7,7 @@
 from .. import app
 
 from libflagship.pppp import P2PCmdType, Aabb, FileTransfer
-from libflagship.ppppapi import FileUploadInfo, PPPPError
+from libflagship.ppppapi import FileUploadInfo, PPPPError, AabbUploader
 
 import cli.mqtt
 import cli.util
@@ -18,31 +18,35 @@ class FileTransferService(Service):
     def api_aabb(self, api, frametype, msg=b"", pos=0):
         api.send_aabb(msg, frametype=frametype, pos=pos)
 
-    def api_aabb_request(self, api, frametype, msg=b"", pos=0):
-        self.api_aabb(api, frametype, msg, pos)
+    def _recv_reply(self):
         resp = self._tap.get()
         log.debug(f"{self.name}: Aabb response: {resp}")
+        return resp, resp.data
+
+    def api_aabb_request(self, api, frametype, msg=b"", pos=0):
+        self.api_aabb(api, frametype, msg, pos)
+        self._recv_reply()
 
-    def send_file(self, fd, user_name):
+    def send_file(self, fd, user_name, blocksize=1024 * 32, window=4):
         try:
             api = self.pppp._api
         except AttributeError:
             raise ConnectionError("No pppp connection to printer")
 
-        data = fd.read()
-        fui = FileUploadInfo.from_data(data, fd.filename, user_name=user_name, user_id="-", machine_id="-")
+        stream = cli.util.seekable_stream(fd.stream)
+        fui = FileUploadInfo.from_fd(stream, fd.filename, user_name=user_name, user_id="-", machine_id="-")
         log.info(f"Going to upload {fui.size} bytes as {fui.name!r}")
         try:
             log.info("Requesting file transfer..")
             api.send_xzyh(str(uuid.uuid4())[:16].encode(), cmd=P2PCmdType.P2P_SEND_FILE)
 
             log.info("Sending file metadata..")
-            self.api_aabb(api, FileTransfer.BEGIN, bytes(fui) + b"\x00")
+            self.api_aabb_request(api, FileTransfer.BEGIN, bytes(fui) + b"\x00")
 
             log.info("Sending file contents..")
-            blocksize = 1024 * 32
-            for pos, chunk in cli.util.split_chunks(data, blocksize):
-                self.api_aabb_request(api, FileTransfer.DATA, chunk, pos)
+            uploader = AabbUploader(api, self._recv_reply, window=window)
+            for _ in uploader.upload(cli.util.read_chunks(stream, blocksize)):
+                pass
 
             log.info("File upload complete. Requesting print start of job.")
 
@@ -61,13 +65,14 @@ def worker_start(self):
         self.pppp = app.svc.get("pppp")
         self._tap = Queue()
 
-        self.pppp.handlers.append(self.handler)
+        # replies must never be dropped, and the handler only queues them
+        self._sub = self.pppp.subscribe(self.handler, policy="block")
 
     def worker_run(self, timeout):
         self.idle(timeout=timeout)
 
     def worker_stop(self):
-        self.pppp.handlers.remove(self.handler)
+        self.pppp.unsubscribe(self._sub)
         del self._tap
 
         app.svc.put("pppp")
@@ -6,8 +6,9 @@
 from ..lib.service import Service, ServiceRestartSignal, ServiceStoppedError
 from .. import app
 
+from libflagship.framer import StreamFramer
 from libflagship.pktdump import PacketWriter
-from libflagship.pppp import P2PCmdType, PktClose, Duid, Type, Xzyh, Aabb
+from libflagship.pppp import P2PCmdType, PktClose, Duid, Type, Aabb
 from libflagship.ppppapi import AnkerPPPPAsyncApi, PPPPState
 
 
@@ -40,6 +41,9 @@ def worker_start(self):
             raise ServiceStoppedError("Printer IP address not available")
 
         api = AnkerPPPPAsyncApi.open_lan(Duid.from_string(printer.p2p_duid), host=printer.ip_addr)
+        # frames are cut from the stream as soon as they are complete
+        for ch in api.chans:
+            ch.framer = StreamFramer()
         if app.config["pppp_dump"]:
             dumpfile = app.config["pppp_dump"]
             log.info(f"Logging all pppp traffic to {dumpfile!r}")
@@ -60,50 +64,24 @@ def worker_start(self):
         log.info("Established pppp connection")
         self._api = api
 
-    def _recv_aabb(self, fd):
-        data = fd.read(12)
-        aabb = Aabb.parse(data)[0]
-        p = data + fd.read(aabb.len + 2)
-        aabb, data = Aabb.parse_with_crc(p)[:2]
-        return aabb, data
-
     def worker_run(self, timeout):
         try:
-            msg = self._api.poll(timeout=timeout)
+            msgs = self._api.poll_batch(timeout=timeout)
         except ConnectionResetError:
             raise ServiceRestartSignal()
 
-        if not msg or msg.type != Type.DRW:
-            return
-
-        ch = self._api.chans[msg.chan]
-
-        with ch.lock:
-            data = ch.peek(16, timeout=0)
-            if not data:
-                return
-
-            if data[:4] == b'XZYH':
-                hdr = ch.peek(16, timeout=0)
-                if not hdr:
-                    return
-
-                xzyh = Xzyh.parse(hdr)[0]
-                data = ch.read(xzyh.len + 16, timeout=0)
-                if not data:
-                    return None
-
-                xzyh.data = data[16:]
-                self.notify((msg.chan, xzyh))
-            elif data[:2] == b'\xAA\xBB':
-                aabb, data = self._recv_aabb(ch)
-                if len(data) != 1:
-                    raise ValueError(f"Unexpected reply from aabb request: {data}")
-
-                aabb.data = data
-                self.notify((msg.chan, aabb))
-            else:
-                raise ValueError(f"Unexpected data in stream: {data!r}")
+        # a batch of packets may complete several frames, on several channels
+        for chan in sorted({msg.chan for msg in msgs if msg.type == Type.DRW}):
+            ch = self._api.chans[chan]
+            frames = ch.framer.frames
+            while frames:
+                frame = frames.popleft()
+                if isinstance(frame, Aabb) and len(frame.data) != 1:
+                    raise ValueError(f"Unexpected reply from aabb request: {frame.data}")
+                self.notify((chan, frame))
+
+            if ch.error:
+                raise ServiceRestartSignal(f"Corrupt stream on channel {chan}: {ch.error}")
 
     def worker_stop(self):
         self._api.send(PktClose())
@@ -1,17 +1,24 @@
 import json
+import time
 import logging as log
 
 from queue import Empty
 from multiprocessing import Queue
 
-from ..lib.service import Service, ServiceRestartSignal
+from ..lib.service import Service, ServiceRestartSignal, RunState
+from ..lib.videohub import VideoHub
 from .. import app
 
+from libflagship.h264 import AccessUnitParser
 from libflagship.pppp import P2PSubCmdType, Xzyh
 
 
 class VideoQueue(Service):
 
+    # keep the live stream (and the cached keyframe) around for viewers
+    # reloading the page, or reconnecting
+    linger = 10
+
     def api_start_live(self):
         self.pppp.api_command(P2PSubCmdType.START_LIVE, data={
             "encryptkey": "x",
@@ -42,18 +49,52 @@ def _handler(self, data):
         if not isinstance(msg, Xzyh):
             return
 
-        self.notify(msg)
+        for au in self.parser.feed(msg.data, time.monotonic()):
+            self.hub.publish(au)
+
+    def stream(self, batch=None):
+        """Yield access units for a new viewer, starting at the latest keyframe.
+
+        With `batch`, yield lists of the access units ready at once instead,
+        of up to `batch` bytes (but at least one access unit).
+        """
+        viewer = self.hub.join()
+        try:
+            while self.state == RunState.Running:
+                try:
+                    if batch:
+                        yield viewer.get_many(timeout=0.5, max_bytes=batch)
+                    else:
+                        yield viewer.get(timeout=0.5)
+                except Empty:
+                    pass
+        finally:
+            viewer.close()
+
+    def metrics(self):
+        return {
+            **super().metrics(),
+            "hub": self.hub.metrics() if self.hub else None,
+        }
 
     def worker_init(self):
         self.saved_light_state = None
         self.saved_video_mode = None
+        self.hub = None
 
     def worker_start(self):
+        # all viewers share one ring of recent access units, which also
+        # keeps the latest keyframe for new viewers to start from
+        self.parser = AccessUnitParser()
+        self.hub = VideoHub()
+
         self.pppp = app.svc.get("pppp")
 
         self.api_id = id(self.pppp._api)
 
-        self.pppp.handlers.append(self._handler)
+        # the chunks are one byte stream, so a dropped chunk would corrupt the
+        # access units around it. the handler only parses and publishes.
+        self._sub = self.pppp.subscribe(self._handler, policy="block")
 
         self.api_start_live()
 
@@ -78,6 +119,8 @@ def worker_stop(self):
         except Exception as E:
             log.warning(f"{self.name}: Failed to send stop command ({E})")
 
-        self.pppp.handlers.remove(self._handler)
+        self.pppp.unsubscribe(self._sub)
+        # ends the streams of all viewers
+        self.hub.close()
 
         app.svc.put("pppp")